@@ -0,0 +1,333 @@
+import contextvars
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import requests
+
+from clock import get_clock
+from config import config
+from deadlines import deadline, remaining
+from entitlements import DEAD_STATUSES, EntitlementCache, LookupResult
+from games import NOT_APPLICABLE
+from rate_limiter import RateLimiter
+from session_manager import (
+    cookie_expiry,
+    get_session,
+    refresh_cookies,
+    save_session_cookies,
+    session_cookies,
+    verify_login,
+)
+from utils import load_json, logger, notify, save_json
+
+if TYPE_CHECKING:
+    from coordination import Coordinator
+
+# Most useful outcome first: a single success means the code was worth it,
+# and a transient failure matters more than a per-account "used".
+_OUTCOME_PRIORITY = [
+    "redeemed",
+    "failed",
+    "unknown",
+    "used",
+    "expired",
+    "invalid",
+    NOT_APPLICABLE,
+]
+# Outcomes that say nothing about the code itself and are worth retrying.
+TRANSIENT_OUTCOMES = ("failed", "unknown")
+
+
+@dataclass
+class Account:
+    """A SHiFT account with its own cookies, session and rate limiter."""
+
+    name: str
+    cookies_file: str
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    session: Optional[requests.Session] = None
+    # When the session last passed verify_login, and the cookies last saved.
+    verified_at: float = 0.0
+    saved_cookies: str = ""
+    # When this account last sent a redemption (spaced by rate_limiter).
+    redeemed_at: float = 0.0
+    # Login cookie expiry already reported by keep_alive.
+    expiry_warned: float = 0.0
+
+
+def parse_accounts(spec: str) -> List[Account]:
+    """Parse ``name=cookies_file`` pairs separated by commas."""
+    accounts: List[Account] = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, cookies_file = entry.partition("=")
+        if not sep:
+            cookies_file = name
+            name = f"account{len(accounts) + 1}"
+        accounts.append(Account(name=name.strip(), cookies_file=cookies_file.strip()))
+    return accounts
+
+
+def load_accounts() -> List[Account]:
+    """Return configured accounts, falling back to the single default account."""
+    accounts = parse_accounts(config.ACCOUNTS)
+    if not accounts:
+        accounts = [Account(name="default", cookies_file=config.COOKIES_FILE)]
+    return accounts
+
+
+def persist_cookies(account: Account) -> None:
+    """Write the session's cookies back to disk if the server changed them."""
+    if account.session is None:
+        return
+    fingerprint = json.dumps(session_cookies(account.session), sort_keys=True)
+    if fingerprint != account.saved_cookies:
+        save_session_cookies(account.session, account.cookies_file)
+        account.saved_cookies = fingerprint
+
+
+def ensure_logged_in(
+    account: Account, verbose: bool = False, now: Optional[float] = None
+) -> bool:
+    """Load (or reuse) the account session and refresh cookies if needed.
+
+    A session verified within ``LOGIN_CHECK_TTL`` (usually by ``keep_alive``
+    during idle time) is trusted without another round trip.
+    """
+    now = get_clock().time() if now is None else now
+    if account.session is None:
+        account.session = get_session(account.cookies_file)
+        account.saved_cookies = json.dumps(
+            session_cookies(account.session), sort_keys=True
+        )
+    elif now - account.verified_at < config.LOGIN_CHECK_TTL:
+        return True
+    if verify_login(account.session):
+        account.verified_at = now
+        persist_cookies(account)
+        return True
+    return _log_in_again(account, verbose, now)
+
+
+def _log_in_again(account: Account, verbose: bool, now: float) -> bool:
+    """Refresh an expired session through the login browser."""
+    logger.warning(f"Session for account '{account.name}' expired, refreshing")
+    notify(
+        config.APPRISE_URL,
+        "ShiftWatcher",
+        f"Session expired for {account.name} — refreshing cookies.",
+    )
+    _refresh_session(account, verbose)
+    if verify_login(account.session):
+        account.verified_at = now
+        return True
+
+    notify(
+        config.APPRISE_URL,
+        "ShiftWatcher",
+        f"Login failed after refresh for {account.name}.",
+    )
+    account.session = None
+    return False
+
+
+def _refresh_session(account: Account, verbose: bool = False) -> None:
+    refresh_cookies(verbose=verbose, cookies_file=account.cookies_file)
+    if account.session is not None:
+        account.session.close()
+    account.session = get_session(account.cookies_file)
+    account.saved_cookies = json.dumps(session_cookies(account.session), sort_keys=True)
+
+
+def _idle_login_allowed() -> bool:
+    """Whether the login browser may be opened between cycles."""
+    return config.IDLE_LOGIN or (sys.stdin is not None and sys.stdin.isatty())
+
+
+def keep_alive(
+    account: Account, verbose: bool = False, now: Optional[float] = None
+) -> bool:
+    """Idle-time upkeep so the next cycle does not start by logging in.
+
+    The session is verified (which also keeps it alive server-side) and any
+    rotated cookies are written back. A login cookie expiring within
+    ``COOKIE_REFRESH_MARGIN`` is reported once. A session that no longer
+    verifies is only logged in again here when someone can see the login
+    browser: the watcher runs in a terminal or ``IDLE_LOGIN`` is set.
+    Otherwise the next cycle logs in.
+    """
+    now = get_clock().time() if now is None else now
+    if account.session is None:
+        return False
+    if verify_login(account.session):
+        account.verified_at = now
+        persist_cookies(account)
+        _warn_if_expiring(account, now)
+        return True
+    account.verified_at = 0.0
+    if not _idle_login_allowed():
+        logger.warning(
+            f"Session for account '{account.name}' expired; "
+            "logging in again when the next cycle starts"
+        )
+        return False
+    return _log_in_again(account, verbose, now)
+
+
+def wait_idle(
+    accounts: List[Account],
+    seconds: float,
+    wake: threading.Event,
+    coordinator: Optional["Coordinator"] = None,
+    role: str = "sources",
+    verbose: bool = False,
+) -> None:
+    """Wait ``seconds`` for the next cycle, keeping sessions alive meanwhile.
+
+    Every ``KEEPALIVE_INTERVAL`` the ``role`` leader lease is renewed and
+    each logged-in account gets a ``keep_alive``. Returns early when
+    ``wake`` is set (e.g. by the code intake), clearing it.
+    """
+    clock = get_clock()
+    until = clock.monotonic() + seconds
+    while (left := until - clock.monotonic()) > 0:
+        if clock.wait(wake, min(left, config.KEEPALIVE_INTERVAL)):
+            break
+        if coordinator is not None:
+            coordinator.polls(role)
+        for account in accounts:
+            if account.session is not None:
+                try:
+                    keep_alive(account, verbose=verbose)
+                except Exception as e:
+                    logger.warning(f"Keepalive for account '{account.name}': {e}")
+    wake.clear()
+
+
+def _warn_if_expiring(account: Account, now: float) -> None:
+    expiry = cookie_expiry(account.session)
+    if (
+        expiry is None
+        or expiry == account.expiry_warned
+        or expiry - now >= config.COOKIE_REFRESH_MARGIN
+    ):
+        return
+    account.expiry_warned = expiry
+    message = (
+        f"Login for {account.name} expires in {(expiry - now) / 3600:.1f}h; "
+        "log in again before then."
+    )
+    logger.warning(message)
+    notify(config.APPRISE_URL, "ShiftWatcher", message)
+
+
+def combine_outcomes(outcomes: Dict[str, str]) -> str:
+    """Collapse per-account outcomes into a single status for the code."""
+    for status in _OUTCOME_PRIORITY:
+        if status in outcomes.values():
+            return status
+    return next(iter(outcomes.values()), "failed")
+
+
+def _redeem_for_account(
+    account: Account, code: str, redeem: Optional[Callable[..., str]] = None
+) -> str:
+    from code_redeemer import redeem_code
+
+    redeem = redeem or redeem_code
+    if account.session is None:
+        return "failed"
+    limiter = account.rate_limiter
+    limiter.wait(remaining(), since=account.redeemed_at)
+    account.redeemed_at = limiter.clock.time()
+    result = redeem(account.session, code)
+    # Only errors and unrecognised replies (which is how a 429 surfaces) back
+    # off; a definite answer, even "expired", means the server is keeping up.
+    if result in TRANSIENT_OUTCOMES:
+        limiter.increase()
+    else:
+        limiter.reset()
+    return result
+
+
+def redeem_for_accounts(
+    accounts: List[Account],
+    code: str,
+    cache: Optional[EntitlementCache] = None,
+    redeem: Optional[Callable[..., str]] = None,
+) -> Dict[str, str]:
+    """Redeem ``code`` on every account in parallel.
+
+    A code is skipped as not applicable once its entitlement lookup (run
+    first by ``redeem_code``) returns titles outside ``SHIFT_GAMES``. With a
+    ``cache``, codes a lookup already found dead
+    (expired, invalid, not applicable) are answered from it, and codes every
+    account finds dead are added to it. ``redeem`` replaces ``redeem_code``
+    (the simulator uses a stand-in).
+
+    Returns a mapping of account name to redemption status.
+    """
+    dead = cache.dead_status(code) if cache is not None else None
+    if dead:
+        logger.info(f"Skipping {code}; cached lookup says {dead}")
+        return {account.name: dead for account in accounts}
+
+    with deadline("code", config.CODE_DEADLINE, retries=config.CODE_HTTP_RETRIES):
+        if len(accounts) == 1:
+            outcomes = {
+                accounts[0].name: _redeem_for_account(accounts[0], code, redeem)
+            }
+        else:
+            with ThreadPoolExecutor(
+                max_workers=len(accounts), thread_name_prefix="redeem"
+            ) as executor:
+                futures = {
+                    account.name: executor.submit(
+                        contextvars.copy_context().run,
+                        _redeem_for_account,
+                        account,
+                        code,
+                        redeem,
+                    )
+                    for account in accounts
+                }
+                outcomes = {name: f.result() for name, f in futures.items()}
+
+    statuses = set(outcomes.values())
+    if cache is not None and len(statuses) == 1 and statuses <= set(DEAD_STATUSES):
+        cache.record(LookupResult(code=code, status=statuses.pop()))
+    return outcomes
+
+
+class AccountResults:
+    """Per-account redemption outcomes persisted as ``{account: {code: status}}``."""
+
+    def __init__(self, path: str = ""):
+        self.path = path or config.ACCOUNT_RESULTS_FILE
+        self.results: Dict[str, Dict[str, str]] = load_json(self.path, {})
+
+    def record(self, code: str, outcomes: Dict[str, str]) -> None:
+        for name, status in outcomes.items():
+            self.results.setdefault(name, {})[code] = status
+        save_json(self.path, self.results)
+
+    def status(self, account: str, code: str) -> Optional[str]:
+        return self.results.get(account, {}).get(code)
+
+    def redeemed(self, code: str) -> bool:
+        """Whether any account has already redeemed ``code``."""
+        return any(codes.get(code) == "redeemed" for codes in self.results.values())
+
+    def pending_accounts(self, accounts: List[Account], code: str) -> List[Account]:
+        """Accounts with no final outcome for ``code`` yet (new or transient)."""
+        return [
+            account
+            for account in accounts
+            if self.status(account.name, code) in (None, *TRANSIENT_OUTCOMES)
+        ]
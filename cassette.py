@@ -0,0 +1,202 @@
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from clock import get_clock
+from config import config
+from utils import logger
+
+RECORD = "record"
+REPLAY = "replay"
+
+# The stored body is already decoded, so these no longer describe it.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CassetteMiss(requests.RequestException):
+    """Raised in replay mode when no recording exists for a URL."""
+
+
+class Cassette:
+    """Record HTTP GET responses to a directory and serve them back.
+
+    Each URL is stored as one gzip-compressed JSON file holding the status,
+    headers, decoded body and original elapsed time. In replay mode responses
+    come from those files after sleeping ``latency`` seconds (or the recorded
+    elapsed time with ``recorded_latency``), so a scan is repeatable offline.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        mode: str = REPLAY,
+        latency: float = 0.0,
+        recorded_latency: bool = False,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        self.recorded_latency = recorded_latency
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.directory, f"{digest}.json.gz")
+
+    def record(self, url: str, response: requests.Response) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            "url": url,
+            "status": response.status_code,
+            "headers": {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() not in _DROPPED_HEADERS
+            },
+            "encoding": response.encoding,
+            "body": base64.b64encode(response.content).decode("ascii"),
+            "elapsed": response.elapsed.total_seconds() if response.elapsed else 0.0,
+            "recorded_at": get_clock().time(),
+        }
+        with gzip.open(self._path(url), "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        logger.debug(f"Recorded {url} ({len(response.content)} bytes)")
+
+    def record_text(self, url: str, text: str, elapsed: float = 0.0) -> None:
+        """Record a page that was not fetched with ``requests`` (a rendered one)."""
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response.encoding = "utf-8"
+        response._content = text.encode("utf-8")
+        response.url = url
+        response.elapsed = timedelta(seconds=elapsed)
+        self.record(url, response)
+
+    def replay(self, url: str) -> requests.Response:
+        path = self._path(url)
+        if not os.path.exists(path):
+            raise CassetteMiss(f"No recording for {url} in {self.directory}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+
+        delay = entry.get("elapsed", 0.0) if self.recorded_latency else self.latency
+        if delay > 0:
+            get_clock().sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry.get("encoding")
+        response._content = base64.b64decode(entry["body"])
+        response.url = entry["url"]
+        return response
+
+
+def load_cassette() -> Optional[Cassette]:
+    """Cassette configured through ``SHIFT_CASSETTE_MODE``, if any."""
+    if not config.CASSETTE_MODE:
+        return None
+    return Cassette(config.CASSETTE_DIR, config.CASSETTE_MODE, config.CASSETTE_LATENCY)
+
+
+def benchmark_scan(cassette: Cassette, runs: int = 5, reddit: bool = True) -> dict:
+    """Run fetch+extract ``runs`` times against ``cassette`` and time it.
+
+    Source health is tracked in a throwaway file so replayed runs neither
+    read nor disturb the live circuit breaker state.
+    """
+    import code_fetcher
+    from http_pool import http_pool
+    from reddit_parser import parse_reddit_rss
+    from rendered_fetch import rendered_fetcher
+    from source_health import SourceHealthTracker
+
+    previous_cassette, previous_health = http_pool.cassette, code_fetcher.source_health
+    timings = []
+    codes = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        http_pool.cassette = rendered_fetcher.cassette = cassette
+        try:
+            for _ in range(runs):
+                code_fetcher.source_health = SourceHealthTracker(
+                    os.path.join(tmp, "health.json")
+                )
+                start = time.perf_counter()
+                found = set(code_fetcher.fetch_new_codes())
+                if reddit:
+                    found |= set(parse_reddit_rss())
+                timings.append(time.perf_counter() - start)
+                codes = len(found)
+        finally:
+            http_pool.cassette = rendered_fetcher.cassette = previous_cassette
+            code_fetcher.source_health = previous_health
+
+    pages = len(config.SOURCES) + (1 if reddit else 0)
+    total = sum(timings)
+    return {
+        "runs": runs,
+        "pages": pages,
+        "codes": codes,
+        "mean_seconds": total / runs if runs else 0.0,
+        "min_seconds": min(timings, default=0.0),
+        "pages_per_second": pages * runs / total if total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Record source pages or replay them to benchmark scanning"
+    )
+    parser.add_argument("mode", choices=[RECORD, REPLAY])
+    parser.add_argument("directory", nargs="?", default=config.CASSETTE_DIR)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added per replayed page"
+    )
+    parser.add_argument(
+        "--recorded-latency",
+        action="store_true",
+        help="Replay each page with the latency it had when recorded",
+    )
+    parser.add_argument("--no-reddit", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == RECORD:
+        import code_fetcher
+        from http_pool import http_pool
+        from reddit_parser import parse_reddit_rss
+        from rendered_fetch import rendered_fetcher
+
+        http_pool.cassette = rendered_fetcher.cassette = Cassette(
+            args.directory, RECORD
+        )
+        found = set(code_fetcher.fetch_new_codes())
+        if not args.no_reddit:
+            found |= set(parse_reddit_rss())
+        print(f"Recorded into {args.directory}; {len(found)} codes seen")
+    else:
+        cassette = Cassette(
+            args.directory, REPLAY, args.latency, args.recorded_latency
+        )
+        result = benchmark_scan(cassette, args.runs, reddit=not args.no_reddit)
+        print(
+            f"{result['runs']} runs x {result['pages']} pages: "
+            f"mean {result['mean_seconds']:.3f}s, best {result['min_seconds']:.3f}s, "
+            f"{result['pages_per_second']:.1f} pages/s, {result['codes']} codes"
+        )
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+from time import struct_time
+from typing import Optional
+
+
+class Clock:
+    """Wall time, sleeping and randomness for the watcher loops.
+
+    The scheduler, rate limiter, work queue, deadlines, redemption loops,
+    session upkeep, source health, entitlement cache and cassette replay
+    read the time, sleep and draw jitter through the active clock (see
+    ``get_clock()``) instead of calling ``time`` and ``random`` directly, so
+    a simulation can swap in a ``VirtualClock`` and replay a day in
+    milliseconds. This default clock simply forwards to the real thing.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.random = random.Random(seed)
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(max(0.0, seconds))
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for ``event``; True if it was set."""
+        return event.wait(max(0.0, timeout))
+
+    def localtime(self, seconds: Optional[float] = None) -> struct_time:
+        return time.localtime(self.time() if seconds is None else seconds)
+
+    def strftime(self, fmt: str) -> str:
+        return time.strftime(fmt, self.localtime())
+
+    def uniform(self, low: float, high: float) -> float:
+        return self.random.uniform(low, high)
+
+
+class VirtualClock(Clock):
+    """Clock whose time only moves when something sleeps or waits.
+
+    ``sleep()`` and ``wait()`` return immediately after advancing the virtual
+    time, and randomness comes from a seeded generator, so a simulated run is
+    fast and repeatable. ``time()`` and ``monotonic()`` share one timeline
+    starting at ``start`` (a Unix timestamp, so hour-of-day logic still works).
+    """
+
+    def __init__(self, start: float = 0.0, seed: int = 0):
+        super().__init__(seed)
+        self.now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self.now += max(0.0, seconds)
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
+
+
+_clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Make ``clock`` the active clock and return the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def strftime(fmt: str) -> str:
+    """``time.strftime`` on the active clock (used for console timestamps)."""
+    return _clock.strftime(fmt)
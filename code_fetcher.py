@@ -1,24 +1,224 @@
-import requests
+import math
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from utils import logger
 from config import config
-import re
-from typing import Set, List
+from deadlines import DeadlineExceeded, check, remaining
+from http_pool import http_pool
+from rendered_fetch import rendered_fetcher
+from tracing import tracer
+from metrics import (
+    CODES_EXTRACTED,
+    CODES_REJECTED,
+    SOURCE_BREAKER_OPEN,
+    SOURCE_FETCH_BYTES,
+    SOURCE_FETCH_ERRORS,
+    SOURCE_FETCH_SECONDS,
+    SOURCE_SKIPPED,
+)
+from source_health import SourceHealthTracker, looks_like_login_wall
+from extractors import ExtractedCode, extract_from_page
+from typing import Dict, Iterable, Optional, Set, List, Tuple
 
 
-def extract_codes_from_text(text: str) -> Set[str]:
-    pattern = re.compile(r"[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}")
-    return set(re.findall(pattern, text))
+source_health = SourceHealthTracker()
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_failed = False
+# What a parse worker sends back: the codes and how many placeholders it dropped.
+_Parsed = Tuple[Dict[str, ExtractedCode], float]
 
 
-def fetch_new_codes() -> List[str]:
-    codes = set()
-    for url in config.SOURCES:
+def parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Worker processes for parsing large pages (None when disabled).
+
+    Created on first use and kept for the life of the watcher, so worker
+    start-up is paid once rather than every cycle. Workers are started by a
+    fork server (or spawned where there is none) rather than forked from the
+    watcher, whose other threads may hold locks at fork time. They import
+    the modules afresh, so they see the extractors registered at import time.
+    """
+    global _parse_pool, _parse_pool_failed
+    if _parse_pool is None and config.PARSE_WORKERS > 0 and not _parse_pool_failed:
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
         try:
-            r = requests.get(
-                url, headers=config.HEADERS, timeout=config.REQUEST_TIMEOUT
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=config.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context(method),
             )
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Parsing in-process; no worker pool available: {e}")
+            _parse_pool_failed = True
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+
+def parse_page(url: str, text: str) -> Dict[str, ExtractedCode]:
+    """Extract codes from a fetched page; runs in a worker for large pages.
+
+    Raises ValueError for a login wall so it counts as a source failure.
+    """
+    found = extract_from_page(url, text)
+    if not found and looks_like_login_wall(text):
+        raise ValueError("source returned a login wall")
+    return found
+
+
+def _parse_in_worker(url: str, text: str) -> _Parsed:
+    """``parse_page`` for the worker pool, with the placeholders it rejected.
+
+    Metrics recorded in a worker never reach the watcher's registry, so the
+    count travels back with the codes and is added in the watcher.
+    """
+    before = CODES_REJECTED.value()
+    found = parse_page(url, text)
+    return found, CODES_REJECTED.value() - before
+
+
+def fetch_new_codes() -> List[str]:
+    codes: Set[str] = set()
+    for found in fetch_codes_by_source().values():
+        codes.update(found)
+    return list(codes)
+
+
+def _record_success(url: str, found: Dict[str, ExtractedCode], start: float) -> None:
+    CODES_EXTRACTED.inc(len(found), source=url)
+    source_health.record_success(url, time.perf_counter() - start, codes=len(found))
+    _observe(url, start)
+
+
+def _record_failure(url: str, start: float, error: Exception) -> None:
+    SOURCE_FETCH_ERRORS.inc(source=url)
+    source_health.record_failure(url, time.perf_counter() - start, str(error))
+    logger.warning(f"Failed fetching from {url}: {error}")
+    _observe(url, start)
+
+
+def _observe(url: str, start: float) -> None:
+    SOURCE_FETCH_SECONDS.observe(time.perf_counter() - start, source=url)
+    SOURCE_BREAKER_OPEN.set(1 if source_health.get(url).is_open else 0, source=url)
+
+
+def _fetch_page(url: str) -> Tuple[str, int]:
+    """Fetch ``url`` rendered or with a pooled GET; returns text and byte size."""
+    with tracer.span("fetch", source=url) as span:
+        if rendered_fetcher.handles(url):
+            text = rendered_fetcher.fetch(url)
+            size = len(text.encode("utf-8"))
+        else:
+            r = http_pool.get(url)
             r.raise_for_status()
-            codes |= extract_codes_from_text(r.text)
+            text, size = r.text, len(r.content)
+            span.set(status_code=r.status_code)
+        SOURCE_FETCH_BYTES.inc(size, source=url)
+        span.set(bytes=size)
+    return text, size
+
+
+def _submit_parse(url: str, text: str, size: int) -> "Optional[Future[_Parsed]]":
+    """Hand a large page to the parse workers; None means parse it in place."""
+    pool = parse_pool() if size >= config.PARSE_INLINE_BYTES else None
+    if pool is None:
+        return None
+    try:
+        return pool.submit(_parse_in_worker, url, text)
+    except BrokenProcessPool:
+        shutdown_parse_pool()
+        return None
+
+
+def _drain_parsing(
+    parsing: Dict["Future[_Parsed]", Tuple[str, str, float]],
+    by_source: Dict[str, Dict[str, ExtractedCode]],
+) -> None:
+    """Collect worker results into ``by_source`` as they finish.
+
+    Pages still parsing when the cycle deadline runs out are dropped (and
+    their parses cancelled) rather than holding up the cycle.
+    """
+    left = remaining()
+    try:
+        for future in as_completed(parsing, None if math.isinf(left) else left):
+            url, text, start = parsing[future]
+            try:
+                with tracer.span("extract", source=url, worker=True) as extract_span:
+                    try:
+                        found, rejected = future.result()
+                        CODES_REJECTED.inc(rejected)
+                    except BrokenProcessPool:
+                        logger.warning(
+                            f"Parse worker died on {url}; parsing in-process"
+                        )
+                        shutdown_parse_pool()
+                        found = parse_page(url, text)
+                    extract_span.set(codes=len(found))
+                by_source[url] = found
+                _record_success(url, found, start)
+            except Exception as e:
+                _record_failure(url, start, e)
+    except TimeoutError:
+        late = [url for future, (url, _, _) in parsing.items() if not future.done()]
+        for future in parsing:
+            future.cancel()
+        logger.warning(
+            f"Cycle deadline reached while parsing {', '.join(late)}; "
+            "leaving them for next cycle"
+        )
+
+
+def fetch_codes_by_source(
+    sources: Optional[Iterable[str]] = None,
+) -> Dict[str, Dict[str, ExtractedCode]]:
+    """Fetch ``sources`` (default: all configured) and return codes per source.
+
+    Each page is handled by the extractor registered for its URL, so the
+    result maps source URL -> code -> metadata (reward, expiry hint). Hosts
+    listed in ``RENDER_SOURCES`` are rendered in the headless browser pool
+    instead of fetched with a plain GET. Pages of at least
+    ``PARSE_INLINE_BYTES`` are parsed in the worker pool while the next
+    source is fetched; smaller ones are cheaper to parse in place.
+    Once the cycle deadline is reached the remaining sources are left for
+    the next cycle without counting as failures.
+    """
+    urls = list(config.SOURCES if sources is None else sources)
+    by_source: Dict[str, Dict[str, ExtractedCode]] = {}
+    parsing: Dict["Future[_Parsed]", Tuple[str, str, float]] = {}
+    for url in urls:
+        try:
+            check(f"fetching {url}")
+        except DeadlineExceeded as e:
+            logger.warning(f"{e}; leaving the remaining sources for next cycle")
+            break
+        if not source_health.allow(url):
+            SOURCE_SKIPPED.inc(source=url)
+            logger.debug(f"Skipping {url}; circuit breaker open")
+            continue
+        start = time.perf_counter()
+        try:
+            text, size = _fetch_page(url)
+            future = _submit_parse(url, text, size)
+            if future is not None:
+                parsing[future] = (url, text, start)
+                continue
+            with tracer.span("extract", source=url) as extract_span:
+                found = parse_page(url, text)
+                extract_span.set(codes=len(found))
+            by_source[url] = found
+            _record_success(url, found, start)
         except Exception as e:
-            logger.warning(f"Failed fetching from {url}: {e}")
-    return list(codes)
+            _record_failure(url, start, e)
+    _drain_parsing(parsing, by_source)
+
+    source_health.save()
+    # Keep the configured source order so the first source to list a code
+    # is credited with it, however the parse workers finished.
+    return {url: by_source[url] for url in urls if url in by_source}
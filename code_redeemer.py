@@ -8,7 +8,13 @@ from urllib.parse import urljoin
 
 import requests
 
-from config import config
+from clock import get_clock
+from config import Config, config
+from deadlines import request_timeout
+from entitlements import AVAILABLE, LookupResult
+from games import NOT_APPLICABLE, detect_game, game_allowed
+from metrics import REDEEM_STAGE_SECONDS, timed
+from tracing import tracer
 from utils import logger
 
 
@@ -17,6 +23,8 @@ class _RedeemForm:
     attrs: Dict[str, str]
     hidden: Dict[str, str]
     commits: List[str]
+    # Game title from the heading above the form, if any.
+    title: str = ""
 
 
 class _RedeemFormParser(HTMLParser):
@@ -25,12 +33,20 @@ class _RedeemFormParser(HTMLParser):
     def __init__(self) -> None:
         super().__init__()
         self.forms: List[_RedeemForm] = []
+        self.titles: List[str] = []
         self._current: Optional[_RedeemForm] = None
+        self._heading: Optional[List[str]] = None
+        self._title = ""
 
     def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
         attrs_dict = {key: value or "" for key, value in attrs}
+        if tag in ("h1", "h2", "h3", "h4"):
+            self._heading = []
+            return
         if tag == "form":
-            self._current = _RedeemForm(attrs=attrs_dict, hidden={}, commits=[])
+            self._current = _RedeemForm(
+                attrs=attrs_dict, hidden={}, commits=[], title=self._title
+            )
             return
 
         if not self._current:
@@ -49,7 +65,18 @@ class _RedeemFormParser(HTMLParser):
             if value:
                 self._current.commits.append(value)
 
+    def handle_data(self, data: str) -> None:
+        if self._heading is not None:
+            self._heading.append(data)
+
     def handle_endtag(self, tag: str) -> None:
+        if tag in ("h1", "h2", "h3", "h4") and self._heading is not None:
+            title = detect_game("".join(self._heading))
+            self._heading = None
+            if title:
+                self._title = title
+                self.titles.append(title)
+            return
         if tag == "form" and self._current:
             if self._current.commits:
                 self.forms.append(self._current)
@@ -57,7 +84,7 @@ class _RedeemFormParser(HTMLParser):
 
 
 def _select_platform_submission(
-    html: str, code: str
+    html: str, code: str, settings: Config
 ) -> Optional[Tuple[str, Dict[str, str], str]]:
     """Return action URL, payload, and chosen commit label if needed."""
 
@@ -67,6 +94,10 @@ def _select_platform_submission(
 
     if not parser.forms:
         return None
+    # Never redeem on a title outside SHIFT_GAMES when another form fits.
+    parser.forms = [
+        form for form in parser.forms if game_allowed(form.title)
+    ] or parser.forms
 
     logger.debug(
         "Found %d redemption forms with commit labels: %s",
@@ -74,7 +105,7 @@ def _select_platform_submission(
         [form.commits for form in parser.forms],
     )
 
-    preferred_raw = config.PREFERRED_PLATFORM.strip().lower()
+    preferred_raw = settings.PREFERRED_PLATFORM.strip().lower()
     chosen_form = parser.forms[0]
     chosen_commit = chosen_form.commits[0]
 
@@ -157,8 +188,8 @@ def _select_platform_submission(
         hidden_inputs["code"] = code
     hidden_inputs["commit"] = chosen_commit
 
-    action = chosen_form.attrs.get("action") or config.REDEEM_URL
-    action_url = urljoin(config.REDEEM_URL, action)
+    action = chosen_form.attrs.get("action") or settings.REDEEM_URL
+    action_url = urljoin(settings.REDEEM_URL, action)
 
     return action_url, hidden_inputs, chosen_commit
 
@@ -174,11 +205,11 @@ def _extract_csrf_token(html: str) -> Optional[str]:
     return None
 
 
-def _fetch_csrf_token(session: requests.Session) -> str:
+def _fetch_csrf_token(session: requests.Session, settings: Config) -> str:
     response = session.get(
-        config.REDEEM_URL,
-        headers=config.HEADERS,
-        timeout=config.REQUEST_TIMEOUT,
+        settings.REDEEM_URL,
+        headers=settings.HEADERS,
+        timeout=request_timeout(what="CSRF fetch"),
     )
     response.raise_for_status()
     token = _extract_csrf_token(response.text)
@@ -204,37 +235,46 @@ def _response_to_html(response: requests.Response) -> str:
     return response.text
 
 
-def redeem_code(session: requests.Session, code: str) -> str:
-    try:
-        csrf_token = _fetch_csrf_token(session)
-        headers = dict(config.HEADERS)
-        headers.setdefault("Referer", config.REDEEM_URL)
-        headers["X-CSRF-Token"] = csrf_token
-        headers["X-Requested-With"] = "XMLHttpRequest"
-        headers.setdefault(
-            "Accept",
-            "application/json, text/javascript, */*; q=0.01",
-        )
-        headers.setdefault(
-            "Content-Type",
-            "application/x-www-form-urlencoded; charset=UTF-8",
-        )
-        headers.setdefault("Origin", "https://shift.gearboxsoftware.com")
-
-        lookup_payload = {
-            "authenticity_token": csrf_token,
-            "shift_code": code,
-            "utf8": "✓",
-            "commit": "Check",
-        }
+def _lookup_headers(csrf_token: str, settings: Config) -> Dict[str, str]:
+    headers = dict(settings.HEADERS)
+    headers.setdefault("Referer", settings.REDEEM_URL)
+    headers["X-CSRF-Token"] = csrf_token
+    headers["X-Requested-With"] = "XMLHttpRequest"
+    headers.setdefault(
+        "Accept",
+        "application/json, text/javascript, */*; q=0.01",
+    )
+    headers.setdefault(
+        "Content-Type",
+        "application/x-www-form-urlencoded; charset=UTF-8",
+    )
+    headers.setdefault("Origin", settings.BASE_URL)
+    return headers
+
+
+def _post_lookup(
+    session: requests.Session,
+    code: str,
+    csrf_token: str,
+    headers: Dict[str, str],
+    settings: Config,
+) -> requests.Response:
+    lookup_payload = {
+        "authenticity_token": csrf_token,
+        "shift_code": code,
+        "utf8": "✓",
+        "commit": "Check",
+    }
 
-        logger.debug("Submitting code check via POST to %s", config.ENTITLEMENT_URL)
+    entitlement_url = settings.ENTITLEMENT_URL
+    logger.debug("Submitting code check via POST to %s", entitlement_url)
 
+    with timed(REDEEM_STAGE_SECONDS, stage="lookup"), tracer.span("lookup"):
         r = session.post(
-            config.ENTITLEMENT_URL,
+            entitlement_url,
             headers=headers,
             data=lookup_payload,
-            timeout=config.REQUEST_TIMEOUT,
+            timeout=request_timeout(what="lookup"),
         )
         logger.debug(
             "Initial platform lookup status=%s len=%s url=%s",
@@ -242,14 +282,14 @@ def redeem_code(session: requests.Session, code: str) -> str:
             len(r.text),
             r.url,
         )
-        if r.status_code == 404 and not config.ENTITLEMENT_URL.endswith(".json"):
-            alt_url = f"{config.ENTITLEMENT_URL}.json"
+        if r.status_code == 404 and not entitlement_url.endswith(".json"):
+            alt_url = f"{entitlement_url}.json"
             logger.info("Lookup returned 404; retrying with %s", alt_url)
             r = session.post(
                 alt_url,
                 headers=headers,
                 data=lookup_payload,
-                timeout=config.REQUEST_TIMEOUT,
+                timeout=request_timeout(what="lookup"),
             )
             logger.debug(
                 "Retry lookup status=%s len=%s url=%s",
@@ -258,16 +298,98 @@ def redeem_code(session: requests.Session, code: str) -> str:
                 r.url,
             )
 
-        if r.status_code >= 400:
-            logger.warning(
-                "Initial entitlement lookup failed (%s): %s",
-                r.status_code,
-                r.text[:500],
-            )
-            r.raise_for_status()
+    if r.status_code >= 400:
+        logger.warning(
+            "Initial entitlement lookup failed (%s): %s",
+            r.status_code,
+            r.text[:500],
+        )
+        r.raise_for_status()
+    return r
+
+
+def _classify_text(text: str) -> str:
+    text = text.lower()
+    if "expired" in text:
+        return "expired"
+    elif "used" in text:
+        return "used"
+    elif "invalid" in text:
+        return "invalid"
+    elif "success" in text or "redeemed" in text:
+        return "redeemed"
+    else:
+        return "unknown"
+
+
+def classify_lookup(html: str, code: str) -> LookupResult:
+    """Classify a lookup response as available (with platforms) or dead."""
+    parser = _RedeemFormParser()
+    parser.feed(html)
+    parser.close()
+    titles = list(dict.fromkeys(parser.titles))
+    if titles and not any(game_allowed(title) for title in titles):
+        return LookupResult(code=code, status=NOT_APPLICABLE, titles=titles)
+    if parser.forms:
+        platforms = [commit for form in parser.forms for commit in form.commits]
+        return LookupResult(
+            code=code, status=AVAILABLE, platforms=platforms, titles=titles
+        )
+    status = _classify_text(html)
+    if status == "redeemed":
+        status = "unknown"
+    return LookupResult(code=code, status=status)
+
+
+def lookup_code(
+    session: requests.Session, code: str, settings: Optional[Config] = None
+) -> LookupResult:
+    """Run only the CSRF fetch and entitlement lookup; never redeems.
+
+    ``settings`` overrides the global config, e.g. to aim at a stand-in.
+    """
+    settings = settings or config
+    with tracer.span("lookup_only", code=code) as span:
+        try:
+            with timed(REDEEM_STAGE_SECONDS, stage="csrf"), tracer.span("csrf"):
+                csrf_token = _fetch_csrf_token(session, settings)
+            headers = _lookup_headers(csrf_token, settings)
+            r = _post_lookup(session, code, csrf_token, headers, settings)
+            result = classify_lookup(_response_to_html(r), code)
+        except Exception as e:
+            logger.warning(f"Lookup for {code} failed: {e}")
+            result = LookupResult(code=code, status="failed")
+        result.checked_at = get_clock().time()
+        span.set(result=result.status)
+        return result
+
+
+def redeem_code(
+    session: requests.Session, code: str, settings: Optional[Config] = None
+) -> str:
+    """Redeem ``code``; ``settings`` overrides the global config's SHiFT URLs."""
+    with tracer.span("redeem", code=code) as span:
+        result = _redeem_code(session, code, settings or config)
+        span.set(result=result)
+        return result
+
+
+def _redeem_code(session: requests.Session, code: str, settings: Config) -> str:
+    try:
+        with timed(REDEEM_STAGE_SECONDS, stage="csrf"), tracer.span("csrf"):
+            csrf_token = _fetch_csrf_token(session, settings)
+        headers = _lookup_headers(csrf_token, settings)
+        r = _post_lookup(session, code, csrf_token, headers, settings)
 
         html = _response_to_html(r)
-        platform_submission = _select_platform_submission(html, code)
+        lookup = classify_lookup(html, code)
+        if lookup.status == NOT_APPLICABLE:
+            logger.info(
+                f"Skipping {code}: for {', '.join(lookup.titles)}, "
+                "which is not in SHIFT_GAMES"
+            )
+            return NOT_APPLICABLE
+        platform_submission = _select_platform_submission(html, code, settings)
         if platform_submission:
             action_url, payload, commit_label = platform_submission
             payload.setdefault("authenticity_token", csrf_token)
@@ -278,13 +400,16 @@ def redeem_code(session: requests.Session, code: str) -> str:
                 commit_label,
             )
             follow_headers = dict(headers)
-            follow_headers["Referer"] = config.ENTITLEMENT_URL
-            r = session.post(
-                action_url,
-                headers=follow_headers,
-                data=payload,
-                timeout=config.REQUEST_TIMEOUT,
-            )
+            follow_headers["Referer"] = settings.ENTITLEMENT_URL
+            with timed(REDEEM_STAGE_SECONDS, stage="platform"), tracer.span(
+                "platform", platform=commit_label
+            ):
+                r = session.post(
+                    action_url,
+                    headers=follow_headers,
+                    data=payload,
+                    timeout=request_timeout(what="platform redemption"),
+                )
             logger.debug(
                 "Platform redemption status=%s len=%s",
                 r.status_code,
@@ -294,17 +419,7 @@ def redeem_code(session: requests.Session, code: str) -> str:
                 logger.warning("Platform redemption failed: %s", r.text[:500])
                 r.raise_for_status()
 
-        text = r.text.lower()
-        if "expired" in text:
-            return "expired"
-        elif "used" in text:
-            return "used"
-        elif "invalid" in text:
-            return "invalid"
-        elif "success" in text or "redeemed" in text:
-            return "redeemed"
-        else:
-            return "unknown"
+        return _classify_text(r.text)
     except Exception as e:
         logger.error(f"Error redeeeming code {code}: {e}")
         return "failed"
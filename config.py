@@ -1,22 +1,90 @@
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Point SHIFT_BASE_URL at a stand-in server (see shift_standin.py) for testing.
+_SHIFT_BASE_URL = os.getenv(
+    "SHIFT_BASE_URL", "https://shift.gearboxsoftware.com"
+).rstrip("/")
+
 
 @dataclass(frozen=True)
 class Config:
     COOKIES_FILE: str = "cookies.json"
     LOG_FILE: str = "codes_log.json"
     USED_FILE: str = "codes_used.json"
-    REDEEM_URL: str = "https://shift.gearboxsoftware.com/rewards"
-    ENTITLEMENT_URL: str = "https://shift.gearboxsoftware.com/entitlement_offer_codes"
-    LOGIN_URL: str = "https://shift.gearboxsoftware.com/home"
+    BASE_URL: str = _SHIFT_BASE_URL
+    REDEEM_URL: str = f"{_SHIFT_BASE_URL}/rewards"
+    ENTITLEMENT_URL: str = f"{_SHIFT_BASE_URL}/entitlement_offer_codes"
+    LOGIN_URL: str = f"{_SHIFT_BASE_URL}/home"
     SCAN_INTERVAL: int = 3600
     PLAYWRIGHT_TIMEOUT: int = 30000
     REQUEST_TIMEOUT: int = 15
+    # Time boxes: a whole watcher cycle (or Reddit poll) and one code's
+    # redemption across all accounts; every request timeout is capped by
+    # them. Idempotent requests are retried up to HTTP_RETRIES times, drawing
+    # on a shared budget of CYCLE_HTTP_RETRIES per cycle and CODE_HTTP_RETRIES
+    # per code. 0 disables a deadline.
+    CYCLE_DEADLINE: float = float(os.getenv("SHIFT_CYCLE_DEADLINE", "900"))
+    CODE_DEADLINE: float = float(os.getenv("SHIFT_CODE_DEADLINE", "90"))
+    HTTP_RETRIES: int = int(os.getenv("SHIFT_HTTP_RETRIES", "3"))
+    CYCLE_HTTP_RETRIES: int = int(os.getenv("SHIFT_CYCLE_HTTP_RETRIES", "20"))
+    CODE_HTTP_RETRIES: int = int(os.getenv("SHIFT_CODE_HTTP_RETRIES", "4"))
+    # Idle keep-alive connections kept per host by the pooled HTTP sessions.
+    HTTP_POOL_SIZE: int = int(os.getenv("SHIFT_HTTP_POOL_SIZE", "4"))
+    # "record" saves every source/RSS response under CASSETTE_DIR, "replay"
+    # serves them back (plus CASSETTE_LATENCY seconds) instead of the network.
+    CASSETTE_MODE: str = os.getenv("SHIFT_CASSETTE_MODE", "")
+    CASSETTE_DIR: str = os.getenv("SHIFT_CASSETTE_DIR", "cassettes")
+    CASSETTE_LATENCY: float = float(os.getenv("SHIFT_CASSETTE_LATENCY", "0"))
+    # Pages of at least PARSE_INLINE_BYTES are parsed in PARSE_WORKERS
+    # processes while fetching continues (0 workers parses everything inline).
+    PARSE_WORKERS: int = int(
+        os.getenv("SHIFT_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))
+    )
+    PARSE_INLINE_BYTES: int = int(os.getenv("SHIFT_PARSE_INLINE_BYTES", "262144"))
+    SOURCE_HEALTH_FILE: str = "source_health.json"
+    # Skip a source after this many consecutive failures, probing again after
+    # BREAKER_BASE_BACKOFF seconds and doubling up to BREAKER_MAX_BACKOFF.
+    BREAKER_FAILURE_THRESHOLD: int = 3
+    BREAKER_BASE_BACKOFF: int = 3600
+    BREAKER_MAX_BACKOFF: int = 86400
+    # Adaptive per-source polling: intervals are learned between these bounds
+    # and the total polls per hour across all sources stay under the budget.
+    SCHEDULE_FILE: str = "schedule.json"
+    SCHEDULE_MIN_INTERVAL: int = 600
+    SCHEDULE_MAX_INTERVAL: int = 6 * 3600
+    SOURCE_POLL_BUDGET: int = 30
+    REDDIT_SCHEDULE_FILE: str = "schedule_reddit.json"
+    # Durable redemption queue; in-flight items are leased for this long.
+    QUEUE_FILE: str = "redeem_queue.json"
+    QUEUE_LEASE_SECONDS: int = 300
+    QUEUE_RETENTION: int = 7 * 86400
+    # Several watchers sharing work: a SQLite file on storage every instance
+    # can reach (empty runs this instance on its own). Codes are leased there
+    # for QUEUE_LEASE_SECONDS; with COORDINATION_LEADER only the instance
+    # holding the leader lease polls sources, renewing it at least every
+    # KEEPALIVE_INTERVAL, so keep COORDINATION_LEADER_TTL well above that.
+    COORDINATION_DB: str = os.getenv("SHIFT_COORDINATION_DB", "")
+    COORDINATION_LEADER: bool = (
+        os.getenv("SHIFT_COORDINATION_LEADER", "false").lower() == "true"
+    )
+    COORDINATION_LEADER_TTL: int = int(
+        os.getenv("SHIFT_COORDINATION_LEADER_TTL", "1800")
+    )
+    # Per-code discovery/queue/redemption timestamps (see latency.py).
+    LATENCY_FILE: str = "latency.json"
+    LATENCY_RETENTION: int = 30 * 86400
+    # "failed"/"unknown" outcomes are retried after RETRY_BASE_DELAY seconds,
+    # doubling up to RETRY_MAX_DELAY, at most RETRY_MAX_ATTEMPTS times per
+    # code and at most RETRY_BUDGET retries per cycle.
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("SHIFT_RETRY_MAX_ATTEMPTS", "4"))
+    RETRY_BASE_DELAY: int = int(os.getenv("SHIFT_RETRY_BASE_DELAY", "900"))
+    RETRY_MAX_DELAY: int = int(os.getenv("SHIFT_RETRY_MAX_DELAY", str(6 * 3600)))
+    RETRY_BUDGET: int = int(os.getenv("SHIFT_RETRY_BUDGET", "3"))
 
     SOURCES: List[str] = field(
         default_factory=lambda: [
@@ -28,12 +96,29 @@ class Config:
         ]
     )
 
+    # Sources rendered in headless Chromium instead of plain GET (comma
+    # separated hosts, e.g. "x.com,facebook.com"; twitter.com counts as x.com).
+    # The page is read once the host's selector appears (default "body").
+    RENDER_SOURCES: str = os.getenv("SHIFT_RENDER_SOURCES", "")
+    RENDER_CONTEXTS: int = int(os.getenv("SHIFT_RENDER_CONTEXTS", "2"))
+    RENDER_TIMEOUT: int = int(os.getenv("SHIFT_RENDER_TIMEOUT", "20000"))
+    RENDER_MEMORY_MB: int = int(os.getenv("SHIFT_RENDER_MEMORY_MB", "256"))
+    RENDER_PAGES_PER_CONTEXT: int = 50
+    RENDER_SELECTORS: dict[str, str] = field(
+        default_factory=lambda: {
+            "x.com": "article [data-testid='tweetText']",
+            "facebook.com": "[role='article']",
+        }
+    )
+
     HEADERS: dict[str, str] = field(
         default_factory=lambda: {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
         }
     )
     PREFERRED_PLATFORM: str = os.getenv("SHIFT_PLATFORM", "")
+    # Only redeem codes for these titles (comma separated); empty means all.
+    GAMES: str = os.getenv("SHIFT_GAMES", "")
 
     # Security settings
     ENCRYPT_COOKIES: bool = os.getenv("ENCRYPT_COOKIES", "false").lower() == "true"
@@ -41,6 +126,58 @@ class Config:
 
     APPRISE_URL: str = os.getenv("APPRISE_URL", "")
 
+    # Multiple accounts as "name=cookies_file" pairs separated by commas.
+    # Empty means a single "default" account using COOKIES_FILE.
+    ACCOUNTS: str = os.getenv("SHIFT_ACCOUNTS", "")
+    ACCOUNT_RESULTS_FILE: str = "codes_accounts.json"
+    # Between cycles, verify sessions every KEEPALIVE_INTERVAL seconds and
+    # warn when the login cookie (SESSION_COOKIE) expires within
+    # COOKIE_REFRESH_MARGIN. A session that stops verifying is only logged in
+    # again while idle (which opens a browser) from a terminal or with
+    # IDLE_LOGIN; otherwise the next cycle does it. A session verified within
+    # LOGIN_CHECK_TTL is not re-checked when a cycle starts.
+    KEEPALIVE_INTERVAL: int = int(os.getenv("SHIFT_KEEPALIVE_INTERVAL", "600"))
+    COOKIE_REFRESH_MARGIN: int = int(os.getenv("SHIFT_COOKIE_REFRESH_MARGIN", "86400"))
+    SESSION_COOKIE: str = os.getenv("SHIFT_SESSION_COOKIE", "_session_id")
+    IDLE_LOGIN: bool = os.getenv("SHIFT_IDLE_LOGIN", "false").lower() == "true"
+    LOGIN_CHECK_TTL: int = 900
+
+    # Lookup-only results (expired / invalid / available platforms) per code.
+    ENTITLEMENT_CACHE_FILE: str = "entitlements.json"
+    ENTITLEMENT_CACHE_TTL: int = int(os.getenv("SHIFT_ENTITLEMENT_TTL", "86400"))
+    VALIDATE_CONCURRENCY: int = int(os.getenv("SHIFT_VALIDATE_CONCURRENCY", "4"))
+
+    # Local push intake for codes (POST /codes); 0 / empty disables each.
+    INTAKE_PORT: int = int(os.getenv("SHIFT_INTAKE_PORT", "0"))
+    INTAKE_SOCKET: str = os.getenv("SHIFT_INTAKE_SOCKET", "")
+    INTAKE_TOKEN: str = os.getenv("SHIFT_INTAKE_TOKEN", "")
+
+    # Observability settings (0 disables the metrics endpoint)
+    METRICS_PORT: int = int(os.getenv("SHIFT_METRICS_PORT", "0"))
+    METRICS_HOST: str = os.getenv("SHIFT_METRICS_HOST", "127.0.0.1")
+    PROFILE_DIR: str = os.getenv("SHIFT_PROFILE_DIR", "profiles")
+    PROFILE_KEEP: int = int(os.getenv("SHIFT_PROFILE_KEEP", "48"))
+    PROFILE_TOP_N: int = int(os.getenv("SHIFT_PROFILE_TOP_N", "25"))
+    TRACE_FILE: str = os.getenv("SHIFT_TRACE_FILE", "")
+    TRACE_MAX_BYTES: int = int(os.getenv("SHIFT_TRACE_MAX_BYTES", "5000000"))
+    TRACE_BACKUPS: int = int(os.getenv("SHIFT_TRACE_BACKUPS", "5"))
+    # tracemalloc monitoring (--trace-memory); 0 disables the warning
+    MEMORY_TOP_N: int = int(os.getenv("SHIFT_MEMORY_TOP_N", "10"))
+    MEMORY_FRAMES: int = int(os.getenv("SHIFT_MEMORY_FRAMES", "1"))
+    MEMORY_EVERY: int = int(os.getenv("SHIFT_MEMORY_EVERY", "1"))
+    MEMORY_WARN_MB: float = float(os.getenv("SHIFT_MEMORY_WARN_MB", "0"))
+
+    def for_base_url(self, base_url: str) -> "Config":
+        """Copy of this config with every SHiFT URL under ``base_url``."""
+        base_url = base_url.rstrip("/")
+        return replace(
+            self,
+            BASE_URL=base_url,
+            REDEEM_URL=f"{base_url}/rewards",
+            ENTITLEMENT_URL=f"{base_url}/entitlement_offer_codes",
+            LOGIN_URL=f"{base_url}/home",
+        )
+
 
 config = Config()
 # Only require APPRISE_URL if we're actually running the main script
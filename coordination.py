@@ -0,0 +1,310 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from clock import get_clock
+from config import config
+from extractors import ExtractedCode
+from metrics import COORDINATION_CLAIMS, COORDINATION_LEADER
+from utils import logger
+from work_queue import default_owner
+
+CodesBySource = Dict[str, Dict[str, ExtractedCode]]
+
+
+@dataclass(frozen=True)
+class Claim:
+    """Outcome of asking the shared store for the right to redeem a code."""
+
+    granted: bool
+    # Instance holding the code when not granted.
+    owner: str = ""
+    # Final result when another instance already finished the code.
+    result: str = ""
+    # The previous holder's lease had expired (it probably died).
+    takeover: bool = False
+
+
+class Coordinator:
+    """Shared state that lets several watcher instances split the work.
+
+    Each code is redeemed under a lease in the shared store: ``claim()``
+    grants it to one instance at a time, ``finish()`` records the result for
+    everyone and ``hold()``/``release()`` keep or drop it. A lease that is
+    not finished before it expires (the instance died) can be claimed by
+    any other instance. Codes found by one instance are published with
+    ``share_codes()`` so the others queue them too, and with
+    ``elect_leader`` only the instance holding the leader lease for a role
+    polls sources at all.
+
+    Storage is left to subclasses (see ``SQLiteCoordinator``). If the store
+    fails with one of ``store_errors`` the instance carries on alone:
+    claims are granted and it polls as if it were the leader, trading a
+    possible double redemption for not stalling.
+    """
+
+    store_errors: Tuple[type, ...] = ()
+
+    def __init__(
+        self,
+        owner: str = "",
+        elect_leader: bool = False,
+        leader_ttl: float = config.COORDINATION_LEADER_TTL,
+        retention: float = config.QUEUE_RETENTION,
+    ):
+        self.owner = owner or default_owner()
+        self.elect_leader = elect_leader
+        self.leader_ttl = leader_ttl
+        self.retention = retention
+
+    # Storage primitives; ``now`` is always given.
+
+    def _claim(self, code: str, ttl: float, now: float) -> Claim:
+        raise NotImplementedError
+
+    def _finish(self, code: str, result: str, now: float) -> None:
+        raise NotImplementedError
+
+    def _hold(self, code: str, until: float) -> None:
+        raise NotImplementedError
+
+    def _release(self, code: str) -> None:
+        raise NotImplementedError
+
+    def _lead(self, role: str, now: float) -> Tuple[bool, str]:
+        """Take or renew the ``role`` lease; returns (leader, previous owner)."""
+        raise NotImplementedError
+
+    def _share(self, codes_by_source: CodesBySource, now: float) -> CodesBySource:
+        raise NotImplementedError
+
+    def claim(self, code: str, ttl: float, now: Optional[float] = None) -> Claim:
+        """Lease ``code`` to this instance for ``ttl`` seconds if nobody holds it."""
+        now = get_clock().time() if now is None else now
+        try:
+            claim = self._claim(code, ttl, now)
+        except self.store_errors as e:
+            COORDINATION_CLAIMS.inc(result="unavailable")
+            logger.warning(f"Coordination store unavailable; redeeming {code}: {e}")
+            return Claim(granted=True)
+        if claim.result:
+            COORDINATION_CLAIMS.inc(result="finished")
+        elif not claim.granted:
+            COORDINATION_CLAIMS.inc(result="held")
+            logger.debug(f"{code} is being redeemed by {claim.owner}")
+        elif claim.takeover:
+            COORDINATION_CLAIMS.inc(result="takeover")
+            logger.warning(f"Taking over {code} from {claim.owner}; its lease expired")
+        else:
+            COORDINATION_CLAIMS.inc(result="granted")
+        return claim
+
+    def finish(self, code: str, result: str, now: Optional[float] = None) -> None:
+        """Record the final result so no other instance redeems ``code``."""
+        now = get_clock().time() if now is None else now
+        try:
+            self._finish(code, result, now)
+        except self.store_errors as e:
+            logger.warning(f"Could not record {code} as {result} in shared store: {e}")
+
+    def hold(self, code: str, until: float) -> None:
+        """Keep the lease on ``code`` until ``until`` (its scheduled retry)."""
+        try:
+            self._hold(code, until)
+        except self.store_errors as e:
+            logger.warning(f"Could not extend the lease on {code}: {e}")
+
+    def release(self, code: str) -> None:
+        """Give up the lease on an unfinished code so another instance may take it."""
+        try:
+            self._release(code)
+        except self.store_errors as e:
+            logger.warning(f"Could not release the lease on {code}: {e}")
+
+    def polls(self, role: str = "sources", now: Optional[float] = None) -> bool:
+        """Whether this instance should poll ``role`` (always, without election)."""
+        if not self.elect_leader:
+            return True
+        now = get_clock().time() if now is None else now
+        try:
+            leader, previous = self._lead(role, now)
+        except self.store_errors as e:
+            logger.warning(f"Coordination store unavailable; polling {role}: {e}")
+            leader, previous = True, self.owner
+        if leader and previous != self.owner:
+            logger.info(
+                f"Now polling {role}"
+                + (f"; took over from {previous}" if previous else "")
+            )
+        COORDINATION_LEADER.set(1 if leader else 0, role=role)
+        return leader
+
+    def share_codes(
+        self, codes_by_source: CodesBySource, now: Optional[float] = None
+    ) -> CodesBySource:
+        """Publish this instance's finds and return them merged with everyone's.
+
+        Codes another instance published first are added under that
+        instance's source, after the local ones.
+        """
+        now = get_clock().time() if now is None else now
+        try:
+            shared = self._share(codes_by_source, now)
+        except self.store_errors as e:
+            logger.warning(f"Could not exchange codes with other instances: {e}")
+            return codes_by_source
+        merged = {url: dict(found) for url, found in codes_by_source.items()}
+        local = {code for found in codes_by_source.values() for code in found}
+        for url, found in shared.items():
+            for code, details in found.items():
+                if code not in local:
+                    merged.setdefault(url, {})[code] = details
+        return merged
+
+
+class SQLiteCoordinator(Coordinator):
+    """Coordinator backed by one SQLite file on storage every instance can reach.
+
+    Every change runs in an ``IMMEDIATE`` transaction, so SQLite's own file
+    locking serialises instances. Lease expiry compares wall clocks, so hosts
+    need synchronised time (NTP). SQLite locking is only as reliable as the
+    shared filesystem's: dependable on a local disk shared by several
+    processes or containers, but broken on some NFS setups.
+    """
+
+    store_errors = (sqlite3.Error,)
+
+    def __init__(self, path: str, busy_timeout: float = 10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS claims (code TEXT PRIMARY KEY, "
+                "owner TEXT NOT NULL, expires REAL NOT NULL, "
+                "result TEXT NOT NULL DEFAULT '', finished_at REAL NOT NULL DEFAULT 0)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leaders (role TEXT PRIMARY KEY, "
+                "owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS codes (code TEXT PRIMARY KEY, "
+                "source TEXT NOT NULL, details TEXT NOT NULL, "
+                "publisher TEXT NOT NULL, published_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def _claim(self, code: str, ttl: float, now: float) -> Claim:
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT owner, expires, result FROM claims WHERE code = ?", (code,)
+            ).fetchone()
+            if row is not None:
+                owner, expires, result = row
+                if result:
+                    return Claim(granted=False, owner=owner, result=result)
+                if owner != self.owner and expires > now:
+                    return Claim(granted=False, owner=owner)
+            db.execute(
+                "INSERT INTO claims (code, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(code) DO UPDATE SET owner = excluded.owner, "
+                "expires = excluded.expires",
+                (code, self.owner, now + ttl),
+            )
+        takeover = row is not None and row[0] != self.owner
+        return Claim(granted=True, owner=row[0] if takeover else "", takeover=takeover)
+
+    def _finish(self, code: str, result: str, now: float) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO claims (code, owner, expires, result, finished_at) "
+                "VALUES (?, ?, 0, ?, ?) ON CONFLICT(code) DO UPDATE SET "
+                "owner = excluded.owner, result = excluded.result, "
+                "finished_at = excluded.finished_at",
+                (code, self.owner, result, now),
+            )
+
+    def _hold(self, code: str, until: float) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE claims SET expires = ? WHERE code = ? AND owner = ? "
+                "AND result = ''",
+                (until, code, self.owner),
+            )
+
+    def _release(self, code: str) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "DELETE FROM claims WHERE code = ? AND owner = ? AND result = ''",
+                (code, self.owner),
+            )
+
+    def _lead(self, role: str, now: float) -> Tuple[bool, str]:
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT owner, expires FROM leaders WHERE role = ?", (role,)
+            ).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                return False, row[0]
+            db.execute(
+                "INSERT INTO leaders (role, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(role) DO UPDATE SET owner = excluded.owner, "
+                "expires = excluded.expires",
+                (role, self.owner, now + self.leader_ttl),
+            )
+        return True, row[0] if row is not None else ""
+
+    def _share(self, codes_by_source: CodesBySource, now: float) -> CodesBySource:
+        cutoff = now - self.retention
+        rows: List[Tuple[str, str, str]]
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO codes "
+                "(code, source, details, publisher, published_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (code, url, json.dumps(asdict(details)), self.owner, now)
+                    for url, found in codes_by_source.items()
+                    for code, details in found.items()
+                ],
+            )
+            db.execute("DELETE FROM codes WHERE published_at < ?", (cutoff,))
+            db.execute(
+                "DELETE FROM claims WHERE (result != '' AND finished_at < ?) "
+                "OR (result = '' AND expires < ?)",
+                (cutoff, cutoff),
+            )
+            rows = db.execute("SELECT code, source, details FROM codes").fetchall()
+        shared: CodesBySource = {}
+        # Rows published by older versions may carry fields since dropped.
+        known = {f.name for f in fields(ExtractedCode)}
+        for code, url, details in rows:
+            values = {k: v for k, v in json.loads(details).items() if k in known}
+            shared.setdefault(url, {})[code] = ExtractedCode(**values)
+        return shared
+
+
+def make_coordinator(
+    path: str = config.COORDINATION_DB,
+    elect_leader: bool = config.COORDINATION_LEADER,
+) -> Optional[Coordinator]:
+    """The configured coordinator, or None when instances run independently."""
+    if not path:
+        return None
+    return SQLiteCoordinator(path, elect_leader=elect_leader)
@@ -0,0 +1,165 @@
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import requests
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from clock import get_clock
+from config import config
+from metrics import DEADLINES_EXCEEDED, HTTP_RETRIES
+from utils import logger
+
+# Requests are not started with less time than this left on the deadline.
+MIN_REQUEST_SECONDS = 0.5
+# Only idempotent requests are retried by the adapter. Redemption POSTs are
+# never replayed; a failed redemption is retried later by the work queue,
+# which starts again with a fresh lookup.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_budget_lock = threading.Lock()
+
+
+class DeadlineExceeded(requests.Timeout):
+    """No time is left on the current deadline to start a request."""
+
+
+class Deadline:
+    """Time box for a scope (cycle, code, ...) plus an optional retry budget.
+
+    A nested deadline never ends after its parent, and retries drawn inside
+    it also count against every enclosing budget, so one code's retries
+    cannot use up more than the cycle allows. ``retries=None`` means the
+    scope adds no budget of its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        seconds: float,
+        retries: Optional[int] = None,
+        parent: Optional["Deadline"] = None,
+    ):
+        self.name = name
+        self.parent = parent
+        self.retries = retries
+        self.at = get_clock().monotonic() + seconds if seconds > 0 else math.inf
+        if parent is not None:
+            self.at = min(self.at, parent.at)
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - get_clock().monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def _chain(self) -> Iterator["Deadline"]:
+        scope: Optional[Deadline] = self
+        while scope is not None:
+            yield scope
+            scope = scope.parent
+
+    def take_retry(self) -> bool:
+        """Spend one retry from this scope and every enclosing one, if all allow."""
+        with _budget_lock:
+            scopes = [s for s in self._chain() if s.retries is not None]
+            if any(s.retries <= 0 for s in scopes):
+                return False
+            for scope in scopes:
+                scope.retries -= 1
+            return True
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline(
+    name: str, seconds: float, retries: Optional[int] = None
+) -> Iterator[Deadline]:
+    """Run the wrapped block under a deadline nested in the current one.
+
+    ``seconds <= 0`` adds no time limit of its own. The deadline follows the
+    context, so work submitted with ``contextvars.copy_context().run`` (as
+    the multi-account fan-out does) inherits it.
+    """
+    scope = Deadline(name, seconds, retries, parent=_current.get())
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
+
+
+def remaining() -> float:
+    """Seconds left on the current deadline (infinite outside any deadline)."""
+    scope = _current.get()
+    return math.inf if scope is None else scope.remaining()
+
+
+def time_left_for(seconds: float) -> bool:
+    """Whether the current deadline still leaves ``seconds`` for new work."""
+    return remaining() >= max(seconds, MIN_REQUEST_SECONDS)
+
+
+def check(what: str = "request") -> None:
+    """Raise DeadlineExceeded when too little time is left to start ``what``."""
+    scope = _current.get()
+    if scope is not None and scope.remaining() < MIN_REQUEST_SECONDS:
+        DEADLINES_EXCEEDED.inc(scope=scope.name)
+        raise DeadlineExceeded(f"{scope.name} deadline reached before {what}")
+
+
+def request_timeout(default: Optional[float] = None, what: str = "request") -> float:
+    """Per-request timeout: ``default`` (REQUEST_TIMEOUT) capped by the deadline."""
+    check(what)
+    default = config.REQUEST_TIMEOUT if default is None else default
+    return min(default, remaining())
+
+
+class BudgetedRetry(Retry):
+    """urllib3 Retry that respects the current deadline and retry budgets.
+
+    A retry is only attempted if its backoff (or Retry-After) plus a full
+    ``REQUEST_TIMEOUT`` still fits before the deadline and every enclosing
+    retry budget has a retry left; otherwise the request fails right away
+    instead of sleeping past the time box.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, **kwargs):
+        new_retry = super().increment(
+            method=method, url=url, response=response, error=error, **kwargs
+        )
+        wait = new_retry.get_backoff_time()
+        if response is not None:
+            wait = max(wait, new_retry.get_retry_after(response) or 0.0)
+        scope = _current.get()
+        allowed = scope is None or (
+            wait + config.REQUEST_TIMEOUT <= scope.remaining() and scope.take_retry()
+        )
+        HTTP_RETRIES.inc(result="allowed" if allowed else "denied")
+        if not allowed:
+            logger.debug(f"Not retrying {method} {url}: {scope.name} budget spent")
+            reason = error or ResponseError("retry budget or deadline exhausted")
+            raise MaxRetryError(kwargs.get("_pool"), url, reason) from reason
+        return new_retry
+
+
+def make_retry(total: Optional[int] = None, **kwargs: Any) -> BudgetedRetry:
+    """Retry policy for SHiFT sessions: idempotent methods only, short backoff."""
+    kwargs.setdefault("allowed_methods", IDEMPOTENT_METHODS)
+    kwargs.setdefault("status_forcelist", [429, 500, 502, 503, 504])
+    kwargs.setdefault("backoff_factor", 0.5)
+    # backoff_max is a Retry argument from urllib3 2.0 (see requirements.txt).
+    kwargs.setdefault("backoff_max", 8)
+    return BudgetedRetry(
+        total=config.HTTP_RETRIES if total is None else total, **kwargs
+    )
@@ -0,0 +1,168 @@
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from clock import get_clock
+from config import config
+from utils import load_json, logger, save_json_atomic
+
+AVAILABLE = "available"
+# Lookup outcomes that hold for every account, so redemption can be skipped.
+# "not_applicable" is a code for a title outside SHIFT_GAMES.
+DEAD_STATUSES = ("expired", "invalid", "not_applicable")
+
+
+@dataclass
+class LookupResult:
+    """What the entitlement lookup says about a code, without redeeming it."""
+
+    code: str
+    status: str
+    platforms: List[str] = field(default_factory=list)
+    checked_at: float = 0.0
+    titles: List[str] = field(default_factory=list)
+
+    @property
+    def dead(self) -> bool:
+        return self.status in DEAD_STATUSES
+
+
+class EntitlementCache:
+    """Lookup results keyed by code, kept for ``ttl`` seconds.
+
+    Only ``save()`` writes the file, so callers decide when to persist (the
+    watcher does it once per cycle).
+    """
+
+    def __init__(self, path: str = "", ttl: float = config.ENTITLEMENT_CACHE_TTL):
+        self.path = path or config.ENTITLEMENT_CACHE_FILE
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        known = {f.name for f in fields(LookupResult)}
+        raw = load_json(self.path, {})
+        self.results: Dict[str, LookupResult] = {}
+        if isinstance(raw, dict):
+            for code, data in raw.items():
+                values = {k: v for k, v in data.items() if k in known}
+                values["code"] = code
+                self.results[code] = LookupResult(**values)
+
+    def get(self, code: str, now: Optional[float] = None) -> Optional[LookupResult]:
+        now = get_clock().time() if now is None else now
+        with self._lock:
+            result = self.results.get(code)
+        if result is None or now - result.checked_at > self.ttl:
+            return None
+        return result
+
+    def dead_status(self, code: str, now: Optional[float] = None) -> Optional[str]:
+        """A fresh dead status (expired, invalid, not applicable) or None."""
+        result = self.get(code, now)
+        return result.status if result is not None and result.dead else None
+
+    def record(self, result: LookupResult) -> None:
+        if not result.checked_at:
+            result.checked_at = get_clock().time()
+        with self._lock:
+            self.results[result.code] = result
+
+    def save(self, now: Optional[float] = None) -> None:
+        now = get_clock().time() if now is None else now
+        with self._lock:
+            self.results = {
+                code: result
+                for code, result in self.results.items()
+                if now - result.checked_at <= self.ttl
+            }
+            data = {code: asdict(result) for code, result in self.results.items()}
+        save_json_atomic(self.path, data)
+
+
+def _clone_session(session: requests.Session) -> requests.Session:
+    from session_manager import get_session_with_retry
+
+    clone = get_session_with_retry()
+    clone.cookies.update(session.cookies)
+    return clone
+
+
+def validate_codes(
+    session: requests.Session,
+    codes: Iterable[str],
+    cache: EntitlementCache,
+    concurrency: int = config.VALIDATE_CONCURRENCY,
+    refresh: bool = False,
+) -> Dict[str, LookupResult]:
+    """Run only the entitlement lookup for ``codes`` and cache the results.
+
+    Nothing is redeemed. Codes with a fresh cached result are not looked up
+    again unless ``refresh`` is set. Each worker thread uses its own copy of
+    ``session`` so lookups run concurrently on separate connections.
+    """
+    from code_redeemer import lookup_code
+
+    results: Dict[str, LookupResult] = {}
+    pending: List[str] = []
+    for code in dict.fromkeys(codes):
+        cached = None if refresh else cache.get(code)
+        if cached is not None:
+            results[code] = cached
+        else:
+            pending.append(code)
+    if not pending:
+        return results
+
+    workers = max(1, min(concurrency, len(pending)))
+    local = threading.local()
+
+    def _lookup(code: str) -> LookupResult:
+        if not hasattr(local, "session"):
+            local.session = _clone_session(session)
+        return lookup_code(local.session, code)
+
+    logger.info(f"Looking up {len(pending)} code(s) with {workers} worker(s)")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup") as pool:
+        for result in pool.map(_lookup, pending):
+            results[result.code] = result
+            if result.status != "failed":
+                cache.record(result)
+    return results
+
+
+if __name__ == "__main__":
+    from extractors import extract_codes_from_text
+    from session_manager import get_session, verify_login
+
+    parser = argparse.ArgumentParser(
+        description="Check codes with the entitlement lookup only (no redemption)"
+    )
+    parser.add_argument("file", help="Text file with codes, or - for stdin")
+    parser.add_argument("--concurrency", type=int, default=config.VALIDATE_CONCURRENCY)
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached results")
+    parser.add_argument("--cookies", default=config.COOKIES_FILE)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    with source:
+        codes = sorted(extract_codes_from_text(source.read()))
+
+    session = get_session(args.cookies)
+    if not verify_login(session):
+        sys.exit("Not logged in; run the watcher once to refresh cookies")
+    cache = EntitlementCache()
+    results = validate_codes(session, codes, cache, args.concurrency, args.refresh)
+    cache.save()
+
+    for code in codes:
+        result = results[code]
+        details = ", ".join(result.platforms or result.titles)
+        print(f"{code}  {result.status:<14}  {details}")
+    counts: Dict[str, int] = {}
+    for result in results.values():
+        counts[result.status] = counts.get(result.status, 0) + 1
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
@@ -0,0 +1,382 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Set, Tuple
+
+from clock import get_clock
+from metrics import CODES_REJECTED
+from utils import logger
+
+# Matches any case; codes are upper-cased by _find_codes. The lookarounds keep
+# it from matching inside a longer run of letters and digits.
+CODE_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])[A-Za-z0-9]{5}(?:-[A-Za-z0-9]{5}){4}(?![A-Za-z0-9])"
+)
+
+# Characters that change how a pasted code looks but not what it is. NFKC
+# already folds full-width letters and most space variants; these remain.
+_ZERO_WIDTH = re.compile(r"[\u00ad\u180e\u200b-\u200d\u2060\ufeff]")
+_DASHES = re.compile(r"[\u2010-\u2015\u2212\u2e3a\u2e3b\ufe58\ufe63\uff0d]")
+_SPACES = re.compile(r"[^\S\n]")
+
+_EXPIRY_HINT = re.compile(
+    r"expir|until|valid|\bends?\b|\d{1,2}[/.-]\d{1,2}|\b(?:jan|feb|mar|apr|may|jun|"
+    r"jul|aug|sep|oct|nov|dec)[a-z]*\b|unknown|permanent|never",
+    re.IGNORECASE,
+)
+
+_MONTHS = {
+    name: index
+    for index, names in enumerate(
+        [
+            ("jan", "january"),
+            ("feb", "february"),
+            ("mar", "march"),
+            ("apr", "april"),
+            ("may",),
+            ("jun", "june"),
+            ("jul", "july"),
+            ("aug", "august"),
+            ("sep", "sept", "september"),
+            ("oct", "october"),
+            ("nov", "november"),
+            ("dec", "december"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+_MONTH_DAY = re.compile(
+    r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?\s+"
+    r"(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?",
+    re.IGNORECASE,
+)
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_RELATIVE = re.compile(r"\b(\d{1,3})\s*(hours?|hrs?|days?)\b", re.IGNORECASE)
+_NO_EXPIRY = re.compile(r"\b(unknown|permanent|never|no expir)", re.IGNORECASE)
+_EXPIRY_PHRASE = re.compile(
+    r"(?:expir\w*|until|ends?)[^.\n<()|;]{0,60}", re.IGNORECASE
+)
+# Generic pages: how much text after a code may describe it.
+_HINT_WINDOW = 160
+
+# Elements whose text never contains codes worth redeeming.
+_SKIPPED_TAGS = {"script", "style", "noscript", "nav", "aside", "footer", "header"}
+
+
+@dataclass
+class ExtractedCode:
+    """A code found on a page plus whatever metadata the page offered."""
+
+    code: str
+    reward: str = ""
+    expires: str = ""
+
+
+Extractor = Callable[[str], List[ExtractedCode]]
+
+_REGISTRY: List[Tuple[Pattern[str], Extractor]] = []
+
+
+def register_extractor(url_pattern: str) -> Callable[[Extractor], Extractor]:
+    """Register an extractor for URLs matching ``url_pattern`` (regex search)."""
+
+    def decorator(func: Extractor) -> Extractor:
+        _REGISTRY.append((re.compile(url_pattern, re.IGNORECASE), func))
+        return func
+
+    return decorator
+
+
+def get_extractor(url: str) -> Extractor:
+    """Return the first registered extractor matching ``url`` or the generic one."""
+    for pattern, extractor in _REGISTRY:
+        if pattern.search(url):
+            return extractor
+    return extract_generic
+
+
+def normalize_text(text: str) -> str:
+    """Fold the Unicode variants a pasted code may arrive in to plain ASCII.
+
+    Applies NFKC, drops zero-width characters and soft hyphens, and maps
+    Unicode dashes and spaces to ``-`` and `` ``. Newlines are kept so the
+    line-based hint lookups still work. Case is left alone; see
+    ``CODE_PATTERN``.
+    """
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKC", text)
+    text = _ZERO_WIDTH.sub("", text)
+    text = _DASHES.sub("-", text)
+    return _SPACES.sub(" ", text)
+
+
+def is_placeholder_code(code: str) -> bool:
+    """Whether ``code`` is an obvious placeholder rather than a real code.
+
+    Catches masked groups (``XXXXX``, ``00000``), the same group repeated
+    and codes built from only a couple of distinct characters.
+    """
+    groups = code.split("-")
+    if any(len(set(group)) == 1 for group in groups):
+        return True
+    if len(set(groups)) < len(groups):
+        return True
+    return len(set(code.replace("-", ""))) <= 3
+
+
+def _find_codes(text: str) -> Iterator[Tuple[str, "re.Match[str]"]]:
+    """Yield ``(code, match)`` for every plausible code in normalized text.
+
+    Lower-case matches without a digit are hyphenated words or URL slugs,
+    not codes, and placeholders are dropped; both are counted in
+    ``CODES_REJECTED``.
+    """
+    for match in CODE_PATTERN.finditer(text):
+        raw = match.group(0)
+        if not raw.isupper() and not any(c.isdigit() for c in raw):
+            continue
+        code = raw.upper()
+        if is_placeholder_code(code):
+            logger.debug(f"Ignoring placeholder code {code}")
+            CODES_REJECTED.inc()
+            continue
+        yield code, match
+
+
+def extract_codes_from_text(text: str) -> Set[str]:
+    """Extract SHiFT codes from text in any case, skipping placeholders."""
+    return {code for code, _ in _find_codes(normalize_text(text))}
+
+
+def extract_from_page(url: str, html: str) -> Dict[str, ExtractedCode]:
+    """Run the extractor registered for ``url`` and index results by code."""
+    results: Dict[str, ExtractedCode] = {}
+    for item in get_extractor(url)(normalize_text(html)):
+        existing = results.get(item.code)
+        if existing is None:
+            results[item.code] = item
+        else:
+            existing.reward = existing.reward or item.reward
+            existing.expires = existing.expires or item.expires
+    return results
+
+
+class _BlockParser(HTMLParser):
+    """Collect table rows and list items as lists of cell texts.
+
+    When ``region`` is given as ``(tag, class_fragment)`` only blocks inside a
+    matching element are kept. Scripts, styles, navigation, headers, footers
+    and sidebars are skipped entirely; comments are ignored by HTMLParser.
+    """
+
+    def __init__(
+        self, region: Optional[Tuple[str, str]] = None, lists: bool = True
+    ) -> None:
+        super().__init__(convert_charrefs=True)
+        self.region = region
+        self.lists = lists
+        self.blocks: List[List[str]] = []
+        self._skip_depth = 0
+        self._region_depth = 0 if region else 1
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._item: Optional[List[str]] = None
+
+    def _in_region(self) -> bool:
+        return self._region_depth > 0 and self._skip_depth == 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+        self._enter_region(tag, attrs)
+        if self._in_region():
+            self._open_block(tag)
+
+    def _enter_region(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        """Track nesting of the region element (entering it on a class match)."""
+        if not self.region or tag != self.region[0]:
+            return
+        if self._region_depth:
+            self._region_depth += 1
+        elif self.region[1] in (dict(attrs).get("class") or ""):
+            self._region_depth = 1
+
+    def _open_block(self, tag: str) -> None:
+        if tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+        elif tag == "li" and self.lists and self._row is None:
+            self._item = []
+        elif tag == "br":
+            self.handle_data(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self.region and self._region_depth and tag == self.region[0]:
+            self._region_depth -= 1
+        if tag in ("td", "th") and self._row is not None and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if any(self._row):
+                self.blocks.append(self._row)
+            self._row = None
+        elif tag == "li" and self._item is not None:
+            text = " ".join("".join(self._item).split())
+            if text:
+                self.blocks.append([text])
+            self._item = None
+
+    def handle_data(self, data: str) -> None:
+        if not self._in_region():
+            return
+        if self._cell is not None:
+            self._cell.append(data)
+        elif self._item is not None:
+            self._item.append(data)
+
+
+def _codes_from_blocks(blocks: List[List[str]]) -> List[ExtractedCode]:
+    """Turn table rows / list items into codes with reward and expiry hints."""
+    results: List[ExtractedCode] = []
+    for cells in blocks:
+        row_text = " ".join(cells)
+        codes = [code for code, _ in _find_codes(row_text)]
+        if not codes:
+            continue
+        others = [c for c in cells if c and not CODE_PATTERN.search(c)]
+        if len(cells) == 1:
+            # List item: split the remaining description into parts.
+            description = CODE_PATTERN.sub("", cells[0])
+            others = [
+                part.strip(" -:|–—")
+                for part in re.split(r"\s[-–—|:]\s|[()]", description)
+                if part.strip(" -:|–—")
+            ]
+        expires = next((c for c in others if _EXPIRY_HINT.search(c)), "")
+        reward = next((c for c in others if c and c != expires), "")
+        for code in codes:
+            results.append(ExtractedCode(code=code, reward=reward, expires=expires))
+    return results
+
+
+def _extract_blocks(
+    html: str, region: Optional[Tuple[str, str]] = None, lists: bool = True
+) -> List[ExtractedCode]:
+    parser = _BlockParser(region=region, lists=lists)
+    parser.feed(html)
+    parser.close()
+    return _codes_from_blocks(parser.blocks)
+
+
+def _end_of_day(year: int, month: int, day: int) -> Optional[float]:
+    try:
+        return datetime(year, month, day, 23, 59, 59).timestamp()
+    except ValueError:
+        return None
+
+
+def _roll_forward(month: int, day: int, year: Optional[int], now: datetime):
+    """Resolve a date without a year to the next occurrence after ``now``."""
+    if year is not None:
+        return _end_of_day(year, month, day)
+    stamp = _end_of_day(now.year, month, day)
+    if stamp is not None and stamp < now.timestamp() - 30 * 86400:
+        stamp = _end_of_day(now.year + 1, month, day)
+    return stamp
+
+
+def parse_expiry_hint(text: str, now: Optional[float] = None) -> Optional[float]:
+    """Turn an expiry hint such as ``"Expires Oct 31"`` into a timestamp.
+
+    Dates resolve to the end of that local day; relative hints (``"48
+    hours"``) count from ``now``. Returns None when there is no usable hint
+    or the page says the code does not expire.
+    """
+    if not text or _NO_EXPIRY.search(text):
+        return None
+    now = get_clock().time() if now is None else now
+    current = datetime.fromtimestamp(now)
+
+    match = _ISO_DATE.search(text)
+    if match:
+        return _end_of_day(*(int(group) for group in match.groups()))
+    match = _MONTH_DAY.search(text)
+    if match:
+        year = int(match.group(3)) if match.group(3) else None
+        month = _MONTHS[match.group(1).lower()]
+        return _roll_forward(month, int(match.group(2)), year, current)
+    match = _NUMERIC_DATE.search(text)
+    if match:
+        year_text = match.group(3)
+        year = None
+        if year_text:
+            year = int(year_text) + (2000 if len(year_text) == 2 else 0)
+        return _roll_forward(int(match.group(1)), int(match.group(2)), year, current)
+    match = _RELATIVE.search(text)
+    if match:
+        amount = int(match.group(1))
+        unit = timedelta(days=1) if match.group(2).lower().startswith("d") else None
+        seconds = (unit or timedelta(hours=1)).total_seconds() * amount
+        return now + seconds
+    lowered = text.lower()
+    if "today" in lowered or "tonight" in lowered:
+        return _end_of_day(current.year, current.month, current.day)
+    if "tomorrow" in lowered:
+        tomorrow = current + timedelta(days=1)
+        return _end_of_day(tomorrow.year, tomorrow.month, tomorrow.day)
+    return None
+
+
+def _expiry_hint_after(text: str, end: int) -> str:
+    """Return the expiry phrase in the text that follows a code, if any."""
+    limit = end + _HINT_WINDOW
+    window = text[end:limit]
+    following = CODE_PATTERN.search(window)
+    if following:
+        window = window[: following.start()]
+    window = re.sub(r"<[^>]*>", " ", window)
+    match = _EXPIRY_PHRASE.search(window)
+    return " ".join(match.group(0).split()) if match else ""
+
+
+def extract_generic(html: str) -> List[ExtractedCode]:
+    """Fallback: regex over the whole document, with nearby expiry hints."""
+    html = normalize_text(html)
+    results: Dict[str, ExtractedCode] = {}
+    for code, match in _find_codes(html):
+        hint = _expiry_hint_after(html, match.end())
+        if code not in results:
+            results[code] = ExtractedCode(code=code, expires=hint)
+        elif hint and not results[code].expires:
+            results[code].expires = hint
+    return [results[code] for code in sorted(results)]
+
+
+@register_extractor(r"ign\.com/wikis/")
+def extract_ign_wiki(html: str) -> List[ExtractedCode]:
+    """IGN wiki pages list active codes in tables; sidebars use lists."""
+    results = _extract_blocks(html, lists=False)
+    if not results:
+        logger.debug("IGN extractor found no code table; using generic extractor")
+        return extract_generic(html)
+    return results
+
+
+@register_extractor(r"game8\.co/")
+def extract_game8(html: str) -> List[ExtractedCode]:
+    """game8 archive pages keep codes in tables and lists in the article body."""
+    results = _extract_blocks(html, region=("div", "archive-style-wrapper"))
+    if not results:
+        logger.debug("game8 extractor found no article body; using generic extractor")
+        return extract_generic(html)
+    return results
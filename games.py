@@ -0,0 +1,51 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from config import config
+
+NOT_APPLICABLE = "not_applicable"
+
+# Canonical title -> phrases that identify it in page text, URLs and the
+# headings of the SHiFT lookup response (compared after _normalize).
+GAME_ALIASES: Dict[str, List[str]] = {
+    "Borderlands 4": ["borderlands 4", "bl4"],
+    "Borderlands 3": ["borderlands 3", "bl3"],
+    "Tiny Tina's Wonderlands": ["wonderlands", "tiny tina s wonderlands", "ttw"],
+    "Borderlands: The Pre-Sequel": ["pre sequel", "presequel", "bltps"],
+    "Borderlands 2": ["borderlands 2", "bl2"],
+    "Borderlands GOTY": ["borderlands goty", "game of the year"],
+}
+
+
+def _normalize(text: str) -> str:
+    return " " + " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split()) + " "
+
+
+def detect_game(text: str) -> str:
+    """Canonical title mentioned in ``text`` or "" if none (or several)."""
+    normalized = _normalize(text)
+    found = {
+        game
+        for game, aliases in GAME_ALIASES.items()
+        if any(f" {alias} " in normalized for alias in aliases)
+    }
+    return found.pop() if len(found) == 1 else ""
+
+
+def allowed_games(spec: Optional[str] = None) -> List[str]:
+    """Titles from ``SHIFT_GAMES`` (comma separated); empty means all."""
+    spec = config.GAMES if spec is None else spec
+    games = []
+    for entry in spec.split(","):
+        if entry.strip():
+            games.append(detect_game(entry) or entry.strip())
+    return games
+
+
+def game_allowed(game: str, allow: Optional[Iterable[str]] = None) -> bool:
+    """Whether codes for ``game`` should be redeemed; unknown titles pass."""
+    allow = allowed_games() if allow is None else list(allow)
+    if not game or not allow:
+        return True
+    canonical = detect_game(game) or game
+    return canonical in allow
@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cassette import Cassette, load_cassette
+from config import config
+from deadlines import make_retry, request_timeout
+from tracing import tracer
+from utils import logger
+
+# Hosts that serve the same content and can share one connection pool.
+_HOST_ALIASES = {"twitter.com": "x.com", "old.reddit.com": "reddit.com"}
+
+
+def host_group(url: str) -> str:
+    """Group key for ``url``: its host without ``www.`` and known mirrors."""
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return _HOST_ALIASES.get(host, host)
+
+
+def make_adapter(pool_size: int = config.HTTP_POOL_SIZE, **kwargs) -> HTTPAdapter:
+    """HTTPAdapter that keeps up to ``pool_size`` idle connections per host."""
+    return HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, **kwargs)
+
+
+def configure_session(session: requests.Session, adapter: HTTPAdapter) -> None:
+    """Mount ``adapter`` on both schemes and apply the default headers.
+
+    requests already asks for keep-alive and gzip/deflate responses by
+    default, so no extra headers are needed for either.
+    """
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(config.HEADERS)
+
+
+class SessionPool:
+    """Long-lived ``requests.Session`` objects, one per host group.
+
+    Sources are polled repeatedly, so keeping their sessions (and the pooled
+    TCP/TLS connections behind them) across cycles avoids a fresh handshake
+    for every page. Sessions are created lazily and are safe to share between
+    threads for plain GET requests. Failed GETs are retried with the same
+    ``BudgetedRetry`` policy as SHiFT sessions, so a flaky source is retried
+    only while the cycle's deadline and retry budget allow.
+
+    With a ``cassette`` in record mode every response is also saved; in replay
+    mode responses come from the cassette and the network is never touched.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = config.HTTP_POOL_SIZE,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.pool_size = pool_size
+        self.cassette = cassette
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        group = host_group(url)
+        with self._lock:
+            session = self._sessions.get(group)
+            if session is None:
+                session = requests.Session()
+                adapter = make_adapter(self.pool_size, max_retries=make_retry())
+                configure_session(session, adapter)
+                self._sessions[group] = session
+            return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        if self.cassette is not None and self.cassette.replaying:
+            return self.cassette.replay(url)
+        if "timeout" not in kwargs:
+            kwargs["timeout"] = request_timeout(what=f"fetching {url}")
+        response = self.session_for(url).get(url, **kwargs)
+        if self.cassette is not None:
+            self.cassette.record(url, response)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def prewarm(
+    session: requests.Session, url: str, timeout: Optional[float] = None
+) -> bool:
+    """Open a pooled connection to ``url``'s host before it is needed.
+
+    A cheap HEAD request leaves a keep-alive connection in the session's pool,
+    so the next real request skips DNS, TCP and TLS setup. Failures are only
+    logged; the real request will report them.
+    """
+    start = time.perf_counter()
+    try:
+        with tracer.span("prewarm", host=host_group(url)):
+            session.head(
+                url, timeout=request_timeout(timeout), allow_redirects=False
+            )
+    except requests.RequestException as e:
+        logger.debug(f"Pre-warming {url} failed: {e}")
+        return False
+    logger.debug(f"Pre-warmed {url} in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+http_pool = SessionPool(cassette=load_cassette())
@@ -0,0 +1,180 @@
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from config import config
+from extractors import extract_codes_from_text
+from metrics import FRESH_CODES
+from utils import load_json, logger
+from work_queue import WorkQueue
+
+INTAKE_SOURCE = "intake"
+# Largest request body accepted (a pasted chat log is far smaller).
+_MAX_BODY = 64 * 1024
+
+
+def stored_codes_known(code: str) -> bool:
+    """Whether ``code`` is already in ``codes_log.json`` or ``codes_used.json``."""
+    return code in load_json(config.LOG_FILE, []) or code in load_json(
+        config.USED_FILE, []
+    )
+
+
+class CodeIntake:
+    """Validate submitted codes, queue the new ones and wake the watcher.
+
+    ``known`` decides whether a code was already seen (by default the code
+    log and used list on disk); anything already in the queue is skipped too.
+    ``wake`` is set whenever a code is queued so the main loop can stop
+    sleeping and redeem it right away.
+    """
+
+    def __init__(
+        self,
+        work_queue: WorkQueue,
+        known: Callable[[str], bool] = stored_codes_known,
+        wake: Optional[threading.Event] = None,
+    ):
+        self.work_queue = work_queue
+        self.known = known
+        self.wake = wake or threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, entries: List[str], source: str = INTAKE_SOURCE) -> Dict:
+        """Queue every valid, unseen code in ``entries``.
+
+        Each entry may be a bare code or free text (such as a pasted chat
+        message) containing codes.
+        """
+        report: Dict[str, List[str]] = {"queued": [], "duplicate": [], "invalid": []}
+        codes: List[str] = []
+        for entry in entries:
+            found = sorted(extract_codes_from_text(str(entry)))
+            if not found:
+                report["invalid"].append(str(entry)[:64])
+            codes.extend(c for c in found if c not in codes)
+
+        with self._lock:
+            for code in codes:
+                if code in self.work_queue or self.known(code):
+                    report["duplicate"].append(code)
+                elif self.work_queue.enqueue(code, source=source):
+                    report["queued"].append(code)
+                else:
+                    report["duplicate"].append(code)
+
+        if report["queued"]:
+            FRESH_CODES.inc(len(report["queued"]))
+            logger.info(f"Intake queued {len(report['queued'])} code(s) from {source}")
+            self.wake.set()
+        return report
+
+
+class _IntakeHandler(BaseHTTPRequestHandler):
+    server: "_IntakeServerMixin"
+
+    def _reply(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _entries(self, raw: bytes) -> List[str]:
+        content_type = self.headers.get("Content-Type", "")
+        if "json" not in content_type:
+            return [raw.decode("utf-8", errors="replace")]
+        payload = json.loads(raw or b"{}")
+        if isinstance(payload, str):
+            return [payload]
+        if isinstance(payload, list):
+            return [str(item) for item in payload]
+        codes = payload.get("codes") or []
+        if payload.get("code"):
+            codes = [payload["code"], *codes]
+        return [str(item) for item in codes]
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] != "/codes":
+            self._reply(404, {"error": "not found"})
+            return
+        token = self.server.token
+        if token and self.headers.get("Authorization") != f"Bearer {token}":
+            self._reply(401, {"error": "unauthorized"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            self._reply(413, {"error": "request too large"})
+            return
+        try:
+            entries = self._entries(self.rfile.read(length))
+        except (ValueError, AttributeError):
+            self._reply(400, {"error": "expected a code, a list or {'codes': [...]}"})
+            return
+        source = self.headers.get("X-Source") or INTAKE_SOURCE
+        report = self.server.intake.submit(entries, source=source)
+        self._reply(202 if report["queued"] else 200, report)
+
+    def address_string(self) -> str:
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("intake: " + format, *args)
+
+
+class _IntakeServerMixin:
+    intake: CodeIntake
+    token: str
+
+
+class _TCPIntakeServer(_IntakeServerMixin, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixIntakeServer(
+    _IntakeServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+def _serve(server, name: str) -> None:
+    threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+
+
+def start_intake_servers(
+    intake: CodeIntake,
+    port: int = config.INTAKE_PORT,
+    socket_path: str = config.INTAKE_SOCKET,
+    host: str = "127.0.0.1",
+    token: str = config.INTAKE_TOKEN,
+) -> List[socketserver.BaseServer]:
+    """Serve ``POST /codes`` on a local TCP port and/or a Unix socket."""
+    servers: List[socketserver.BaseServer] = []
+    if port > 0:
+        try:
+            tcp = _TCPIntakeServer((host, port), _IntakeHandler)
+        except OSError as e:
+            logger.error(f"Failed to start code intake on {host}:{port}: {e}")
+        else:
+            tcp.intake, tcp.token = intake, token
+            _serve(tcp, "intake-http")
+            servers.append(tcp)
+            logger.info(f"Code intake listening on http://{host}:{port}/codes")
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        try:
+            unix = _UnixIntakeServer(socket_path, _IntakeHandler)
+        except OSError as e:
+            logger.error(f"Failed to start code intake on {socket_path}: {e}")
+        else:
+            os.chmod(socket_path, 0o600)
+            unix.intake, unix.token = intake, token
+            _serve(unix, "intake-unix")
+            servers.append(unix)
+            logger.info(f"Code intake listening on unix:{socket_path}")
+    return servers
@@ -0,0 +1,202 @@
+import argparse
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from clock import get_clock
+from config import config
+from metrics import CODE_LATENCY_SECONDS, percentile
+from utils import load_json, save_json_atomic
+
+# Pipeline stages, each measured from the code's first sighting except
+# "sighting" (how long after the first source each later source listed it).
+STAGES = ("sighting", "queued", "started", "finished")
+
+
+@dataclass
+class CodeTimeline:
+    """When a code was first seen, by whom, and how it moved through the queue."""
+
+    code: str
+    first_seen: float
+    source: str
+    # Source -> when that source first listed the code.
+    sightings: Dict[str, float] = field(default_factory=dict)
+    queued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: str = ""
+
+    def stage_seconds(self) -> Dict[str, float]:
+        """Seconds from first sighting to each stage reached so far."""
+        stages = {}
+        for stage, at in (
+            ("queued", self.queued_at),
+            ("started", self.started_at),
+            ("finished", self.finished_at),
+        ):
+            if at is not None:
+                stages[stage] = max(0.0, at - self.first_seen)
+        return stages
+
+
+class LatencyTracker:
+    """Per-code discovery-to-redemption timelines persisted as JSON.
+
+    The watcher reports every code each source lists (``sighted``), when a
+    code enters the queue, when redemption starts and when it reaches a
+    final result. Latencies are exported to ``CODE_LATENCY_SECONDS`` as
+    stages complete and ``summary()`` reports percentiles per stage and
+    source. Timelines older than ``retention`` are dropped on save.
+    """
+
+    def __init__(self, path: str = "", retention: float = config.LATENCY_RETENTION):
+        self.path = path or config.LATENCY_FILE
+        self.retention = retention
+        known = {f.name for f in fields(CodeTimeline)}
+        raw = load_json(self.path, {})
+        self.timelines: Dict[str, CodeTimeline] = {}
+        if isinstance(raw, dict):
+            for code, data in raw.items():
+                values = {k: v for k, v in data.items() if k in known}
+                values["code"] = code
+                self.timelines[code] = CodeTimeline(**values)
+
+    def _timeline(self, code: str, source: str, now: float) -> CodeTimeline:
+        timeline = self.timelines.get(code)
+        if timeline is None:
+            timeline = CodeTimeline(code=code, first_seen=now, source=source)
+            timeline.sightings[source] = now
+            self.timelines[code] = timeline
+        return timeline
+
+    def sighted(
+        self,
+        codes_by_source: Mapping[str, Iterable[str]],
+        known: Set[str] = frozenset(),
+        now: Optional[float] = None,
+    ) -> None:
+        """Record which sources listed which codes this cycle.
+
+        ``known`` codes predate tracking, so their first sighting is unknown
+        and they are not tracked.
+        """
+        now = get_clock().time() if now is None else now
+        for source, codes in codes_by_source.items():
+            for code in codes:
+                timeline = self.timelines.get(code)
+                if timeline is None:
+                    if code in known:
+                        continue
+                    self._timeline(code, source, now)
+                elif source not in timeline.sightings:
+                    timeline.sightings[source] = now
+                    CODE_LATENCY_SECONDS.observe(
+                        now - timeline.first_seen, stage="sighting", source=source
+                    )
+
+    def queued(self, code: str, source: str, now: Optional[float] = None) -> None:
+        now = get_clock().time() if now is None else now
+        timeline = self._timeline(code, source, now)
+        if timeline.queued_at is None:
+            timeline.queued_at = now
+            self._observe(timeline, "queued")
+
+    def started(self, code: str, source: str, now: Optional[float] = None) -> None:
+        """Redemption began; codes pushed straight into the queue start here."""
+        now = get_clock().time() if now is None else now
+        timeline = self._timeline(code, source, now)
+        if timeline.queued_at is None:
+            timeline.queued_at = now
+        if timeline.started_at is None:
+            timeline.started_at = now
+            self._observe(timeline, "started")
+
+    def finished(self, code: str, result: str, now: Optional[float] = None) -> None:
+        """The code reached a final result (not a scheduled retry)."""
+        timeline = self.timelines.get(code)
+        if timeline is None or timeline.finished_at is not None:
+            return
+        timeline.finished_at = get_clock().time() if now is None else now
+        timeline.result = result
+        self._observe(timeline, "finished")
+
+    @staticmethod
+    def _observe(timeline: CodeTimeline, stage: str) -> None:
+        seconds = timeline.stage_seconds()[stage]
+        CODE_LATENCY_SECONDS.observe(seconds, stage=stage, source=timeline.source)
+
+    def save(self, now: Optional[float] = None) -> None:
+        now = get_clock().time() if now is None else now
+        self.timelines = {
+            code: timeline
+            for code, timeline in self.timelines.items()
+            if now - timeline.first_seen <= self.retention
+        }
+        save_json_atomic(
+            self.path, {code: asdict(t) for code, t in self.timelines.items()}
+        )
+
+    def summary(self, since: float = 0.0) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Latency percentiles keyed by ``(stage, source)``.
+
+        The "sighting" stage is grouped by the late source; every other stage
+        by the source that listed the code first. Only codes first seen after
+        ``since`` are included.
+        """
+        samples: Dict[Tuple[str, str], List[float]] = {}
+        for timeline in self.timelines.values():
+            if timeline.first_seen < since:
+                continue
+            for source, at in timeline.sightings.items():
+                if source != timeline.source:
+                    samples.setdefault(("sighting", source), []).append(
+                        at - timeline.first_seen
+                    )
+            for stage, seconds in timeline.stage_seconds().items():
+                samples.setdefault((stage, timeline.source), []).append(seconds)
+        return {
+            key: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+            }
+            for key, values in samples.items()
+        }
+
+
+def format_summary(summary: Mapping[Tuple[str, str], Mapping[str, float]]) -> str:
+    """Render ``summary()`` as a table ordered by stage, then slowest source."""
+
+    def _fmt(seconds: float) -> str:
+        if seconds >= 3600:
+            return f"{seconds / 3600:.1f}h"
+        if seconds >= 60:
+            return f"{seconds / 60:.1f}m"
+        return f"{seconds:.0f}s"
+
+    lines = [f"{'stage':<9} {'source':<58} {'n':>4} {'p50':>7} {'p90':>7} {'p99':>7}"]
+    for stage in STAGES:
+        rows = [(src, s) for (st, src), s in summary.items() if st == stage]
+        for source, stats in sorted(rows, key=lambda row: -row[1]["p50"]):
+            lines.append(
+                f"{stage:<9} {source[:58]:<58} {int(stats['count']):>4} "
+                f"{_fmt(stats['p50']):>7} {_fmt(stats['p90']):>7} "
+                f"{_fmt(stats['p99']):>7}"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Discovery-to-redemption latency per source and stage"
+    )
+    parser.add_argument("--file", default=config.LATENCY_FILE)
+    parser.add_argument(
+        "--days", type=float, default=0, help="Only codes first seen in the last N days"
+    )
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else 0.0
+    print(format_summary(LatencyTracker(args.file).summary(since)))
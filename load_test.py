@@ -0,0 +1,128 @@
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import code_redeemer
+from config import config
+from metrics import percentile
+from session_manager import get_session_with_retry
+from shift_standin import (
+    EXPIRED,
+    INVALID,
+    REDEEMABLE,
+    USED,
+    StandinOptions,
+    StandinServer,
+)
+from simulate import make_codes
+
+
+def assign_outcomes(
+    codes: List[str], mix: Dict[str, float], seed: int = 0
+) -> Dict[str, str]:
+    """Give each code an outcome drawn from the ``mix`` weights."""
+    rng = random.Random(seed)
+    outcomes = list(mix)
+    weights = [mix[o] for o in outcomes]
+    return {code: rng.choices(outcomes, weights)[0] for code in codes}
+
+
+def run_load_test(
+    base_url: str, codes: List[str], concurrency: int = 4
+) -> Dict[str, object]:
+    """Redeem ``codes`` against ``base_url`` and summarise throughput/latency.
+
+    Each worker uses its own session, like one account each, and redeems
+    with a copy of the config whose SHiFT URLs point at ``base_url``.
+    """
+    settings = config.for_base_url(base_url)
+    sessions = [get_session_with_retry() for _ in range(max(1, concurrency))]
+    latencies: List[float] = []
+    results: Counter = Counter()
+    lock = threading.Lock()
+
+    def _redeem(index: int, code: str) -> None:
+        start = time.perf_counter()
+        session = sessions[index % len(sessions)]
+        result = code_redeemer.redeem_code(session, code, settings)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            results[result] += 1
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            list(executor.map(_redeem, range(len(codes)), codes))
+    finally:
+        for session in sessions:
+            session.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "codes": len(codes),
+        "seconds": elapsed,
+        "codes_per_minute": len(codes) / elapsed * 60 if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "results": dict(results),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, object]:
+    parser = argparse.ArgumentParser(
+        description="Load-test code redemption against the SHiFT stand-in"
+    )
+    parser.add_argument("--codes", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--json-lookup-only", action="store_true")
+    parser.add_argument(
+        "--base-url",
+        default="",
+        help="Use an already running server instead of starting a stand-in",
+    )
+    args = parser.parse_args(argv)
+
+    codes = make_codes(args.codes)
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        mix = {REDEEMABLE: 0.6, EXPIRED: 0.15, USED: 0.15, INVALID: 0.1}
+        server = StandinServer(
+            StandinOptions(
+                codes=assign_outcomes(codes, mix),
+                latency=args.latency,
+                jitter=args.jitter,
+                max_rps=args.max_rps,
+                json_lookup_only=args.json_lookup_only,
+            )
+        ).start()
+        base_url = server.base_url
+
+    try:
+        report = run_load_test(base_url, codes, args.concurrency)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(
+        f"{report['codes']} codes in {report['seconds']:.1f}s "
+        f"({report['codes_per_minute']:.1f} codes/min)"
+    )
+    print(
+        f"latency p50 {report['p50'] * 1000:.0f}ms, "
+        f"p95 {report['p95'] * 1000:.0f}ms, p99 {report['p99'] * 1000:.0f}ms"
+    )
+    print(f"results: {report['results']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from config import config
+from metrics import MEMORY_BYTES
+from utils import logger
+
+# Allocations made by the monitor itself or the import machinery are noise.
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemoryMonitor:
+    """Track Python heap growth across watcher cycles with tracemalloc.
+
+    When enabled, every ``every``-th cycle takes a snapshot, compares it with
+    the previous one and logs the ``top_n`` allocation sites that grew the
+    most. Traced current/peak bytes and the process RSS are exported as the
+    ``shiftwatcher_memory_bytes`` gauge, and a warning is logged whenever the
+    traced heap is above ``warn_mb`` (0 disables the warning). tracemalloc
+    slows allocation down noticeably, so this is off by default.
+    """
+
+    def __init__(
+        self,
+        top_n: int = 10,
+        frames: int = 1,
+        every: int = 1,
+        warn_mb: float = 0.0,
+        enabled: bool = False,
+    ):
+        self.top_n = top_n
+        self.frames = frames
+        self.every = max(1, every)
+        self.warn_mb = warn_mb
+        self.enabled = enabled
+        self.cycles = 0
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info(f"Memory monitoring on (tracemalloc, {self.frames} frame(s))")
+
+    @contextmanager
+    def cycle(self, name: str) -> Iterator[None]:
+        """Check memory after the wrapped cycle when monitoring is enabled."""
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.cycles += 1
+                if self.cycles % self.every == 0:
+                    try:
+                        self.check(name)
+                    except Exception as e:
+                        logger.warning(f"Failed to check memory after {name}: {e}")
+
+    def check(self, name: str = "cycle") -> List[tracemalloc.StatisticDiff]:
+        """Snapshot now, export the gauges and log growth since the last check.
+
+        Returns the growing allocation sites, largest first (empty on the
+        first check, which only establishes the baseline).
+        """
+        self.start()
+        current, peak = tracemalloc.get_traced_memory()
+        rss = rss_bytes()
+        MEMORY_BYTES.set(current, kind="traced")
+        MEMORY_BYTES.set(peak, kind="traced_peak")
+        if rss:
+            MEMORY_BYTES.set(rss, kind="rss")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        key = "traceback" if self.frames > 1 else "lineno"
+        growth: List[tracemalloc.StatisticDiff] = []
+        if self._previous is not None:
+            diff = snapshot.compare_to(self._previous, key)
+            growth = [stat for stat in diff if stat.size_diff > 0][: self.top_n]
+        self._previous = snapshot
+
+        logger.info(
+            f"Memory after {name}: traced {current / 1e6:.1f}MB "
+            f"(peak {peak / 1e6:.1f}MB), RSS {rss / 1e6:.1f}MB"
+        )
+        for stat in growth:
+            frame = stat.traceback[0]
+            logger.info(
+                f"  +{stat.size_diff / 1024:.1f}KiB ({stat.count_diff:+d} blocks) "
+                f"{frame.filename}:{frame.lineno}"
+            )
+        if self.warn_mb and current > self.warn_mb * 1e6:
+            logger.warning(
+                f"Traced memory {current / 1e6:.1f}MB is above "
+                f"SHIFT_MEMORY_WARN_MB={self.warn_mb:g}"
+            )
+        return growth
+
+
+memory_monitor = MemoryMonitor(
+    top_n=config.MEMORY_TOP_N,
+    frames=config.MEMORY_FRAMES,
+    every=config.MEMORY_EVERY,
+    warn_mb=config.MEMORY_WARN_MB,
+)
@@ -0,0 +1,338 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils import logger
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: LabelKey) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _sample_lines(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._sample_lines())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _sample_lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucket histogram compatible with Prometheus text format."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts = self._counts.get(self._key(labels))
+            return counts[-1] if counts else 0
+
+    def _sample_lines(self) -> List[str]:
+        lines: List[str] = []
+        with self._lock:
+            items = sorted(self._counts.items())
+            sums = dict(self._sums)
+        for key, counts in items:
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(
+                    self.label_names + ("le",), key + (f"{bound:g}",)
+                )
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {counts[-1]}")
+            base_labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{base_labels} {sums.get(key, 0.0)}")
+            lines.append(f"{self.name}_count{base_labels} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together for the /metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, help_text: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.register(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, help_text, labels)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = Registry()
+
+SOURCE_FETCH_SECONDS = registry.histogram(
+    "shiftwatcher_source_fetch_seconds",
+    "Time spent fetching a code source.",
+    ["source"],
+)
+SOURCE_FETCH_BYTES = registry.counter(
+    "shiftwatcher_source_fetch_bytes_total",
+    "Bytes downloaded from a code source.",
+    ["source"],
+)
+SOURCE_FETCH_ERRORS = registry.counter(
+    "shiftwatcher_source_fetch_errors_total",
+    "Failed fetches per code source.",
+    ["source"],
+)
+SOURCE_SKIPPED = registry.counter(
+    "shiftwatcher_source_skipped_total",
+    "Fetches skipped because the source circuit breaker was open.",
+    ["source"],
+)
+SOURCE_BREAKER_OPEN = registry.gauge(
+    "shiftwatcher_source_breaker_open",
+    "1 while the circuit breaker for a source is open.",
+    ["source"],
+)
+CODES_EXTRACTED = registry.counter(
+    "shiftwatcher_codes_extracted_total",
+    "Codes extracted from source pages (including known codes).",
+    ["source"],
+)
+CODES_REJECTED = registry.counter(
+    "shiftwatcher_codes_rejected_total",
+    "Placeholder codes dropped during extraction.",
+)
+FRESH_CODES = registry.counter(
+    "shiftwatcher_fresh_codes_total",
+    "Codes not seen before that were queued for redemption.",
+)
+REDEMPTIONS = registry.counter(
+    "shiftwatcher_redemptions_total",
+    "Redemption outcomes by status.",
+    ["status"],
+)
+REDEMPTION_RETRIES = registry.counter(
+    "shiftwatcher_redemption_retries_total",
+    "Queued codes retried after a failed or unknown outcome.",
+)
+REDEEM_STAGE_SECONDS = registry.histogram(
+    "shiftwatcher_redeem_stage_seconds",
+    "Latency of each redemption stage (csrf, lookup, platform).",
+    ["stage"],
+)
+RATE_LIMIT_DELAY_SECONDS = registry.histogram(
+    "shiftwatcher_rate_limit_delay_seconds",
+    "Delay slept between requests by the rate limiter.",
+    buckets=(1.0, 2.0, 3.0, 5.0, 7.0, 10.0, 20.0, 30.0, 60.0),
+)
+SESSION_REFRESHES = registry.counter(
+    "shiftwatcher_session_refreshes_total",
+    "Cookie refreshes performed through Playwright.",
+)
+CODE_LATENCY_SECONDS = registry.histogram(
+    "shiftwatcher_code_latency_seconds",
+    "Time from a code's first sighting through each pipeline stage, by the "
+    "source that first listed it (or the late source for stage=sighting).",
+    ["stage", "source"],
+    buckets=(5.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 10800.0, 43200.0, 86400.0),
+)
+DEADLINES_EXCEEDED = registry.counter(
+    "shiftwatcher_deadlines_exceeded_total",
+    "Requests not started because a deadline ran out, by scope.",
+    ["scope"],
+)
+HTTP_RETRIES = registry.counter(
+    "shiftwatcher_http_retries_total",
+    "Adapter-level HTTP retries allowed or denied by the deadline/budget.",
+    ["result"],
+)
+COORDINATION_CLAIMS = registry.counter(
+    "shiftwatcher_coordination_claims_total",
+    "Shared-store code claims by result (granted, held, finished, takeover).",
+    ["result"],
+)
+COORDINATION_LEADER = registry.gauge(
+    "shiftwatcher_coordination_leader",
+    "1 while this instance holds the polling leader lease for a role.",
+    ["role"],
+)
+MEMORY_BYTES = registry.gauge(
+    "shiftwatcher_memory_bytes",
+    "Traced Python heap (traced, traced_peak) and process RSS (rss).",
+    ["kind"],
+)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe the wall-clock duration of the wrapped block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("metrics: " + format, *args)
+
+
+def start_metrics_server(
+    port: int, host: str = "127.0.0.1"
+) -> Optional[ThreadingHTTPServer]:
+    """Serve the metrics registry over HTTP from a daemon thread."""
+    if port <= 0:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Failed to start metrics server on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    )
+    thread.start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
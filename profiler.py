@@ -0,0 +1,109 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from config import config
+from utils import logger
+
+
+class CycleProfiler:
+    """Profile individual watcher cycles and keep a rolling hot-spot summary.
+
+    Each cycle is written to its own ``.prof`` file (loadable with ``pstats``
+    or snakeviz). Only the newest ``keep`` files are retained, and the
+    summary aggregates the newest ``window`` of them so disk usage stays
+    bounded when profiling is left on.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        keep: int = 48,
+        window: int = 12,
+        top_n: int = 25,
+        enabled: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.keep = keep
+        self.window = window
+        self.top_n = top_n
+        self.enabled = enabled
+
+    @property
+    def summary_path(self) -> str:
+        return os.path.join(self.output_dir, "summary.txt")
+
+    @contextmanager
+    def cycle(self, name: str) -> Iterator[None]:
+        """Profile the wrapped block when profiling is enabled."""
+        if not self.enabled:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            try:
+                path = self._dump(profile, name)
+                self._prune()
+                self._write_summary()
+                logger.info(f"Profiled {name} cycle in {elapsed:.2f}s -> {path}")
+            except Exception as e:
+                logger.warning(f"Failed to write profile for {name} cycle: {e}")
+
+    def _dump(self, profile: cProfile.Profile, name: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{name}-{stamp}-{os.getpid()}.prof")
+        profile.dump_stats(path)
+        return path
+
+    def _profile_files(self) -> List[str]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        files = [
+            os.path.join(self.output_dir, entry)
+            for entry in os.listdir(self.output_dir)
+            if entry.endswith(".prof")
+        ]
+        return sorted(files, key=os.path.getmtime)
+
+    def _prune(self) -> None:
+        files = self._profile_files()
+        for path in files[: max(0, len(files) - self.keep)]:
+            os.remove(path)
+
+    def _write_summary(self) -> None:
+        recent = list(deque(self._profile_files(), maxlen=self.window))
+        if not recent:
+            return
+        stream = io.StringIO()
+        stats = pstats.Stats(*recent, stream=stream)
+        stats.strip_dirs()
+        stream.write(
+            f"Rolling profile summary over the last {len(recent)} cycle(s), "
+            f"generated {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        )
+        stream.write(f"=== Top {self.top_n} by cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        stream.write(f"=== Top {self.top_n} by internal time ===\n")
+        stats.sort_stats("tottime").print_stats(self.top_n)
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+
+
+cycle_profiler = CycleProfiler(
+    output_dir=config.PROFILE_DIR,
+    keep=config.PROFILE_KEEP,
+    top_n=config.PROFILE_TOP_N,
+)
@@ -1,19 +1,50 @@
-import time
-import random
+import math
+from typing import Optional
+
+from clock import Clock, get_clock
+from metrics import RATE_LIMIT_DELAY_SECONDS
+
+# Human-like pause between two codes, in seconds.
+CODE_DELAY_RANGE = (3.0, 7.0)
 
 
 class RateLimiter:
-    def __init__(self, min_delay=2.0, max_delay=30.0):
+    def __init__(self, min_delay=2.0, max_delay=30.0, clock: Optional[Clock] = None):
         self.min_delay = min_delay
         self.max_delay = max_delay
         self.delay = min_delay
+        self._clock = clock
+
+    @property
+    def clock(self) -> Clock:
+        return self._clock or get_clock()
 
-    def wait(self):
-        jitter = random.uniform(0, 0.3 * self.delay)
-        time.sleep(self.delay + jitter)
+    def wait(self, max_seconds: float = math.inf, since: Optional[float] = None):
+        """Sleep the current delay plus up to 30% jitter; returns the pause.
+
+        With ``since`` (when the previous request went out) only the part of
+        the delay that has not passed yet is slept. ``max_seconds`` caps the
+        pause, e.g. at the time left on a deadline.
+        """
+        jitter = self.clock.uniform(0, 0.3 * self.delay)
+        pause = self.delay + jitter
+        if since is not None:
+            pause -= self.clock.time() - since
+        pause = max(0.0, min(pause, max_seconds))
+        if pause > 0:
+            RATE_LIMIT_DELAY_SECONDS.observe(pause)
+            self.clock.sleep(pause)
+        return pause
 
     def increase(self):
         self.delay = min(self.delay * 2, self.max_delay)
 
     def reset(self):
         self.delay = self.min_delay
+
+
+def code_delay(clock: Optional[Clock] = None) -> float:
+    """Draw (and record) the pause before the next code; the caller sleeps it."""
+    delay = (clock or get_clock()).uniform(*CODE_DELAY_RANGE)
+    RATE_LIMIT_DELAY_SECONDS.observe(delay)
+    return delay
@@ -1,17 +1,37 @@
 import requests
 import xml.etree.ElementTree as ET
-from typing import List, Set
-import re
+from typing import TYPE_CHECKING, Dict, List, Optional
 import time
-import random
-from utils import logger
+from colorama import Fore
+from utils import load_json, logger, notify, save_json
+from clock import get_clock
 from config import config
-
-
-def extract_codes_from_text(text: str) -> Set[str]:
-    """Extract SHiFT codes from text using regex pattern."""
-    pattern = re.compile(r"[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}")
-    return set(re.findall(pattern, text))
+from deadlines import deadline
+from extractors import ExtractedCode, extract_generic
+from http_pool import http_pool
+from memory_monitor import memory_monitor
+from profiler import cycle_profiler
+from scheduler import AdaptiveScheduler
+from tracing import tracer
+from metrics import (
+    CODES_EXTRACTED,
+    FRESH_CODES,
+    SOURCE_FETCH_BYTES,
+    SOURCE_FETCH_ERRORS,
+    SOURCE_FETCH_SECONDS,
+)
+
+if TYPE_CHECKING:
+    from accounts import Account
+    from watcher import Watcher
+
+
+REDDIT_RSS_URL = "https://www.reddit.com/r/Borderlands/new/.rss?limit=5"
+# Adaptive polling bounds for the feed, and the jitter applied to each wait.
+REDDIT_BASE_INTERVAL = 240
+REDDIT_MIN_INTERVAL = 120
+REDDIT_MAX_INTERVAL = 900
+REDDIT_JITTER = (0.75, 1.25)
 
 
 def parse_reddit_rss() -> List[str]:
@@ -21,22 +41,65 @@ def parse_reddit_rss() -> List[str]:
     Returns:
         List of unique SHiFT codes found in recent Reddit posts
     """
-    reddit_rss_url = "https://www.reddit.com/r/Borderlands/new/.rss?limit=5"
-    codes = set()
+    return list(parse_reddit_rss_details())
+
+
+def _fetch_feed(url: str) -> bytes:
+    """GET the RSS feed at ``url``, recording fetch metrics and a trace span."""
+    start = time.perf_counter()
+    try:
+        with tracer.span("fetch", source=url):
+            response = http_pool.get(
+                url,
+                headers={
+                    "User-Agent": "SHiFT-Code-Watcher/1.0 (https://github.com/klept0/SHiFT-Code-Watcher)"
+                },
+            )
+            response.raise_for_status()
+    except requests.RequestException:
+        SOURCE_FETCH_ERRORS.inc(source=url)
+        raise
+    finally:
+        SOURCE_FETCH_SECONDS.observe(time.perf_counter() - start, source=url)
+    SOURCE_FETCH_BYTES.inc(len(response.content), source=url)
+    return response.content
+
+
+def _post_text(entry: ET.Element) -> str:
+    """Text of one Atom entry or RSS item (content, or description and title)."""
+    # Try Atom format first
+    content_elem = entry.find(".//{http://www.w3.org/2005/Atom}content")
+    if content_elem is not None and content_elem.text:
+        return content_elem.text
+
+    # Try RSS format
+    content = ""
+    description = entry.find("description")
+    if description is not None and description.text:
+        content = description.text
+
+    # Also check title
+    title = entry.find(".//{http://www.w3.org/2005/Atom}title") or entry.find("title")
+    if title is not None and title.text:
+        content += " " + title.text
+    return content
+
+
+def parse_reddit_rss_details() -> Dict[str, ExtractedCode]:
+    """
+    Parse Reddit RSS feed and return codes with any expiry hints from the post.
+
+    Returns:
+        Mapping of SHiFT code to extracted metadata
+    """
+    reddit_rss_url = REDDIT_RSS_URL
+    codes: Dict[str, ExtractedCode] = {}
 
     try:
         logger.info("Fetching Reddit RSS feed...")
-        response = requests.get(
-            reddit_rss_url,
-            headers={
-                "User-Agent": "SHiFT-Code-Watcher/1.0 (https://github.com/klept0/SHiFT-Code-Watcher)"
-            },
-            timeout=config.REQUEST_TIMEOUT,
-        )
-        response.raise_for_status()
 
         # Parse XML
-        root = ET.fromstring(response.content)
+        root = ET.fromstring(_fetch_feed(reddit_rss_url))
 
         # Find all entry/item elements (RSS/Atom format)
         entries = root.findall(".//{http://www.w3.org/2005/Atom}entry") or root.findall(
@@ -48,169 +111,155 @@ def parse_reddit_rss() -> List[str]:
         for entry in entries[:20]:  # Check last 20 posts to avoid rate limiting
             try:
                 # Get post content (try different XML structures)
-                content = ""
-
-                # Try Atom format first
-                content_elem = entry.find(".//{http://www.w3.org/2005/Atom}content")
-                if content_elem is not None and content_elem.text:
-                    content = content_elem.text
-                else:
-                    # Try RSS format
-                    description = entry.find("description")
-                    if description is not None and description.text:
-                        content = description.text
-
-                    # Also check title
-                    title = entry.find(
-                        ".//{http://www.w3.org/2005/Atom}title"
-                    ) or entry.find("title")
-                    if title is not None and title.text:
-                        content += " " + title.text
-
-                if content:
-                    post_codes = extract_codes_from_text(content)
-                    if post_codes:
-                        logger.info(f"Found {len(post_codes)} code(s) in Reddit post")
-                        codes.update(post_codes)
+                content = _post_text(entry)
+                post_codes = extract_generic(content) if content else []
+                if post_codes:
+                    logger.info(f"Found {len(post_codes)} code(s) in Reddit post")
+                    for item in post_codes:
+                        codes.setdefault(item.code, item)
 
             except Exception as e:
                 logger.warning(f"Error parsing Reddit post: {e}")
                 continue
 
+        CODES_EXTRACTED.inc(len(codes), source=reddit_rss_url)
         logger.info(f"Total unique codes found in Reddit: {len(codes)}")
-        return list(codes)
+        return codes
 
     except requests.RequestException as e:
         logger.error(f"Failed to fetch Reddit RSS: {e}")
-        return []
+        return {}
     except ET.ParseError as e:
         logger.error(f"Failed to parse Reddit RSS XML: {e}")
-        return []
+        return {}
     except Exception as e:
         logger.error(f"Unexpected error parsing Reddit RSS: {e}")
-        return []
+        return {}
+
+
+def _check_reddit(
+    watcher: "Watcher",
+    reddit_scheduler: AdaptiveScheduler,
+    active: List["Account"],
+    all_codes: List[str],
+    used_codes: List[str],
+) -> None:
+    """Poll the feed once, queue its new codes and redeem everything queued."""
+    coordinator = watcher.coordinator
+    # Check Reddit RSS (only the leader does, with leader election)
+    polling = coordinator is None or coordinator.polls("reddit")
+    reddit_codes = parse_reddit_rss_details() if polling else {}
+    known = set(all_codes) | set(used_codes)
+    reddit_scheduler.record_cycle(
+        [REDDIT_RSS_URL], {REDDIT_RSS_URL: set(reddit_codes)}, known
+    )
+    reddit_scheduler.save()
+    watcher.latency.sighted({REDDIT_RSS_URL: reddit_codes}, known)
+
+    # Add codes other instances found, keeping who found them first
+    by_source = {REDDIT_RSS_URL: reddit_codes}
+    if coordinator is not None:
+        by_source = coordinator.share_codes(by_source)
+
+    # Queue first so a crash cannot lose codes marked as known
+    new_codes = watcher.queue_fresh_codes(by_source, all_codes, used_codes)
+    if new_codes:
+        watcher.say(Fore.GREEN, f"Found {len(new_codes)} new code(s) from Reddit!")
+        FRESH_CODES.inc(len(new_codes))
+        all_codes.extend(new_codes)
+        save_json(config.LOG_FILE, all_codes)
+        notify(
+            config.APPRISE_URL,
+            "New SHiFT Codes from Reddit",
+            f"Found {len(new_codes)} new code(s)",
+        )
+    else:
+        watcher.say(
+            Fore.BLUE,
+            "No new codes found in Reddit"
+            if reddit_codes
+            else "No codes found in Reddit RSS",
+        )
+
+    # Redeem new codes, leftovers from a previous run and due retries
+    watcher.work_queue.begin_cycle()
+    total = watcher.work_queue.available_count()
+    if not total:
+        return
+    success_count, fail_count = watcher.redeem_queued(
+        active, all_codes, used_codes, total
+    )
+    watcher.finish_redeeming(active)
+    if success_count:
+        watcher.say(
+            Fore.CYAN,
+            f"Successfully redeemed {success_count}/{success_count + fail_count} "
+            "codes from Reddit",
+        )
 
 
-def monitor_reddit_for_codes(session, rate_limiter, verbose: bool = False) -> None:
+def monitor_reddit_for_codes(
+    watcher: "Watcher",
+    active: List["Account"],
+    checks: Optional[int] = None,
+) -> None:
     """
     Monitor Reddit RSS feed for new SHiFT codes and redeem them.
 
     Args:
-        session: Authenticated requests session
-        rate_limiter: Rate limiter instance
-        verbose: Whether to show verbose output
+        watcher: Watcher whose queue, caches and wake event Reddit mode shares
+            (the code intake feeds the same queue)
+        active: Logged-in accounts to redeem each code on
+        checks: Stop after this many checks instead of running forever
     """
-    from code_redeemer import redeem_code
-    from utils import load_json, save_json, notify
-    from colorama import Fore, Style
-
     logger.info("Starting Reddit monitoring mode...")
 
     # Load existing codes
     all_codes = load_json(config.LOG_FILE, [])
     used_codes = load_json(config.USED_FILE, [])
+    # Learn when Reddit tends to carry new codes and poll more often then.
+    reddit_scheduler = AdaptiveScheduler(
+        [REDDIT_RSS_URL],
+        path=config.REDDIT_SCHEDULE_FILE,
+        base_interval=REDDIT_BASE_INTERVAL,
+        min_interval=REDDIT_MIN_INTERVAL,
+        max_interval=REDDIT_MAX_INTERVAL,
+        budget_per_hour=0,
+    )
+
+    low, high = REDDIT_JITTER
+    watcher.say(Fore.BLUE, "Reddit monitoring started")
+    watcher.say(
+        Fore.BLUE,
+        f"Checking Reddit every {REDDIT_MIN_INTERVAL * low / 60:g}-"
+        f"{REDDIT_MAX_INTERVAL * high / 60:.0f} minutes (adaptive)",
+    )
+
+    done = 0
+    while checks is None or done < checks:
+        with (
+            memory_monitor.cycle("reddit"),
+            cycle_profiler.cycle("reddit"),
+            tracer.span("reddit_poll"),
+            deadline(
+                "cycle", config.CYCLE_DEADLINE, retries=config.CYCLE_HTTP_RETRIES
+            ),
+        ):
+            try:
+                _check_reddit(
+                    watcher, reddit_scheduler, active, all_codes, used_codes
+                )
+            except Exception as e:
+                logger.error(f"Error in Reddit monitoring: {e}")
+                watcher.say(Fore.RED, f"Error monitoring Reddit: {e}")
+        done += 1
 
-    if verbose:
-        print(
-            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Reddit monitoring started{Style.RESET_ALL}"
+        # Wait the learned interval (4 minutes to start with) with jitter
+        wait_time = int(
+            reddit_scheduler.interval(REDDIT_RSS_URL) * get_clock().uniform(low, high)
         )
-        print(
-            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Checking Reddit every 3-5 minutes{Style.RESET_ALL}"
+        watcher.say(
+            Fore.BLUE,
+            f"Waiting {wait_time // 60} minutes before next Reddit check...",
         )
-
-    while True:
-        try:
-            # Check Reddit RSS
-            reddit_codes = parse_reddit_rss()
-
-            if reddit_codes:
-                # Filter out already known codes
-                new_codes = [
-                    code
-                    for code in reddit_codes
-                    if code not in all_codes and code not in used_codes
-                ]
-
-                if new_codes:
-                    if verbose:
-                        print(
-                            f"{Fore.GREEN}[{time.strftime('%H:%M:%S')}] Found {len(new_codes)} new code(s) from Reddit!{Style.RESET_ALL}"
-                        )
-
-                    # Add to known codes
-                    all_codes.extend(new_codes)
-                    save_json(config.LOG_FILE, all_codes)
-
-                    # Notify about new codes
-                    notify(
-                        config.APPRISE_URL,
-                        "New SHiFT Codes from Reddit",
-                        f"Found {len(new_codes)} new code(s)",
-                    )
-
-                    # Redeem the codes
-                    success_count = 0
-                    for code in new_codes:
-                        result = redeem_code(session, code)
-
-                        if result == "redeemed":
-                            success_count += 1
-                            used_codes.append(code)
-                            save_json(config.USED_FILE, used_codes)
-                            notify(
-                                config.APPRISE_URL,
-                                "Code Redeemed from Reddit",
-                                f"✅ {code}",
-                            )
-                            rate_limiter.reset()
-
-                            if verbose:
-                                print(
-                                    f"{Fore.GREEN}[{time.strftime('%H:%M:%S')}] ✅ Redeemed: {code}{Style.RESET_ALL}"
-                                )
-                        else:
-                            if verbose:
-                                status_color = {
-                                    "used": Fore.RED,
-                                    "expired": Fore.YELLOW,
-                                    "invalid": Fore.RED,
-                                }.get(result, Fore.YELLOW)
-
-                                print(
-                                    f"{status_color}[{time.strftime('%H:%M:%S')}] {result.upper()}: {code}{Style.RESET_ALL}"
-                                )
-
-                        # Rate limiting
-                        delay = random.uniform(3, 7)
-                        time.sleep(delay)
-
-                    if verbose and success_count > 0:
-                        print(
-                            f"{Fore.CYAN}[{time.strftime('%H:%M:%S')}] Successfully redeemed {success_count}/{len(new_codes)} codes from Reddit{Style.RESET_ALL}"
-                        )
-                else:
-                    if verbose:
-                        print(
-                            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] No new codes found in Reddit{Style.RESET_ALL}"
-                        )
-            else:
-                if verbose:
-                    print(
-                        f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] No codes found in Reddit RSS{Style.RESET_ALL}"
-                    )
-
-        except Exception as e:
-            logger.error(f"Error in Reddit monitoring: {e}")
-            if verbose:
-                print(
-                    f"{Fore.RED}[{time.strftime('%H:%M:%S')}] Error monitoring Reddit: {e}{Style.RESET_ALL}"
-                )
-
-        # Wait 3-5 minutes before next check
-        wait_time = random.randint(180, 300)  # 3-5 minutes in seconds
-        if verbose:
-            print(
-                f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Waiting {wait_time//60} minutes before next Reddit check...{Style.RESET_ALL}"
-            )
-
-        time.sleep(wait_time)
+        watcher.idle(wait_time, "reddit")
@@ -0,0 +1,165 @@
+import atexit
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from cassette import Cassette, load_cassette
+from config import config
+from deadlines import request_timeout
+from http_pool import host_group
+from tracing import tracer
+from utils import logger
+
+# Requests a rendered source never needs; blocking them keeps pages light.
+BLOCKED_RESOURCES = frozenset({"image", "media", "font", "stylesheet"})
+_HEAP_SIZE_JS = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+def _block_heavy(route) -> None:
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.pages = 0
+        self.retire = False
+
+
+class RenderedFetcher:
+    """Fetch JavaScript-rendered sources through pooled headless contexts.
+
+    One headless Chromium is started on first use and kept, with up to
+    ``pool_size`` browser contexts, one per host group (least recently used
+    is closed first). Images, media, fonts and stylesheets are never
+    downloaded. Each fetch waits for the host's content selector rather than
+    a fixed delay. Every renderer's V8 heap is capped at ``memory_mb``, and a
+    context is replaced after ``pages_per_context`` pages or once a page
+    grew its heap past that cap, so long-lived contexts cannot creep.
+
+    Playwright's sync API is bound to the thread that started it, so the
+    fetcher must only be used from one thread (the watcher's main loop).
+
+    Like the session pool, a ``cassette`` in record mode saves every rendered
+    page, and in replay mode pages come from it without starting a browser.
+    """
+
+    def __init__(
+        self,
+        hosts: Iterable[str] = (),
+        pool_size: int = 2,
+        timeout_ms: int = 20000,
+        memory_mb: int = 256,
+        pages_per_context: int = 50,
+        selectors: Optional[Dict[str, str]] = None,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.hosts = {host_group(f"https://{h.strip()}") for h in hosts if h.strip()}
+        self.pool_size = max(1, pool_size)
+        self.timeout_ms = timeout_ms
+        self.memory_mb = memory_mb
+        self.pages_per_context = pages_per_context
+        self.selectors = dict(selectors or {})
+        self.cassette = cassette
+        self._playwright = None
+        self._browser = None
+        self._contexts: "OrderedDict[str, _PooledContext]" = OrderedDict()
+
+    def handles(self, url: str) -> bool:
+        return host_group(url) in self.hosts
+
+    def selector_for(self, url: str) -> str:
+        return self.selectors.get(host_group(url), "body")
+
+    def _launch(self) -> None:
+        if self._browser is not None:
+            return
+        from playwright.sync_api import sync_playwright
+
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(
+            headless=True,
+            args=[f"--js-flags=--max-old-space-size={self.memory_mb}"],
+        )
+        atexit.register(self.close)
+        logger.info(f"Started headless browser for {len(self.hosts)} rendered host(s)")
+
+    def _context_for(self, group: str) -> _PooledContext:
+        pooled = self._contexts.get(group)
+        if pooled is not None and pooled.retire:
+            pooled.context.close()
+            del self._contexts[group]
+            pooled = None
+        if pooled is None:
+            while len(self._contexts) >= self.pool_size:
+                _, oldest = self._contexts.popitem(last=False)
+                oldest.context.close()
+            context = self._browser.new_context(
+                user_agent=config.HEADERS.get("User-Agent")
+            )
+            context.route("**/*", _block_heavy)
+            pooled = self._contexts[group] = _PooledContext(context)
+        self._contexts.move_to_end(group)
+        return pooled
+
+    def fetch(self, url: str) -> str:
+        """Rendered HTML of ``url`` once its content selector has appeared."""
+        if self.cassette is not None and self.cassette.replaying:
+            return self.cassette.replay(url).text
+        seconds = request_timeout(self.timeout_ms / 1000, what=f"rendering {url}")
+        timeout = seconds * 1000
+        self._launch()
+        group = host_group(url)
+        pooled = self._context_for(group)
+        page = pooled.context.new_page()
+        start = time.perf_counter()
+        try:
+            with tracer.span("render", source=url) as span:
+                page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                page.wait_for_selector(self.selector_for(url), timeout=timeout)
+                html = page.content()
+                heap = page.evaluate(_HEAP_SIZE_JS) or 0
+                span.set(bytes=len(html), heap=heap)
+        finally:
+            page.close()
+            pooled.pages += 1
+        if heap > self.memory_mb * 1024 * 1024:
+            logger.warning(
+                f"Rendering {url} used {heap / 1e6:.0f}MB of JS heap; "
+                "recycling its browser context"
+            )
+            pooled.retire = True
+        if pooled.pages >= self.pages_per_context:
+            pooled.retire = True
+        if self.cassette is not None:
+            self.cassette.record_text(url, html, time.perf_counter() - start)
+        return html
+
+    def close(self) -> None:
+        for pooled in self._contexts.values():
+            try:
+                pooled.context.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Closing the headless browser failed: {e}")
+        self._browser = self._playwright = None
+
+
+rendered_fetcher = RenderedFetcher(
+    hosts=config.RENDER_SOURCES.split(","),
+    pool_size=config.RENDER_CONTEXTS,
+    timeout_ms=config.RENDER_TIMEOUT,
+    memory_mb=config.RENDER_MEMORY_MB,
+    pages_per_context=config.RENDER_PAGES_PER_CONTEXT,
+    selectors=config.RENDER_SELECTORS,
+    cassette=load_cassette(),
+)
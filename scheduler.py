@@ -0,0 +1,194 @@
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from clock import Clock, get_clock
+from config import config
+from utils import load_json, logger, save_json
+
+# Bound on remembered code -> first publisher entries kept in the state file.
+_MAX_FIRST_SEEN = 5000
+
+
+@dataclass
+class SourceSchedule:
+    """Polling state and publishing history for one source."""
+
+    url: str
+    interval: float
+    next_due: float = 0.0
+    polls: int = 0
+    first_reports: int = 0
+    late_reports: int = 0
+    lag_total: float = 0.0
+    first_report_hours: List[int] = field(default_factory=lambda: [0] * 24)
+
+    @property
+    def first_rate(self) -> float:
+        """Laplace-smoothed share of this source's codes that it published first."""
+        return (self.first_reports + 1) / (
+            self.first_reports + self.late_reports + 2
+        )
+
+    def hour_factor(self, hour: int) -> float:
+        """How much more often than average this source publishes at ``hour``."""
+        total = sum(self.first_report_hours)
+        return (self.first_report_hours[hour] + 1) * 24 / (total + 24)
+
+
+class AdaptiveScheduler:
+    """Give each source its own polling interval, learned from history.
+
+    A source that tends to publish codes before every other source (and at a
+    particular time of day) is polled more often; sources that only repeat
+    codes already seen elsewhere are polled less often. Intervals stay within
+    ``[min_interval, max_interval]`` and are stretched together when the sum
+    of polls per hour would exceed ``budget_per_hour``. With no history every
+    source is polled every ``base_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[str],
+        path: str = "",
+        base_interval: float = config.SCAN_INTERVAL,
+        min_interval: float = config.SCHEDULE_MIN_INTERVAL,
+        max_interval: float = config.SCHEDULE_MAX_INTERVAL,
+        budget_per_hour: float = config.SOURCE_POLL_BUDGET,
+        clock: Optional[Clock] = None,
+    ):
+        self.path = path or config.SCHEDULE_FILE
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.budget_per_hour = budget_per_hour
+        self._clock = clock
+        self.first_seen: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, SourceSchedule] = {
+            url: SourceSchedule(url=url, interval=base_interval) for url in sources
+        }
+        self._load()
+
+    @property
+    def clock(self) -> Clock:
+        return self._clock or get_clock()
+
+    def _load(self) -> None:
+        raw = load_json(self.path, {})
+        if not isinstance(raw, dict):
+            return
+        known = {f.name for f in fields(SourceSchedule)}
+        for url, data in raw.get("sources", {}).items():
+            if url in self.sources:
+                values = {k: v for k, v in data.items() if k in known}
+                values["url"] = url
+                self.sources[url] = SourceSchedule(**values)
+        self.first_seen = raw.get("first_seen", {})
+
+    def save(self) -> None:
+        if len(self.first_seen) > _MAX_FIRST_SEEN:
+            newest = sorted(
+                self.first_seen.items(), key=lambda item: float(item[1]["at"])
+            )[-_MAX_FIRST_SEEN:]
+            self.first_seen = dict(newest)
+        save_json(
+            self.path,
+            {
+                "sources": {url: asdict(s) for url, s in self.sources.items()},
+                "first_seen": self.first_seen,
+            },
+        )
+
+    def interval(self, url: str) -> float:
+        return self.sources[url].interval
+
+    def due_sources(self, now: Optional[float] = None) -> List[str]:
+        now = self.clock.time() if now is None else now
+        return [url for url, s in self.sources.items() if s.next_due <= now]
+
+    def seconds_until_next_due(self, now: Optional[float] = None) -> float:
+        now = self.clock.time() if now is None else now
+        if not self.sources:
+            return self.base_interval
+        return max(0.0, min(s.next_due for s in self.sources.values()) - now)
+
+    def record_cycle(
+        self,
+        polled: Iterable[str],
+        codes_by_source: Mapping[str, Iterable[str]],
+        known_codes: Set[str],
+        now: Optional[float] = None,
+    ) -> None:
+        """Update history after polling ``polled`` and reschedule them.
+
+        ``known_codes`` are codes that were already known before this cycle
+        (for example from ``codes_log.json``); they count as late reports
+        for any source that repeats them.
+        """
+        now = self.clock.time() if now is None else now
+        hour = self.clock.localtime(now).tm_hour
+        for url, codes in codes_by_source.items():
+            state = self.sources.get(url)
+            if state is not None:
+                for code in codes:
+                    self._record_report(state, code, known_codes, now, hour)
+
+        for url in polled:
+            if url in self.sources:
+                self.sources[url].polls += 1
+        self._recompute(now)
+        for url in polled:
+            if url in self.sources:
+                self.sources[url].next_due = now + self.sources[url].interval
+
+    def _record_report(
+        self,
+        state: SourceSchedule,
+        code: str,
+        known_codes: Set[str],
+        now: float,
+        hour: int,
+    ) -> None:
+        """Count ``state``'s source listing ``code`` as a first or late report."""
+        entry = self.first_seen.get(code)
+        if entry is None:
+            # Codes known before history began have no first publisher.
+            fresh = code not in known_codes
+            entry = {"source": state.url if fresh else "", "at": now if fresh else 0}
+            self.first_seen[code] = entry
+        seen_by = entry.setdefault("seen_by", [])
+        if state.url in seen_by:
+            return
+        seen_by.append(state.url)
+        if entry["source"] and float(entry["at"]) == now:
+            # Every source reporting a fresh code in the same cycle ties.
+            state.first_reports += 1
+            state.first_report_hours[hour] += 1
+        else:
+            state.late_reports += 1
+            if entry["source"]:
+                state.lag_total += now - float(entry["at"])
+
+    def _recompute(self, now: float) -> None:
+        hour = self.clock.localtime(now).tm_hour
+        intervals: Dict[str, float] = {}
+        for url, state in self.sources.items():
+            # first_rate is 0.5 with no history, which maps to base_interval.
+            weight = 2 * state.first_rate * state.hour_factor(hour)
+            intervals[url] = self._clamp(self.base_interval / max(weight, 1e-6))
+
+        polls_per_hour = sum(3600 / value for value in intervals.values())
+        if self.budget_per_hour > 0 and polls_per_hour > self.budget_per_hour:
+            scale = polls_per_hour / self.budget_per_hour
+            intervals = {url: self._clamp(v * scale) for url, v in intervals.items()}
+
+        for url, value in intervals.items():
+            state = self.sources[url]
+            if abs(state.interval - value) > 1:
+                logger.debug(
+                    f"Polling interval for {url}: {state.interval / 60:.0f}m -> "
+                    f"{value / 60:.0f}m"
+                )
+            state.interval = value
+
+    def _clamp(self, value: float) -> float:
+        return min(self.max_interval, max(self.min_interval, value))
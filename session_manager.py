@@ -1,6 +1,7 @@
-from playwright.sync_api import sync_playwright
 import requests
 import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 from utils import (
     logger,
     save_json,
@@ -10,22 +11,28 @@ from utils import (
     generate_encryption_key,
 )
 from config import config
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from metrics import SESSION_REFRESHES
+from http_pool import configure_session, make_adapter
+from deadlines import make_retry, request_timeout
 
 
 def get_session_with_retry() -> requests.Session:
+    """Session whose GET/HEAD requests retry within the current deadline."""
     session = requests.Session()
-    retry = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    session.headers.update(config.HEADERS)
+    configure_session(session, make_adapter(max_retries=make_retry()))
     return session
 
 
-def refresh_cookies(verbose: bool = False):
-    """Refresh cookies using Playwright browser automation."""
+def refresh_cookies(
+    verbose: bool = False, cookies_file: Optional[str] = None
+) -> bool:
+    """Refresh cookies using Playwright browser automation.
+
+    The browser's cookies are only saved if they hold a working login, so an
+    abandoned login window never replaces the saved cookies with anonymous
+    ones. Returns whether new cookies were saved.
+    """
+    cookies_file = cookies_file or config.COOKIES_FILE
     logger.info("Launching Playwright for manual login...")
 
     if config.ENCRYPT_COOKIES and not config.SECRET_KEY:
@@ -35,6 +42,10 @@ def refresh_cookies(verbose: bool = False):
             "secure password."
         )
 
+    # Imported here so processes that never log in do not load Playwright.
+    from playwright.sync_api import sync_playwright
+
+    SESSION_REFRESHES.inc()
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         context = browser.new_context()
@@ -42,15 +53,11 @@ def refresh_cookies(verbose: bool = False):
         page.goto(config.LOGIN_URL)
         page.wait_for_timeout(config.PLAYWRIGHT_TIMEOUT)
         cookies = context.cookies()
-
-        # Save cookies with encryption if enabled
-        if config.ENCRYPT_COOKIES and config.SECRET_KEY:
-            encryption_key = generate_encryption_key(config.SECRET_KEY)
-            save_encrypted_json(config.COOKIES_FILE, cookies, encryption_key)
-            logger.info("Cookies encrypted and saved.")
+        logged_in = verify_login(_session_from_cookies(cookies))
+        if logged_in:
+            _write_cookies(cookies_file, cookies)
         else:
-            save_json(config.COOKIES_FILE, cookies)
-            logger.info("Cookies saved (unencrypted).")
+            logger.error("Login was not completed; keeping the saved cookies.")
 
         # Only close browser if not in verbose mode
         if not verbose:
@@ -61,31 +68,96 @@ def refresh_cookies(verbose: bool = False):
                 "Cookie refresh process completed. "
                 "Browser left open for verbose mode."
             )
+    return logged_in
+
+
+def _write_cookies(cookies_file: str, cookies: List[Dict[str, Any]]) -> None:
+    """Save cookies with encryption if enabled."""
+    if config.ENCRYPT_COOKIES and config.SECRET_KEY:
+        encryption_key = generate_encryption_key(config.SECRET_KEY)
+        save_encrypted_json(cookies_file, cookies, encryption_key)
+        logger.info("Cookies encrypted and saved.")
+    else:
+        save_json(cookies_file, cookies)
+        logger.info("Cookies saved (unencrypted).")
 
 
-def get_session() -> requests.Session:
+def get_session(cookies_file: Optional[str] = None) -> requests.Session:
     """Get authenticated session with cookies loaded."""
-    if not os.path.exists(config.COOKIES_FILE):
-        refresh_cookies()
+    cookies_file = cookies_file or config.COOKIES_FILE
+    if not os.path.exists(cookies_file):
+        refresh_cookies(cookies_file=cookies_file)
 
     # Load cookies with decryption if enabled
     if config.ENCRYPT_COOKIES and config.SECRET_KEY:
         encryption_key = generate_encryption_key(config.SECRET_KEY)
-        cookies = load_encrypted_json(config.COOKIES_FILE, encryption_key)
+        cookies = load_encrypted_json(cookies_file, encryption_key)
     else:
-        cookies = load_json(config.COOKIES_FILE)
+        cookies = load_json(cookies_file)
+    return _session_from_cookies(cookies)
 
+
+def _session_from_cookies(cookies: List[Dict[str, Any]]) -> requests.Session:
+    """Session holding ``cookies`` as Playwright saves them."""
     session = get_session_with_retry()
+    default_domain = urlsplit(config.BASE_URL).hostname or ""
     for c in cookies:
+        # Playwright stores session cookies with expires -1.
+        expires = c.get("expires")
         session.cookies.set(
-            c["name"], c["value"], domain=c.get("domain", "shift.gearboxsoftware.com")
+            c["name"],
+            c["value"],
+            domain=c.get("domain", default_domain),
+            path=c.get("path", "/"),
+            expires=int(expires) if expires and expires > 0 else None,
+            secure=bool(c.get("secure", False)),
         )
     return session
 
 
+def session_cookies(session: requests.Session) -> List[Dict[str, Any]]:
+    """The session's current cookies in the same layout Playwright saves."""
+    return [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "expires": cookie.expires if cookie.expires else -1,
+            "secure": cookie.secure,
+        }
+        for cookie in session.cookies
+    ]
+
+
+def save_session_cookies(
+    session: requests.Session, cookies_file: Optional[str] = None
+) -> None:
+    """Write cookies the server rotated back to ``cookies_file``."""
+    _write_cookies(cookies_file or config.COOKIES_FILE, session_cookies(session))
+
+
+def cookie_expiry(session: requests.Session) -> Optional[float]:
+    """When the SHiFT login cookie expires (None if missing or a session cookie).
+
+    Only ``SESSION_COOKIE`` counts: other cookies, such as Cloudflare's
+    half-hour ``__cf_bm``, are reissued on their own and say nothing about
+    the login.
+    """
+    host = urlsplit(config.BASE_URL).hostname or ""
+    for cookie in session.cookies:
+        if (
+            cookie.name == config.SESSION_COOKIE
+            and cookie.expires
+            and host.endswith(cookie.domain.lstrip("."))
+        ):
+            return float(cookie.expires)
+    return None
+
+
 def verify_login(session: requests.Session) -> bool:
     try:
-        resp = session.get(config.REDEEM_URL, timeout=10)
+        resp = session.get(config.REDEEM_URL, timeout=request_timeout(10))
         resp.raise_for_status()
         return "Sign In" not in resp.text
     except Exception as e:
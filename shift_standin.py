@@ -0,0 +1,267 @@
+import argparse
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from html import escape
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+from utils import logger
+
+REDEEMABLE = "redeemable"
+EXPIRED = "expired"
+USED = "used"
+INVALID = "invalid"
+
+_PAGES = {
+    EXPIRED: "<p>This SHiFT code has expired.</p>",
+    USED: "<p>This SHiFT code has already been used.</p>",
+    INVALID: "<p>This SHiFT code is invalid.</p>",
+}
+_SUCCESS_PAGE = "<p>Your code was successfully redeemed.</p>"
+
+
+@dataclass
+class StandinOptions:
+    """Behaviour of the stand-in SHiFT server."""
+
+    platforms: List[str] = field(default_factory=lambda: ["Steam", "Xbox", "PSN"])
+    # Outcome for codes not listed in ``codes``.
+    default_outcome: str = REDEEMABLE
+    codes: Dict[str, str] = field(default_factory=dict)
+    # Title shown above the platform forms, per code or by default.
+    default_title: str = "Borderlands 4"
+    titles: Dict[str, str] = field(default_factory=dict)
+    # Seconds added to every response, plus up to ``jitter`` more.
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Requests allowed per second before answering 429 (0 disables).
+    max_rps: float = 0.0
+    # Only answer the lookup on ``entitlement_offer_codes.json``.
+    json_lookup_only: bool = False
+
+
+class StandinState:
+    """Issued CSRF tokens, sessions and per-session redemptions."""
+
+    def __init__(self, options: StandinOptions):
+        self.options = options
+        self.tokens: Set[str] = set()
+        self.redeemed: Set[Tuple[str, str]] = set()
+        self.requests = 0
+        self.throttled = 0
+        self._recent: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def outcome(self, code: str) -> str:
+        return self.options.codes.get(code, self.options.default_outcome)
+
+    def new_token(self) -> str:
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self.tokens.add(token)
+        return token
+
+    def admit(self) -> bool:
+        """Count a request; False when it exceeds ``max_rps``."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            if self.options.max_rps <= 0:
+                return True
+            while self._recent and self._recent[0] <= now - 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.options.max_rps:
+                self.throttled += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def redeem(self, session_id: str, code: str) -> bool:
+        """Record a redemption; False if this session already redeemed it."""
+        with self._lock:
+            if (session_id, code) in self.redeemed:
+                return False
+            self.redeemed.add((session_id, code))
+            return True
+
+
+def _platform_forms(code: str, token: str, platforms: List[str], title: str) -> str:
+    forms = []
+    for platform in platforms:
+        forms.append(
+            '<form action="/code_redemptions" method="post">'
+            f'<input type="hidden" name="authenticity_token" value="{token}">'
+            '<input type="hidden" name="archway_code_redemption[code]" '
+            f'value="{escape(code)}">'
+            '<input type="hidden" name="archway_code_redemption[service]" '
+            f'value="{escape(platform.lower())}">'
+            f'<input type="submit" name="commit" value="Redeem for {escape(platform)}">'
+            "</form>"
+        )
+    return f"<h2>{escape(title)}</h2>" + "".join(forms)
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    server: "StandinServer"
+
+    def _send(
+        self, status: int, body: str, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay_and_admit(self) -> bool:
+        options = self.server.state.options
+        delay = options.latency + random.uniform(0, options.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.server.state.admit():
+            return True
+        self._send(429, "<p>Too many requests</p>", {"Retry-After": "1"})
+        return False
+
+    def _session_id(self) -> str:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get("_session_id")
+        return morsel.value if morsel else ""
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8")
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    def do_HEAD(self) -> None:  # noqa: N802 - http.server naming
+        self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if not self._delay_and_admit():
+            return
+        path = self.path.split("?", 1)[0]
+        if path not in ("/rewards", "/home"):
+            self._send(404, "<p>Not found</p>")
+            return
+        token = self.server.state.new_token()
+        headers = {}
+        if not self._session_id():
+            headers["Set-Cookie"] = f"_session_id={secrets.token_hex(8)}; Path=/"
+        self._send(
+            200,
+            f'<html><head><meta name="csrf-token" content="{token}"></head>'
+            "<body><h1>Rewards</h1></body></html>",
+            headers,
+        )
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        if not self._delay_and_admit():
+            return
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+        form = self._form()
+
+        if path in ("/entitlement_offer_codes", "/entitlement_offer_codes.json"):
+            if state.options.json_lookup_only and not path.endswith(".json"):
+                self._send(404, "<p>Not found</p>")
+                return
+            token = self.headers.get("X-CSRF-Token") or form.get("authenticity_token")
+            if token not in state.tokens:
+                self._send(422, "<p>Bad authenticity token</p>")
+                return
+            code = form.get("shift_code", "").strip().upper()
+            outcome = state.outcome(code)
+            if outcome == REDEEMABLE:
+                title = state.options.titles.get(code, state.options.default_title)
+                forms = _platform_forms(code, token, state.options.platforms, title)
+                self._send(200, forms)
+            else:
+                self._send(200, _PAGES[outcome])
+            return
+
+        if path == "/code_redemptions":
+            if form.get("authenticity_token") not in state.tokens:
+                self._send(422, "<p>Bad authenticity token</p>")
+                return
+            code = form.get("archway_code_redemption[code]", "")
+            if state.redeem(self._session_id(), code):
+                self._send(200, _SUCCESS_PAGE)
+            else:
+                self._send(200, _PAGES[USED])
+            return
+
+        self._send(404, "<p>Not found</p>")
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("standin: " + format, *args)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Local HTTP server imitating the SHiFT rewards endpoints.
+
+    ``GET /rewards`` serves a CSRF token and a session cookie, the entitlement
+    lookup answers with one redemption form per platform (or an expired /
+    used / invalid page) and ``/code_redemptions`` accepts the platform form.
+    Latency, 429 throttling and the ``.json``-only lookup are configured with
+    ``StandinOptions``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, options: Optional[StandinOptions] = None, port: int = 0):
+        super().__init__(("127.0.0.1", port), _StandinHandler)
+        self.state = StandinState(options or StandinOptions())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        threading.Thread(
+            target=self.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="shift-standin",
+            daemon=True,
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SHiFT stand-in server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0)
+    parser.add_argument("--json-lookup-only", action="store_true")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        StandinOptions(
+            latency=args.latency,
+            jitter=args.jitter,
+            max_rps=args.max_rps,
+            json_lookup_only=args.json_lookup_only,
+        ),
+        port=args.port,
+    )
+    print(f"SHiFT stand-in listening on {server.base_url}")
+    print(f"Run the watcher with SHIFT_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
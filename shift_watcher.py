@@ -1,10 +1,5 @@
-import time
-import random
 import argparse
 
-# Global verbose flag
-verbose_mode = False
-
 
 # Check dependencies before importing other modules
 def check_dependencies():
@@ -53,220 +48,74 @@ def check_dependencies():
     return True
 
 
-# Only import other modules if dependencies are available
-if not check_dependencies():
+# Only import other modules if dependencies are available. Parse workers
+# re-import this script (as __mp_main__) and skip the check.
+if __name__ == "__main__" and not check_dependencies():
     exit(1)
 
 from colorama import Fore, Style, init
-from tqdm import tqdm
 
+from clock import strftime
 from config import config
-from session_manager import get_session, refresh_cookies, verify_login
-from code_fetcher import fetch_new_codes
-from code_redeemer import redeem_code
-from rate_limiter import RateLimiter
-from utils import load_json, save_json, notify, logger, setup_logging
-
-init(autoreset=True)
-rate_limiter = RateLimiter()
-
-
-def main(verbose: bool = False):
-    global verbose_mode
-    verbose_mode = verbose
-
-    # Reconfigure logging for verbose mode
-    if verbose_mode:
+from deadlines import deadline
+from intake import CodeIntake, start_intake_servers
+from memory_monitor import memory_monitor
+from metrics import start_metrics_server
+from profiler import cycle_profiler
+from tracing import tracer
+from utils import logger, setup_logging
+from watcher import make_watcher
+
+
+def main(args: argparse.Namespace) -> None:
+    """Build the watcher and run it until interrupted."""
+    init(autoreset=True)
+    if args.verbose:
         setup_logging("DEBUG")
-
-    if verbose_mode:
         print(
-            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Starting SHiFT Code "
+            f"{Fore.BLUE}[{strftime('%H:%M:%S')}] Starting SHiFT Code "
             f"Watcher (verbose mode){Style.RESET_ALL}"
         )
+    watcher = make_watcher(verbose=args.verbose)
 
-    session = get_session()
-    if verbose_mode:
-        print(
-            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Session loaded, "
-            f"verifying login...{Style.RESET_ALL}"
-        )
-
-    if not verify_login(session):
-        if verbose_mode:
-            print(
-                f"{Fore.YELLOW}[{time.strftime('%H:%M:%S')}] Session expired, "
-                f"refreshing cookies...{Style.RESET_ALL}"
-            )
-        notify(
-            config.APPRISE_URL, "ShiftWatcher", "Session expired — refreshing cookies."
-        )
-        refresh_cookies(verbose=verbose_mode)
-        session = get_session()
-        if not verify_login(session):
-            if verbose_mode:
-                print(
-                    f"{Fore.RED}[{time.strftime('%H:%M:%S')}] Login failed "
-                    f"after refresh{Style.RESET_ALL}"
-                )
-            notify(config.APPRISE_URL, "ShiftWatcher", "Login failed after refresh.")
-            return
+    start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+    start_intake_servers(CodeIntake(watcher.work_queue, wake=watcher.wake))
+    cycle_profiler.enabled = args.profile
+    memory_monitor.enabled = args.trace_memory
+    memory_monitor.start()
 
-    all_codes = load_json(config.LOG_FILE, [])
-    used_codes = load_json(config.USED_FILE, [])
-    if verbose_mode:
-        timestamp = time.strftime("%H:%M:%S")
-        print(
-            f"{Fore.BLUE}[{timestamp}] Loaded {len(all_codes)} "
-            f"known codes, {len(used_codes)} used{Style.RESET_ALL}"
-        )
+    if args.reddit:
+        # Import reddit parser only when needed
+        from reddit_parser import monitor_reddit_for_codes
 
-    new_codes = fetch_new_codes()
-    if verbose_mode:
-        timestamp = time.strftime("%H:%M:%S")
-        print(
-            f"{Fore.BLUE}[{timestamp}] Fetched {len(new_codes)} "
-            f"codes from sources{Style.RESET_ALL}"
-        )
+        # Get authenticated sessions for Reddit monitoring
+        active = watcher.log_in()
+        if not active:
+            print(f"{Fore.RED}Login failed after refresh{Style.RESET_ALL}")
+            exit(1)
 
-    fresh = [c for c in new_codes if c not in all_codes and c not in used_codes]
-    if not fresh:
-        print(
-            f"{Fore.GREEN}[{time.strftime('%H:%M:%S')}] All current codes "
-            f"checked. 🎉{Style.RESET_ALL}"
-        )
+        # Start Reddit monitoring (runs indefinitely)
+        monitor_reddit_for_codes(watcher, active)
         return
 
-    if verbose_mode:
-        print(
-            f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Found {len(fresh)} "
-            f"new codes to check{Style.RESET_ALL}"
-        )
-
-    all_codes.extend(fresh)
-    save_json(config.LOG_FILE, all_codes)
-    notify(config.APPRISE_URL, "New SHiFT Codes Found", "New Code or Codes Found")
-    print(f"{Fore.CYAN}=== Checking {len(fresh)} new codes ==={Style.RESET_ALL}")
-
-    success_count = 0
-    fail_count = 0
-    check_counter = 0
-
-    with tqdm(
-        total=len(fresh), desc="Redeeming Codes", ncols=100, disable=verbose_mode
-    ) as pbar:
-        for code in fresh:
-            result = redeem_code(session, code)
-            check_counter += 1
-            if result == "redeemed":
-                status = f"{Fore.GREEN}GOOD{Style.RESET_ALL}"
-                success_count += 1
-                notify(config.APPRISE_URL, "Code Redeemed", f"✅ {code}")
-                rate_limiter.reset()
-                if verbose_mode:
-                    timestamp = time.strftime("%H:%M:%S")
-                    print(
-                        f"{Fore.GREEN}[{timestamp}] Code redeemed "
-                        f"successfully: {code}{Style.RESET_ALL}"
-                    )
-            elif result == "used":
-                status = f"{Fore.RED}ALREADY REDEEMED{Style.RESET_ALL}"
-                fail_count += 1
-                used_codes.append(code)
-                save_json(config.USED_FILE, used_codes)
-                rate_limiter.increase()
-                if verbose_mode:
-                    timestamp = time.strftime("%H:%M:%S")
-                    print(
-                        f"{Fore.RED}[{timestamp}] Code already "
-                        f"redeemed: {code}{Style.RESET_ALL}"
-                    )
-            elif result == "expired":
-                status = f"{Fore.YELLOW}EXPIRED{Style.RESET_ALL}"
-                fail_count += 1
-                used_codes.append(code)
-                save_json(config.USED_FILE, used_codes)
-                rate_limiter.increase()
-                if verbose_mode:
-                    timestamp = time.strftime("%H:%M:%S")
-                    print(
-                        f"{Fore.YELLOW}[{timestamp}] Code expired: "
-                        f"{code}{Style.RESET_ALL}"
-                    )
-            elif result == "invalid":
-                status = f"{Fore.RED}INVALID{Style.RESET_ALL}"
-                fail_count += 1
-                used_codes.append(code)
-                save_json(config.USED_FILE, used_codes)
-                rate_limiter.increase()
-                if verbose_mode:
-                    timestamp = time.strftime("%H:%M:%S")
-                    print(
-                        f"{Fore.RED}[{timestamp}] Invalid code: "
-                        f"{code}{Style.RESET_ALL}"
-                    )
-            else:
-                status = f"{Fore.YELLOW}FAILED{Style.RESET_ALL}"
-                fail_count += 1
-                rate_limiter.increase()
-                if verbose_mode:
-                    timestamp = time.strftime("%H:%M:%S")
-                    print(
-                        f"{Fore.YELLOW}[{timestamp}] Failed to "
-                        f"redeem code: {code}{Style.RESET_ALL}"
-                    )
-
-            if not verbose_mode:
-                tqdm.write(f"{Fore.WHITE}{code} → Status: {status}")
-
-            # Human like random delay 3-7 seconds
-            delay = random.uniform(3, 7)
-            if verbose_mode:
-                timestamp = time.strftime("%H:%M:%S")
-                print(
-                    f"{Fore.BLUE}[{timestamp}] Waiting {delay:.1f}s "
-                    f"before next code...{Style.RESET_ALL}"
-                )
-            time.sleep(delay)
-            if not verbose_mode:
-                pbar.update(1)
-
-            # Periodic update every 5 codes
-            if check_counter % 5 == 0 or check_counter == len(fresh):
-                if verbose_mode:
-                    print(
-                        f"{Fore.BLUE}[{time.strftime('%H:%M:%S')}] Progress: "
-                        f"{check_counter}/{len(fresh)} codes processed "
-                        f"({success_count} good, {fail_count} failed)"
-                        f"{Style.RESET_ALL}"
-                    )
-                else:
-                    pbar.set_description_str(
-                        f"Processed {check_counter}/{len(fresh)} | "
-                        f"Success: {Fore.GREEN}{success_count}{Style.RESET_ALL} | "
-                        f"Failed: {Fore.RED}{fail_count}{Style.RESET_ALL}"
-                    )
-
-    if verbose_mode:
-        print(
-            f"{Fore.CYAN}[{time.strftime('%H:%M:%S')}] All codes processed — "
-            f"{success_count} redeemed, {fail_count} not available."
-            f"{Style.RESET_ALL}"
-        )
-    else:
-        print(
-            f"\n{Fore.CYAN}All codes processed — {success_count} redeemed, "
-            f"{fail_count} not available.{Style.RESET_ALL}"
-        )
-
-    # Status message: waiting for next check
-    hours = config.SCAN_INTERVAL // 3600
-    minutes = (config.SCAN_INTERVAL % 3600) // 60
-    time_str = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
-    print(
-        f"{Fore.YELLOW}[{time.strftime('%H:%M:%S')}] Waiting for new codes... "
-        f"Next check in {time_str}{Style.RESET_ALL}"
-    )
+    # Regular monitoring mode
+    while True:
+        try:
+            with (
+                memory_monitor.cycle("main"),
+                cycle_profiler.cycle("main"),
+                tracer.span("cycle"),
+                deadline(
+                    "cycle",
+                    config.CYCLE_DEADLINE,
+                    retries=config.CYCLE_HTTP_RETRIES,
+                ),
+            ):
+                watcher.run_cycle()
+        except Exception as e:
+            logger.exception(f"Main loop error: {e}")
+        # Codes pushed through the intake end the wait early.
+        watcher.idle(watcher.next_wait())
 
 
 if __name__ == "__main__":
@@ -282,31 +131,14 @@ if __name__ == "__main__":
         action="store_true",
         help="Monitor Reddit RSS feed for SHiFT codes instead of configured sources",
     )
-    args = parser.parse_args()
-
-    if args.reddit:
-        # Import reddit parser only when needed
-        from reddit_parser import monitor_reddit_for_codes
-
-        # Get authenticated session for Reddit monitoring
-        session = get_session()
-        if not verify_login(session):
-            print(
-                f"{Fore.YELLOW}Session expired, refreshing cookies...{Style.RESET_ALL}"
-            )
-            refresh_cookies(verbose=args.verbose)
-            session = get_session()
-            if not verify_login(session):
-                print(f"{Fore.RED}Login failed after refresh{Style.RESET_ALL}")
-                exit(1)
-
-        # Start Reddit monitoring (runs indefinitely)
-        monitor_reddit_for_codes(session, rate_limiter, verbose=args.verbose)
-    else:
-        # Regular monitoring mode
-        while True:
-            try:
-                main(verbose=args.verbose)
-            except Exception as e:
-                logger.exception(f"Main loop error: {e}")
-            time.sleep(config.SCAN_INTERVAL)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each cycle and write .prof files plus a rolling summary",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Log tracemalloc growth per cycle and export memory metrics",
+    )
+    main(parser.parse_args())
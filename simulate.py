@@ -0,0 +1,287 @@
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import requests
+
+from accounts import Account, AccountResults
+from clock import VirtualClock, set_clock
+from config import config
+from deadlines import deadline
+from entitlements import EntitlementCache
+from extractors import ExtractedCode
+from latency import LatencyTracker
+from metrics import percentile
+from rate_limiter import RateLimiter
+from scheduler import AdaptiveScheduler
+from utils import load_json
+from watcher import Watcher
+from work_queue import WorkQueue
+
+
+@dataclass(frozen=True)
+class Appearance:
+    """``code`` shows up on ``source`` ``at`` seconds into the simulation."""
+
+    code: str
+    source: str
+    at: float
+
+
+def make_codes(count: int, seed: int = 0) -> List[str]:
+    """``count`` well-formed, repeatable fake SHiFT codes."""
+    rng = random.Random(seed)
+    alphabet = string.ascii_uppercase + string.digits
+    return [
+        "-".join("".join(rng.choice(alphabet) for _ in range(5)) for _ in range(5))
+        for _ in range(count)
+    ]
+
+
+def load_timeline(path: str) -> List[Appearance]:
+    """Read ``[{"code": ..., "source": ..., "at": seconds}, ...]`` from JSON."""
+    return [
+        Appearance(code=a["code"], source=a["source"], at=float(a["at"]))
+        for a in load_json(path, [])
+    ]
+
+
+def sample_timeline(
+    sources: Sequence[str],
+    codes: int = 20,
+    duration: float = 86400,
+    seed: int = 0,
+) -> List[Appearance]:
+    """Random codes, each published by one source first and copied by others.
+
+    The first source in ``sources`` tends to publish first; the others pick a
+    code up between a few minutes and a few hours later (or never).
+    """
+    rng = random.Random(seed)
+    weights = [len(sources) - i for i in range(len(sources))]
+    timeline = []
+    for code in make_codes(codes, seed):
+        at = rng.uniform(0, duration)
+        first = rng.choices(sources, weights)[0]
+        timeline.append(Appearance(code, first, at))
+        for source in sources:
+            if source != first and rng.random() < 0.7:
+                timeline.append(Appearance(code, source, at + rng.uniform(300, 14400)))
+    return timeline
+
+
+def run_simulation(
+    timeline: Sequence[Appearance],
+    duration: float = 86400,
+    sources: Optional[Sequence[str]] = None,
+    seed: int = 0,
+    start: float = 0.0,
+    redeem_seconds: float = 2.0,
+    requests_per_code: int = 2,
+    failure_rate: float = 0.0,
+    accounts: int = 1,
+    base_interval: float = config.SCAN_INTERVAL,
+    min_interval: float = config.SCHEDULE_MIN_INTERVAL,
+    max_interval: float = config.SCHEDULE_MAX_INTERVAL,
+    budget_per_hour: float = config.SOURCE_POLL_BUDGET,
+) -> Dict[str, object]:
+    """Replay ``timeline`` through the watcher's cycle on a virtual clock.
+
+    A real ``Watcher`` polls, queues and redeems with its scheduler, work
+    queue, latency tracker, per-account rate limiters, retries and deadlines,
+    against a ``VirtualClock`` and state files in a temporary directory. Only
+    the network is stubbed: fetching a due source returns the codes that
+    have appeared on it by then, and each redemption takes
+    ``redeem_seconds`` and ``requests_per_code`` requests and fails
+    (transiently, so it is retried) with probability ``failure_rate``.
+    Latencies are measured from when a code really appeared on its first
+    source, which the watcher itself cannot know.
+    """
+    urls = list(sources or dict.fromkeys(a.source for a in timeline))
+    by_source: Dict[str, List[Appearance]] = {url: [] for url in urls}
+    for appearance in timeline:
+        if appearance.source in by_source:
+            by_source[appearance.source].append(appearance)
+    appeared: Dict[str, float] = {}
+    for appearance in timeline:
+        appeared[appearance.code] = min(
+            appearance.at, appeared.get(appearance.code, appearance.at)
+        )
+
+    clock = VirtualClock(start, seed)
+    sent = {"source": 0, "redeem": 0}
+
+    def fetch(due: Iterable[str]) -> Dict[str, Dict[str, ExtractedCode]]:
+        due = list(due)
+        sent["source"] += len(due)
+        elapsed = clock.time() - start
+        return {
+            url: {
+                a.code: ExtractedCode(a.code) for a in by_source[url] if a.at <= elapsed
+            }
+            for url in due
+        }
+
+    def redeem_code(session: object, code: str) -> str:
+        clock.sleep(redeem_seconds)
+        sent["redeem"] += requests_per_code
+        return "failed" if clock.random.random() < failure_rate else "redeemed"
+
+    previous = set_clock(clock)
+    cycles = 0
+    all_codes: List[str] = []
+    used_codes: List[str] = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            watcher = Watcher(
+                accounts=[
+                    Account(
+                        name=f"sim{i + 1}",
+                        cookies_file="",
+                        rate_limiter=RateLimiter(clock=clock),
+                        session=requests.Session(),
+                    )
+                    for i in range(accounts)
+                ],
+                scheduler=AdaptiveScheduler(
+                    urls,
+                    path=os.path.join(tmp, "schedule.json"),
+                    base_interval=base_interval,
+                    min_interval=min_interval,
+                    max_interval=max_interval,
+                    budget_per_hour=budget_per_hour,
+                    clock=clock,
+                ),
+                work_queue=WorkQueue(path=os.path.join(tmp, "queue.json")),
+                entitlement_cache=EntitlementCache(
+                    path=os.path.join(tmp, "entitlements.json")
+                ),
+                latency=LatencyTracker(path=os.path.join(tmp, "latency.json")),
+                account_results=AccountResults(os.path.join(tmp, "accounts.json")),
+                fetch=fetch,
+                redeem_code=redeem_code,
+                settings=replace(
+                    config,
+                    LOG_FILE=os.path.join(tmp, "codes.json"),
+                    USED_FILE=os.path.join(tmp, "used.json"),
+                    APPRISE_URL="",
+                ),
+            )
+
+            while clock.time() - start < duration:
+                cycles += 1
+                with deadline("cycle", config.CYCLE_DEADLINE):
+                    known = set(all_codes) | set(used_codes)
+                    codes_by_source = watcher.poll_sources(known)
+                    fresh = watcher.queue_fresh_codes(
+                        codes_by_source, all_codes, used_codes
+                    )
+                    all_codes.extend(fresh)
+                    watcher.work_queue.begin_cycle()
+                    total = watcher.work_queue.available_count()
+                    if total:
+                        watcher.redeem_queued(
+                            watcher.accounts, all_codes, used_codes, total
+                        )
+                clock.sleep(watcher.next_wait())
+            polls = {url: watcher.scheduler.sources[url].polls for url in urls}
+            latency = watcher.latency
+    finally:
+        set_clock(previous)
+
+    discovery = {
+        code: t.first_seen - start - appeared[code]
+        for code, t in latency.timelines.items()
+        if code in appeared
+    }
+    redemption = {
+        code: t.finished_at - start - appeared[code]
+        for code, t in latency.timelines.items()
+        if code in appeared and t.finished_at is not None
+    }
+    in_window = [code for code, at in appeared.items() if at < duration]
+    return {
+        "seconds": duration,
+        "cycles": cycles,
+        "source_requests": sent["source"],
+        "redeem_requests": sent["redeem"],
+        "requests_per_hour": sum(sent.values()) / duration * 3600,
+        "polls": polls,
+        "codes": len(in_window),
+        "missed": sorted(code for code in in_window if code not in discovery),
+        "discovery_p50": percentile(list(discovery.values()), 50),
+        "discovery_p90": percentile(list(discovery.values()), 90),
+        "discovery_max": max(discovery.values(), default=0.0),
+        "redemption_p50": percentile(list(redemption.values()), 50),
+        "redemption_p90": percentile(list(redemption.values()), 90),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, object]:
+    parser = argparse.ArgumentParser(
+        description="Simulate the watcher's polling schedule on a virtual clock"
+    )
+    parser.add_argument(
+        "--timeline",
+        default="",
+        help="JSON list of {code, source, at} appearances (default: a random sample)",
+    )
+    parser.add_argument("--codes", type=int, default=20, help="Codes in the sample")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-interval", type=float, default=config.SCAN_INTERVAL)
+    parser.add_argument("--budget", type=float, default=config.SOURCE_POLL_BUDGET)
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Share of redemptions that fail transiently and are retried",
+    )
+    args = parser.parse_args(argv)
+
+    duration = args.hours * 3600
+    if args.timeline:
+        timeline = load_timeline(args.timeline)
+    else:
+        timeline = sample_timeline(config.SOURCES, args.codes, duration, args.seed)
+    # Start at local midnight today so hour-of-day learning lines up.
+    midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+
+    wall = time.perf_counter()
+    report = run_simulation(
+        timeline,
+        duration,
+        seed=args.seed,
+        start=midnight,
+        base_interval=args.base_interval,
+        budget_per_hour=args.budget,
+        failure_rate=args.failure_rate,
+    )
+    wall = time.perf_counter() - wall
+
+    print(
+        f"Simulated {args.hours:g}h in {wall:.2f}s: {report['cycles']} cycles, "
+        f"{report['source_requests']} source requests, "
+        f"{report['redeem_requests']} redemption requests "
+        f"({report['requests_per_hour']:.1f}/h)"
+    )
+    print(
+        f"discovery p50 {report['discovery_p50'] / 60:.1f}m, "
+        f"p90 {report['discovery_p90'] / 60:.1f}m, "
+        f"max {report['discovery_max'] / 60:.1f}m; "
+        f"redeemed p50 {report['redemption_p50'] / 60:.1f}m after appearing"
+    )
+    if report["missed"]:
+        print(f"{len(report['missed'])}/{report['codes']} codes never discovered")
+    for url, polls in report["polls"].items():
+        print(f"  {polls:>5} polls  {url}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
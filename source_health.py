@@ -0,0 +1,148 @@
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+from clock import get_clock
+from config import config
+from utils import load_json, logger, save_json
+
+# Phrases served by sites that hide content behind a login or a JS shell.
+LOGIN_WALL_MARKERS = (
+    "log in to facebook",
+    "you must log in to continue",
+    "javascript is not available",
+    "sign in to x",
+    "log in to x",
+    "please enable javascript",
+)
+
+
+def looks_like_login_wall(text: str) -> bool:
+    """Return True when a page looks like a login wall or empty JavaScript shell.
+
+    Only meaningful for pages that yielded no codes; real wiki pages can
+    contain the same phrases in ``<noscript>`` blocks.
+    """
+    lowered = text[:200_000].lower()
+    return any(marker in lowered for marker in LOGIN_WALL_MARKERS)
+
+
+@dataclass
+class SourceHealth:
+    """Rolling health state for one source URL."""
+
+    url: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency_ewma: float = 0.0
+    last_success: float = 0.0
+    last_failure: float = 0.0
+    last_yield: float = 0.0
+    codes_yielded: int = 0
+    last_error: str = ""
+    open_until: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until > 0
+
+
+class SourceHealthTracker:
+    """Track per-source health and trip a circuit breaker on repeated failures.
+
+    After ``failure_threshold`` consecutive failures a source is skipped until
+    ``open_until``. Once that passes a single probe fetch is allowed; each
+    failed probe doubles the wait up to ``max_backoff``. A successful fetch
+    closes the breaker. State is persisted so restarts keep the schedule.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        base_backoff: float = config.BREAKER_BASE_BACKOFF,
+        max_backoff: float = config.BREAKER_MAX_BACKOFF,
+        smoothing: float = 0.3,
+    ):
+        self.path = path or config.SOURCE_HEALTH_FILE
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.smoothing = smoothing
+        self.sources: Dict[str, SourceHealth] = {}
+        self._load()
+
+    def _load(self) -> None:
+        known = {f.name for f in fields(SourceHealth)}
+        raw = load_json(self.path, {})
+        if not isinstance(raw, dict):
+            return
+        for url, data in raw.items():
+            values = {k: v for k, v in data.items() if k in known}
+            values["url"] = url
+            self.sources[url] = SourceHealth(**values)
+
+    def save(self) -> None:
+        save_json(
+            self.path, {url: asdict(state) for url, state in self.sources.items()}
+        )
+
+    def get(self, url: str) -> SourceHealth:
+        if url not in self.sources:
+            self.sources[url] = SourceHealth(url=url)
+        return self.sources[url]
+
+    def allow(self, url: str, now: Optional[float] = None) -> bool:
+        """Return True if the source should be fetched now."""
+        now = get_clock().time() if now is None else now
+        state = self.get(url)
+        return not state.is_open or now >= state.open_until
+
+    def _observe_latency(self, state: SourceHealth, latency: float) -> None:
+        if state.latency_ewma == 0.0:
+            state.latency_ewma = latency
+        else:
+            state.latency_ewma += self.smoothing * (latency - state.latency_ewma)
+
+    def record_success(
+        self, url: str, latency: float, codes: int = 0, now: Optional[float] = None
+    ) -> None:
+        now = get_clock().time() if now is None else now
+        state = self.get(url)
+        if state.is_open:
+            logger.info(f"Source recovered, closing circuit breaker: {url}")
+        state.successes += 1
+        state.consecutive_failures = 0
+        state.last_success = now
+        state.last_error = ""
+        state.open_until = 0.0
+        if codes:
+            state.last_yield = now
+            state.codes_yielded += codes
+        self._observe_latency(state, latency)
+
+    def record_failure(
+        self, url: str, latency: float, error: str, now: Optional[float] = None
+    ) -> None:
+        now = get_clock().time() if now is None else now
+        state = self.get(url)
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_failure = now
+        state.last_error = error[:200]
+        self._observe_latency(state, latency)
+
+        excess = state.consecutive_failures - self.failure_threshold
+        if excess >= 0:
+            backoff = min(self.base_backoff * (2 ** min(excess, 20)), self.max_backoff)
+            state.open_until = now + backoff
+            logger.warning(
+                f"Circuit breaker open for {url} after "
+                f"{state.consecutive_failures} failures; next probe in "
+                f"{backoff / 60:.0f}m"
+            )
@@ -0,0 +1,234 @@
+import os
+import tempfile
+import threading
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import requests
+
+from accounts import (
+    Account,
+    AccountResults,
+    combine_outcomes,
+    ensure_logged_in,
+    keep_alive,
+    parse_accounts,
+    persist_cookies,
+    redeem_for_accounts,
+    wait_idle,
+)
+from clock import VirtualClock, set_clock
+from config import config
+from rate_limiter import RateLimiter
+
+
+class TestAccounts:
+    """Test cases for multi-account redemption."""
+
+    def test_parse_accounts(self):
+        """Test parsing of name=cookies_file pairs."""
+        accounts = parse_accounts("main=cookies.json, alt=alt_cookies.json,")
+        assert [a.name for a in accounts] == ["main", "alt"]
+        assert [a.cookies_file for a in accounts] == [
+            "cookies.json",
+            "alt_cookies.json",
+        ]
+        assert accounts[0].rate_limiter is not accounts[1].rate_limiter
+
+    def test_parse_accounts_without_names(self):
+        """Test that bare cookie files get generated account names."""
+        accounts = parse_accounts("a.json,b.json")
+        assert [a.name for a in accounts] == ["account1", "account2"]
+
+    def test_combine_outcomes_prefers_success(self):
+        """Test that one successful account makes the code redeemed."""
+        assert combine_outcomes({"a": "used", "b": "redeemed"}) == "redeemed"
+        assert combine_outcomes({"a": "used", "b": "failed"}) == "failed"
+        assert combine_outcomes({"a": "expired", "b": "expired"}) == "expired"
+
+    @patch("code_redeemer.redeem_code")
+    def test_redeem_for_accounts_fans_out(self, mock_redeem):
+        """Test that every account redeems with its own session."""
+        sessions = {"main": Mock(), "alt": Mock()}
+        mock_redeem.side_effect = lambda session, code: (
+            "redeemed" if session is sessions["main"] else "failed"
+        )
+        accounts = [
+            Account(name=name, cookies_file=f"{name}.json", session=session)
+            for name, session in sessions.items()
+        ]
+
+        outcomes = redeem_for_accounts(accounts, "AAAAA-BBBBB-CCCCC-DDDDD-EEEEE")
+
+        assert outcomes == {"main": "redeemed", "alt": "failed"}
+        assert accounts[1].rate_limiter.delay > accounts[0].rate_limiter.delay
+
+    @patch("code_redeemer.redeem_code")
+    def test_back_to_back_redemptions_are_spaced(self, mock_redeem):
+        """Test that an account's limiter spaces consecutive redemptions."""
+        clock = VirtualClock(start=1000.0)
+        sent = []
+        mock_redeem.side_effect = lambda session, code: (
+            sent.append(clock.time()) or "failed"
+        )
+        account = Account(
+            name="main",
+            cookies_file="cookies.json",
+            session=Mock(),
+            rate_limiter=RateLimiter(min_delay=2.0, clock=clock),
+        )
+
+        redeem_for_accounts([account], "AAAAA-BBBBB-CCCCC-DDDDD-EEEEE")
+        redeem_for_accounts([account], "FFFFF-GGGGG-HHHHH-IIIII-JJJJJ")
+        redeem_for_accounts([account], "KKKKK-LLLLL-MMMMM-NNNNN-OOOOO")
+
+        assert sent[0] == 1000.0
+        # Each failed attempt doubles the account's delay.
+        assert 4.0 <= sent[1] - sent[0] <= 5.2
+        assert 8.0 <= sent[2] - sent[1] <= 10.4
+
+    @patch("code_redeemer.redeem_code")
+    def test_dead_codes_do_not_back_off(self, mock_redeem):
+        """Test that a run of expired codes keeps the account at its minimum delay."""
+        clock = VirtualClock(start=1000.0)
+        sent = []
+        mock_redeem.side_effect = lambda session, code: (
+            sent.append(clock.time()) or "expired"
+        )
+        account = Account(
+            name="main",
+            cookies_file="cookies.json",
+            session=Mock(),
+            rate_limiter=RateLimiter(min_delay=2.0, clock=clock),
+        )
+
+        for i in range(20):
+            redeem_for_accounts([account], f"CODE{i}")
+
+        assert account.rate_limiter.delay == 2.0
+        assert max(b - a for a, b in zip(sent, sent[1:])) <= 2.6
+        assert sent[-1] - sent[0] < 60
+
+    def test_account_without_session_fails(self):
+        """Test that an account that is not logged in is reported as failed."""
+        account = Account(name="main", cookies_file="cookies.json")
+        assert redeem_for_accounts([account], "CODE") == {"main": "failed"}
+
+    def test_account_results_persist(self):
+        """Test that per-account outcomes are saved and reloaded."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "accounts.json")
+            results = AccountResults(path)
+            results.record("CODE1", {"main": "redeemed", "alt": "used"})
+
+            reloaded = AccountResults(path)
+            assert reloaded.status("main", "CODE1") == "redeemed"
+            assert reloaded.status("alt", "CODE1") == "used"
+            assert reloaded.status("alt", "CODE2") is None
+
+    def test_pending_accounts_skip_final_outcomes(self):
+        """Test that retries only target accounts with transient outcomes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            results = AccountResults(os.path.join(tmp, "accounts.json"))
+            results.record("CODE1", {"main": "redeemed", "alt": "failed"})
+            main = Account(name="main", cookies_file="a.json")
+            alt = Account(name="alt", cookies_file="b.json")
+            third = Account(name="third", cookies_file="c.json")
+
+            pending = results.pending_accounts([main, alt, third], "CODE1")
+            assert [a.name for a in pending] == ["alt", "third"]
+
+    @patch("accounts.verify_login", return_value=True)
+    @patch("accounts.save_session_cookies")
+    def test_recent_verification_is_trusted(self, mock_save, mock_verify):
+        """Test that a session verified during idle time is not re-checked."""
+        session = requests.Session()
+        account = Account(name="main", cookies_file="c.json", session=session)
+        assert ensure_logged_in(account, now=1000)
+        assert ensure_logged_in(account, now=1000 + config.LOGIN_CHECK_TTL - 1)
+        assert mock_verify.call_count == 1
+        assert ensure_logged_in(account, now=1000 + config.LOGIN_CHECK_TTL)
+        assert mock_verify.call_count == 2
+
+    @patch("accounts.save_session_cookies")
+    def test_persist_cookies_only_when_changed(self, mock_save):
+        """Test that cookies are written back only after the server rotates them."""
+        session = requests.Session()
+        session.cookies.set("sid", "1", domain="shift.gearboxsoftware.com")
+        account = Account(name="main", cookies_file="c.json", session=session)
+        persist_cookies(account)
+        persist_cookies(account)
+        assert mock_save.call_count == 1
+
+        session.cookies.set("sid", "2", domain="shift.gearboxsoftware.com")
+        persist_cookies(account)
+        assert mock_save.call_count == 2
+
+    @patch("accounts.verify_login", return_value=True)
+    @patch("accounts.save_session_cookies")
+    @patch("accounts.notify")
+    @patch("accounts.refresh_cookies")
+    def test_keep_alive_warns_before_login_expires(
+        self, mock_refresh, mock_notify, mock_save, mock_verify
+    ):
+        """Test that an expiring login is reported once and never refreshed."""
+        session = requests.Session()
+        session.cookies.set(
+            config.SESSION_COOKIE,
+            "1",
+            domain="shift.gearboxsoftware.com",
+            expires=5000,
+        )
+        account = Account(name="main", cookies_file="c.json", session=session)
+
+        assert keep_alive(account, now=5000 - config.COOKIE_REFRESH_MARGIN + 60)
+        assert keep_alive(account, now=5000 - config.COOKIE_REFRESH_MARGIN + 120)
+        mock_refresh.assert_not_called()
+        assert mock_notify.call_count == 1
+        assert account.session is session
+
+    @patch("accounts.keep_alive")
+    def test_wait_idle_keeps_sessions_alive(self, mock_keep_alive):
+        """Test that idle waits renew the leader lease and keep sessions alive."""
+        account = Account(name="main", cookies_file="c.json", session=Mock())
+        logged_out = Account(name="alt", cookies_file="d.json")
+        coordinator = Mock()
+        wake = threading.Event()
+        clock = VirtualClock()
+        previous = set_clock(clock)
+        try:
+            wait_idle(
+                [account, logged_out],
+                config.KEEPALIVE_INTERVAL * 2.5,
+                wake,
+                coordinator,
+                role="reddit",
+            )
+        finally:
+            set_clock(previous)
+        assert clock.now == config.KEEPALIVE_INTERVAL * 2.5
+        assert mock_keep_alive.call_count == 3
+        coordinator.polls.assert_called_with("reddit")
+
+        wake.set()
+        wait_idle([account], 60, wake)
+        assert mock_keep_alive.call_count == 3
+        assert not wake.is_set()
+
+    @patch("accounts.verify_login", return_value=False)
+    @patch("accounts.notify")
+    @patch("accounts.get_session")
+    @patch("accounts.refresh_cookies")
+    def test_keep_alive_logs_in_only_when_allowed(
+        self, mock_refresh, mock_get_session, mock_notify, mock_verify
+    ):
+        """Test that idle time opens the login browser only when allowed."""
+        account = Account(name="main", cookies_file="c.json", session=Mock())
+        with patch("accounts.sys.stdin", None):
+            assert not keep_alive(account, now=1000)
+            mock_refresh.assert_not_called()
+            assert account.session is not None
+
+            with patch("accounts.config", replace(config, IDLE_LOGIN=True)):
+                keep_alive(account, now=2000)
+            mock_refresh.assert_called_once()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from cassette import RECORD, REPLAY, Cassette, CassetteMiss, benchmark_scan
+from config import config
+from http_pool import SessionPool
+from reddit_parser import REDDIT_RSS_URL
+
+CODE = "ABCDE-12345-FGHIJ-67890-KLMNO"
+URL = "https://example.com/codes"
+
+
+def _response(body, status=200, url=URL):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8")
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.headers["Content-Encoding"] = "gzip"
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+class TestCassette:
+    """Test cases for offline record and replay of source pages."""
+
+    def test_record_then_replay(self):
+        """Test that a recorded response is served back unchanged."""
+        with tempfile.TemporaryDirectory() as tmp:
+            Cassette(tmp, RECORD).record(URL, _response(f"<p>{CODE}</p>"))
+            assert os.listdir(tmp)[0].endswith(".json.gz")
+
+            replayed = Cassette(tmp, REPLAY).replay(URL)
+            assert replayed.status_code == 200
+            assert replayed.text == f"<p>{CODE}</p>"
+            assert replayed.headers["content-type"].startswith("text/html")
+            assert "Content-Encoding" not in replayed.headers
+
+    def test_missing_recording_is_a_request_error(self):
+        """Test that a cassette miss looks like a failed fetch."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with pytest.raises(requests.RequestException):
+                Cassette(tmp, REPLAY).replay(URL)
+            assert issubclass(CassetteMiss, requests.RequestException)
+
+    def test_injected_latency(self):
+        """Test that replay sleeps for the configured latency."""
+        with tempfile.TemporaryDirectory() as tmp:
+            Cassette(tmp, RECORD).record(URL, _response("x"))
+            start = time.perf_counter()
+            Cassette(tmp, REPLAY, latency=0.05).replay(URL)
+            assert time.perf_counter() - start >= 0.05
+
+    def test_pool_records_and_replays(self):
+        """Test that the session pool writes and reads the cassette."""
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = SessionPool(cassette=Cassette(tmp, RECORD))
+            session = pool.session_for(URL)
+            with patch.object(session, "get", return_value=_response("live")):
+                pool.get(URL)
+
+            pool.cassette = Cassette(tmp, REPLAY)
+            with patch.object(session, "get") as mock_get:
+                assert pool.get(URL).text == "live"
+                mock_get.assert_not_called()
+
+    def test_benchmark_scan_replays_all_sources(self):
+        """Test a replayed scan of every configured source plus Reddit."""
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Cassette(tmp, RECORD)
+            for url in config.SOURCES:
+                recorder.record(url, _response(f"<p>{CODE}</p>", url=url))
+            feed = (
+                '<feed xmlns="http://www.w3.org/2005/Atom"><entry>'
+                f"<content>{CODE}</content></entry></feed>"
+            )
+            recorder.record(REDDIT_RSS_URL, _response(feed, url=REDDIT_RSS_URL))
+
+            result = benchmark_scan(Cassette(tmp, REPLAY), runs=2)
+            assert result["runs"] == 2
+            assert result["pages"] == len(config.SOURCES) + 1
+            assert result["codes"] == 1
+            assert result["pages_per_second"] > 0
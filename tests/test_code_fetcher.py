@@ -0,0 +1,96 @@
+import os
+import tempfile
+import time
+from concurrent.futures import Future
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import pytest
+
+import code_fetcher
+from config import config
+from deadlines import deadline
+from metrics import CODES_REJECTED
+from source_health import SourceHealthTracker
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+PLACEHOLDER = "XXXXX-XXXXX-XXXXX-XXXXX-XXXXX"
+PAGES = {
+    "https://a.example/codes": f"<p>{CODE_A}</p><p>{PLACEHOLDER}</p>"
+    + "<p>filler</p>" * 200,
+    "https://b.example/codes": "<p>Log in to Facebook</p>",
+    "https://c.example/codes": f"<p>{CODE_B}</p>",
+}
+
+
+def _response(url, **kwargs):
+    text = PAGES[url]
+    return Mock(status_code=200, text=text, content=text.encode())
+
+
+@pytest.fixture
+def tracker():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield SourceHealthTracker(os.path.join(tmp, "health.json"))
+
+
+class TestParseStage:
+    """Test cases for parsing fetched pages in worker processes."""
+
+    def _fetch(self, tracker, **overrides):
+        settings = replace(config, SOURCES=list(PAGES), **overrides)
+        with patch.object(code_fetcher, "source_health", tracker), patch(
+            "code_fetcher.config", settings
+        ), patch.object(code_fetcher.http_pool, "get", side_effect=_response):
+            try:
+                by_source = code_fetcher.fetch_codes_by_source()
+                return by_source, code_fetcher._parse_pool is not None
+            finally:
+                code_fetcher.shutdown_parse_pool()
+
+    def test_large_pages_are_parsed_in_workers(self, tracker):
+        """Test that pooled parsing matches inline parsing and source order."""
+        pooled, used = self._fetch(tracker, PARSE_WORKERS=2, PARSE_INLINE_BYTES=1000)
+        assert used
+        assert list(pooled) == ["https://a.example/codes", "https://c.example/codes"]
+        assert set(pooled["https://a.example/codes"]) == {CODE_A}
+        assert set(pooled["https://c.example/codes"]) == {CODE_B}
+
+    def test_worker_metrics_reach_the_watcher(self, tracker):
+        """Test that placeholders rejected in a worker are counted here."""
+        before = CODES_REJECTED.value()
+        by_source, used = self._fetch(
+            tracker, PARSE_WORKERS=1, PARSE_INLINE_BYTES=1000
+        )
+        assert used
+        assert PLACEHOLDER not in by_source["https://a.example/codes"]
+        assert CODES_REJECTED.value() - before == 1
+
+    def test_worker_errors_count_as_source_failures(self, tracker):
+        """Test that a login wall found by a worker marks the source failed."""
+        by_source, _ = self._fetch(tracker, PARSE_WORKERS=2, PARSE_INLINE_BYTES=0)
+        assert "https://b.example/codes" not in by_source
+        assert tracker.get("https://b.example/codes").failures == 1
+        assert tracker.get("https://a.example/codes").failures == 0
+
+    def test_parsing_stops_at_the_cycle_deadline(self, tracker):
+        """Test that a stuck parse is cancelled once the deadline runs out."""
+        stuck = Future()
+        by_source = {}
+        start = time.perf_counter()
+        with patch.object(code_fetcher, "source_health", tracker), deadline(
+            "cycle", 0.2
+        ):
+            code_fetcher._drain_parsing(
+                {stuck: ("https://a.example/codes", "", start)}, by_source
+            )
+        assert time.perf_counter() - start < 2
+        assert stuck.cancelled()
+        assert by_source == {}
+
+    def test_inline_when_workers_disabled(self, tracker):
+        """Test that PARSE_WORKERS=0 parses every page in-process."""
+        by_source, used = self._fetch(tracker, PARSE_WORKERS=0, PARSE_INLINE_BYTES=0)
+        assert list(by_source) == ["https://a.example/codes", "https://c.example/codes"]
+        assert not used
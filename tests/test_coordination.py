@@ -0,0 +1,132 @@
+import json
+import sqlite3
+
+import pytest
+
+from coordination import SQLiteCoordinator
+from extractors import ExtractedCode
+from work_queue import DONE, IN_FLIGHT, PENDING, WorkQueue
+
+CODE_A = "AAAAA-11111-BBBBB-22222-CCCCC"
+CODE_B = "DDDDD-33333-EEEEE-44444-FFFFF"
+
+
+@pytest.fixture
+def instances(tmp_path):
+    """Two watcher instances with their own queues and a shared store."""
+    db = str(tmp_path / "shared.db")
+    queues = []
+    for name in ("host-a", "host-b"):
+        coordinator = SQLiteCoordinator(db, owner=name, leader_ttl=600)
+        queue = WorkQueue(
+            path=str(tmp_path / f"{name}.json"),
+            owner=name,
+            lease_seconds=300,
+            coordinator=coordinator,
+        )
+        for code in (CODE_A, CODE_B):
+            queue.enqueue(code, source="https://example.com", now=0)
+        queues.append(queue)
+    return queues
+
+
+class TestCoordination:
+    """Test cases for sharing work between watcher instances."""
+
+    def test_instances_split_the_queue(self, instances):
+        """Test that each code is leased to only one instance at a time."""
+        a, b = instances
+        first = a.lease(now=10)
+        second = b.lease(now=11)
+        assert {first.code, second.code} == {CODE_A, CODE_B}
+        assert b.lease(now=12) is None
+        assert b.items[first.code].state == PENDING
+
+    def test_result_from_other_instance_is_adopted(self, instances):
+        """Test that a code finished elsewhere is marked done, not redeemed."""
+        a, b = instances
+        item = a.lease(now=10)
+        a.complete(item.code, "redeemed", now=20)
+        other = b.lease(now=30)
+        assert other.code != item.code
+        assert b.items[item.code].state == DONE
+        assert b.items[item.code].result == "redeemed"
+
+    def test_dead_instance_lease_is_taken_over(self, instances):
+        """Test that a lease left by a crashed instance expires for others."""
+        a, b = instances
+        a.lease(now=10)
+        a.lease(now=10)
+        assert b.lease(now=100) is None
+        taken = b.lease(now=400)
+        assert taken is not None and taken.state == IN_FLIGHT
+        assert taken.lease_owner == "host-b"
+
+    def test_retry_keeps_the_shared_lease_until_due(self, instances):
+        """Test that another instance does not jump a scheduled retry."""
+        a, b = instances
+        item = a.lease(now=10)
+        a.complete(item.code, "failed", now=20, retry=True)
+        retry_at = a.items[item.code].retry_at
+        other = b.lease(now=30)
+        b.complete(other.code, "redeemed", now=31)
+        assert b.lease(now=retry_at - 1) is None
+        assert b.lease(now=retry_at + 1).code == item.code
+
+    def test_release_lets_another_instance_claim(self, instances):
+        """Test that releasing an unfinished code hands it back to everyone."""
+        a, b = instances
+        item = a.lease(now=10)
+        a.release(item.code, now=11)
+        codes = {b.lease(now=12).code, b.lease(now=12).code}
+        assert codes == {CODE_A, CODE_B}
+
+    def test_leader_election(self, tmp_path):
+        """Test that one instance polls until its leader lease lapses."""
+        db = str(tmp_path / "shared.db")
+        a = SQLiteCoordinator(db, owner="host-a", elect_leader=True, leader_ttl=600)
+        b = SQLiteCoordinator(db, owner="host-b", elect_leader=True, leader_ttl=600)
+        assert a.polls(now=0)
+        assert not b.polls(now=100)
+        assert a.polls(now=500)
+        assert not b.polls(now=1000)
+        assert b.polls(now=1200)
+        assert not a.polls(now=1201)
+
+    def test_codes_are_shared_between_instances(self, tmp_path):
+        """Test that codes one instance found reach the others with metadata."""
+        db = str(tmp_path / "shared.db")
+        a = SQLiteCoordinator(db, owner="host-a")
+        b = SQLiteCoordinator(db, owner="host-b")
+        found = ExtractedCode(CODE_A, reward="Golden Key", expires="Oct 31")
+        a.share_codes({"https://a.example": {CODE_A: found}}, now=0)
+        merged = b.share_codes({"https://b.example": {}}, now=10)
+        assert merged["https://a.example"][CODE_A] == found
+        assert merged["https://b.example"] == {}
+
+    def test_rows_with_dropped_fields_still_load(self, tmp_path):
+        """Test that codes published with fields no longer in ExtractedCode load."""
+        db = str(tmp_path / "shared.db")
+        a = SQLiteCoordinator(db, owner="host-a")
+        a.share_codes({}, now=0)
+        details = {"code": CODE_A, "expires": "Oct 31", "game": "Borderlands 4"}
+        with sqlite3.connect(db) as conn:
+            conn.execute(
+                "INSERT INTO codes (code, source, details, publisher, published_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (CODE_A, "https://a.example", json.dumps(details), "host-b", 5),
+            )
+        merged = a.share_codes({}, now=10)
+        assert merged["https://a.example"][CODE_A] == ExtractedCode(
+            CODE_A, expires="Oct 31"
+        )
+
+    def test_unreachable_store_fails_open(self, tmp_path):
+        """Test that an unusable store does not stop redemption or polling."""
+        coordinator = SQLiteCoordinator(
+            str(tmp_path / "shared.db"), owner="host-a", elect_leader=True
+        )
+        coordinator.path = str(tmp_path)
+        assert coordinator.claim(CODE_A, 300).granted
+        assert coordinator.polls()
+        assert coordinator.share_codes({}) == {}
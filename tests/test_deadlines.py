@@ -0,0 +1,116 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests
+
+import deadlines
+from accounts import Account, redeem_for_accounts
+from deadlines import DeadlineExceeded, deadline, request_timeout
+from session_manager import get_session_with_retry
+
+
+class _Unavailable(BaseHTTPRequestHandler):
+    """Answers every request with 503 and counts them."""
+
+    hits = 0
+
+    def _fail(self):
+        type(self).hits += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = _fail
+    do_POST = _fail
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable():
+    _Unavailable.hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Unavailable)
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class TestDeadlines:
+    """Test cases for deadline propagation and retry budgets."""
+
+    def test_nested_deadline_never_outlives_parent(self):
+        """Test that inner scopes are capped by the enclosing deadline."""
+        assert deadlines.remaining() == float("inf")
+        with deadline("cycle", 2):
+            with deadline("code", 60) as code:
+                assert code.remaining() <= 2
+                assert request_timeout(15) <= 2
+            assert deadlines.current().name == "cycle"
+        assert deadlines.current() is None
+
+    def test_expired_deadline_refuses_requests(self):
+        """Test that no request starts once the deadline has passed."""
+        with deadline("code", 0.01):
+            time.sleep(0.02)
+            with pytest.raises(DeadlineExceeded):
+                request_timeout(what="lookup")
+            assert not deadlines.time_left_for(0)
+
+    def test_retry_budget_is_shared_with_parent(self):
+        """Test that retries count against every enclosing budget."""
+        with deadline("cycle", 0, retries=3) as cycle:
+            with deadline("code", 0, retries=2) as code:
+                assert code.take_retry() and code.take_retry()
+                assert not code.take_retry()
+            assert cycle.retries == 1
+
+    def test_get_retries_within_budget(self, unavailable):
+        """Test that a failing GET is retried only as far as the budget allows."""
+        session = get_session_with_retry()
+        with deadline("cycle", 60, retries=1):
+            with pytest.raises(requests.RequestException):
+                session.get(unavailable, timeout=request_timeout())
+        assert _Unavailable.hits == 2
+
+    def test_no_retry_without_time_for_another_attempt(self, unavailable):
+        """Test that a retry is skipped when it would overrun the deadline."""
+        session = get_session_with_retry()
+        with deadline("code", 5):
+            with pytest.raises(requests.RequestException):
+                session.get(unavailable, timeout=request_timeout())
+        assert _Unavailable.hits == 1
+
+    def test_post_is_never_retried(self, unavailable):
+        """Test that non-idempotent requests are sent exactly once."""
+        session = get_session_with_retry()
+        with deadline("cycle", 60):
+            response = session.post(unavailable, data={"code": "x"}, timeout=5)
+        assert response.status_code == 503
+        assert _Unavailable.hits == 1
+
+    @patch("code_redeemer.redeem_code")
+    def test_code_deadline_reaches_account_threads(self, mock_redeem):
+        """Test that each account's redemption runs under the code deadline."""
+        seen = []
+
+        def _redeem(session, code):
+            seen.append(deadlines.current().name)
+            return "redeemed"
+
+        mock_redeem.side_effect = _redeem
+        accounts = [
+            Account(name=name, cookies_file=f"{name}.json", session=object())
+            for name in ("main", "alt")
+        ]
+        with deadline("cycle", 60):
+            redeem_for_accounts(accounts, "ABCDE-12345-FGHIJ-67890-KLMNO")
+        assert seen == ["code", "code"]
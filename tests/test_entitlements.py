@@ -0,0 +1,80 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import requests
+
+from accounts import Account, redeem_for_accounts
+from config import config
+from entitlements import EntitlementCache, LookupResult, validate_codes
+from shift_standin import EXPIRED, INVALID, StandinOptions, StandinServer
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+CODE_C = "QWERT-11111-ASDFG-22222-ZXCVB"
+
+
+class TestEntitlements:
+    """Test cases for lookup-only validation and the results cache."""
+
+    def test_cache_ttl_and_persistence(self):
+        """Test that results expire after the TTL and survive a reload."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "entitlements.json")
+            cache = EntitlementCache(path, ttl=100)
+            cache.record(LookupResult(CODE_A, "expired", checked_at=1000))
+            assert cache.dead_status(CODE_A, now=1050) == "expired"
+            assert cache.dead_status(CODE_A, now=1101) is None
+
+            cache.record(LookupResult(CODE_B, "available", ["Steam"], 1000))
+            cache.save(now=1050)
+            reloaded = EntitlementCache(path, ttl=100)
+            assert reloaded.get(CODE_B, now=1050).platforms == ["Steam"]
+            assert reloaded.dead_status(CODE_B, now=1050) is None
+
+    def test_validate_codes_uses_lookup_only(self):
+        """Test bulk classification against the stand-in server."""
+        server = StandinServer(
+            StandinOptions(codes={CODE_B: EXPIRED, CODE_C: INVALID})
+        ).start()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = EntitlementCache(os.path.join(tmp, "e.json"))
+                with patch(
+                    "code_redeemer.config", config.for_base_url(server.base_url)
+                ):
+                    results = validate_codes(
+                        requests.Session(), [CODE_A, CODE_B, CODE_C], cache, 3
+                    )
+                assert results[CODE_A].status == "available"
+                assert results[CODE_A].platforms == [
+                    "Redeem for Steam",
+                    "Redeem for Xbox",
+                    "Redeem for PSN",
+                ]
+                assert results[CODE_B].status == "expired"
+                assert results[CODE_C].status == "invalid"
+                assert not server.state.redeemed
+
+                requests_before = server.state.requests
+                validate_codes(requests.Session(), [CODE_A], cache)
+                assert server.state.requests == requests_before
+        finally:
+            server.stop()
+
+    @patch("code_redeemer.redeem_code")
+    def test_redemption_skips_dead_codes(self, mock_redeem):
+        """Test that cached dead codes are answered without a request."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EntitlementCache(os.path.join(tmp, "e.json"))
+            cache.record(LookupResult(CODE_A, "invalid"))
+            account = Account(name="main", cookies_file="c.json", session=object())
+
+            assert redeem_for_accounts([account], CODE_A, cache) == {
+                "main": "invalid"
+            }
+            mock_redeem.assert_not_called()
+
+            mock_redeem.return_value = "expired"
+            redeem_for_accounts([account], CODE_B, cache)
+            assert cache.dead_status(CODE_B) == "expired"
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import extractors
+from extractors import (
+    extract_codes_from_text,
+    extract_from_page,
+    extract_generic,
+    get_extractor,
+    is_placeholder_code,
+    normalize_text,
+    parse_expiry_hint,
+    register_extractor,
+)
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+STALE = "OLD11-OLD22-OLD33-OLD44-OLD55"
+
+IGN_PAGE = f"""
+<html><head><script>var cache = "{STALE}";</script></head><body>
+<aside><ul><li>Related: {STALE}</li></ul></aside>
+<table>
+  <tr><th>SHiFT Code</th><th>Reward</th><th>Expiration</th></tr>
+  <tr><td>{CODE_A}</td><td>3 Golden Keys</td><td>Expires Oct 31, 2025</td></tr>
+  <tr><td>{CODE_B}</td><td>Cosmetic Pack</td><td>Unknown</td></tr>
+</table>
+<!-- {STALE} -->
+</body></html>
+"""
+
+GAME8_PAGE = f"""
+<div class="header-links"><ul><li>{STALE}</li></ul></div>
+<div class="archive-style-wrapper">
+  <ul class="a-list"><li>{CODE_A} - Golden Key (until 10/31)</li></ul>
+</div>
+"""
+
+
+class TestExtractors:
+    """Test cases for per-source code extractors."""
+
+    def test_generic_extractor_matches_regex(self):
+        """Test that unknown URLs fall back to the generic extractor."""
+        assert get_extractor("https://example.com/codes") is extract_generic
+        codes = extract_from_page("https://example.com", f"x {CODE_A} y {CODE_B}")
+        assert set(codes) == {CODE_A, CODE_B}
+
+    def test_ign_reads_only_code_table(self):
+        """Test that the IGN extractor ignores scripts, sidebars and comments."""
+        url = "https://www.ign.com/wikis/borderlands-4/Borderlands_4_SHiFT_Codes"
+        codes = extract_from_page(url, IGN_PAGE)
+        assert set(codes) == {CODE_A, CODE_B}
+        assert codes[CODE_A].reward == "3 Golden Keys"
+        assert codes[CODE_A].expires == "Expires Oct 31, 2025"
+        assert codes[CODE_B].expires == "Unknown"
+
+    def test_ign_falls_back_without_table(self):
+        """Test that a page without a code table still yields codes."""
+        url = "https://www.ign.com/wikis/borderlands-4/Other"
+        codes = extract_from_page(url, f"<p>{CODE_A}</p>")
+        assert set(codes) == {CODE_A}
+
+    def test_game8_reads_only_article_region(self):
+        """Test that the game8 extractor reads the archive body list."""
+        url = "https://game8.co/games/Borderlands-4/archives/548406"
+        codes = extract_from_page(url, GAME8_PAGE)
+        assert set(codes) == {CODE_A}
+        assert codes[CODE_A].reward == "Golden Key"
+        assert codes[CODE_A].expires == "until 10/31"
+
+    def test_register_custom_extractor(self):
+        """Test that new extractors can be registered by URL pattern."""
+
+        @register_extractor(r"custom-source\.test/")
+        def _custom(html):
+            return extract_generic(html.upper())
+
+        try:
+            codes = extract_from_page("https://custom-source.test/x", CODE_A.lower())
+            assert set(codes) == {CODE_A}
+        finally:
+            extractors._REGISTRY.pop()
+
+    def test_extract_codes_from_text(self):
+        """Test the plain regex helper used by the Reddit parser."""
+        assert extract_codes_from_text(f"{CODE_A}, {CODE_A}") == {CODE_A}
+
+    def test_pasted_variants_are_normalized(self):
+        """Test case folding, Unicode dashes, spaces and zero-width characters."""
+        assert extract_codes_from_text(CODE_A.lower()) == {CODE_A}
+        assert extract_codes_from_text(CODE_A.replace("-", "\u2013")) == {CODE_A}
+        assert extract_codes_from_text(CODE_A.replace("-", "\uff0d")) == {CODE_A}
+        zero_width = "\u200b".join(CODE_A)
+        assert extract_codes_from_text(f"code:\u00a0{zero_width}") == {CODE_A}
+        assert normalize_text("a\u2014b\u00a0c\nd") == "a-b c\nd"
+
+    def test_placeholders_and_words_are_rejected(self):
+        """Test that masked, repeated and hyphenated-word matches are dropped."""
+        text = (
+            "Format: XXXXX-XXXXX-XXXXX-XXXXX-XXXXX or ABCDE-ABCDE-ABCDE-ABCDE-ABCDE, "
+            f"see /guide/where-shift-codes-could-start, real one {CODE_A}, "
+            f"and not X{CODE_B}"
+        )
+        assert extract_codes_from_text(text) == {CODE_A}
+        assert is_placeholder_code("AB1AB-1BA1B-BA1AB-A1BA1-B1AB1")
+        assert not is_placeholder_code(CODE_B)
+
+    def test_generic_captures_expiry_after_code(self):
+        """Test that free-text pages keep the expiry phrase following a code."""
+        text = f"New code: {CODE_A} (expires Nov 3) and {CODE_B} for keys"
+        codes = {item.code: item for item in extract_generic(text)}
+        assert codes[CODE_A].expires == "expires Nov 3"
+        assert codes[CODE_B].expires == ""
+
+
+class TestParseExpiryHint:
+    """Test cases for turning scraped expiry hints into timestamps."""
+
+    NOW = datetime(2025, 10, 20, 12, 0).timestamp()
+
+    def test_month_day_with_year(self):
+        """Test an explicit month, day and year."""
+        expected = datetime(2025, 10, 31, 23, 59, 59).timestamp()
+        assert parse_expiry_hint("Expires Oct 31, 2025", self.NOW) == expected
+
+    def test_date_without_year_rolls_forward(self):
+        """Test that a month early in the year means next year."""
+        expected = datetime(2026, 1, 5, 23, 59, 59).timestamp()
+        assert parse_expiry_hint("until Jan 5th", self.NOW) == expected
+
+    def test_numeric_and_iso_dates(self):
+        """Test slash and ISO formatted dates."""
+        expected = datetime(2025, 11, 2, 23, 59, 59).timestamp()
+        assert parse_expiry_hint("until 11/2", self.NOW) == expected
+        assert parse_expiry_hint("ends 2025-11-02", self.NOW) == expected
+
+    def test_relative_hints(self):
+        """Test hour and day offsets from now."""
+        assert parse_expiry_hint("expires in 48 hours", self.NOW) == self.NOW + 172800
+        assert parse_expiry_hint("valid for 3 days", self.NOW) == self.NOW + 259200
+        tonight = datetime(2025, 10, 20, 23, 59, 59).timestamp()
+        assert parse_expiry_hint("ends tonight", self.NOW) == tonight
+
+    def test_no_usable_hint(self):
+        """Test that unknown or permanent codes have no expiry."""
+        assert parse_expiry_hint("", self.NOW) is None
+        assert parse_expiry_hint("Unknown", self.NOW) is None
+        assert parse_expiry_hint("Permanent", self.NOW) is None
+        assert parse_expiry_hint("3 Golden Keys", self.NOW) is None
@@ -0,0 +1,49 @@
+from dataclasses import replace
+from unittest.mock import patch
+
+import requests
+
+from code_redeemer import redeem_code
+from config import config
+from games import NOT_APPLICABLE, allowed_games, detect_game, game_allowed
+from shift_standin import StandinOptions, StandinServer
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+
+
+class TestGames:
+    """Test cases for game-aware routing of codes."""
+
+    def test_detect_game(self):
+        """Test title detection from text, URLs and abbreviations."""
+        assert detect_game("New Borderlands 4 SHiFT code") == "Borderlands 4"
+        assert detect_game("https://ign.com/wikis/borderlands-4/") == "Borderlands 4"
+        assert detect_game("BL3 golden key") == "Borderlands 3"
+        assert detect_game("Tiny Tina's Wonderlands") == "Tiny Tina's Wonderlands"
+        assert detect_game("Borderlands 3 and Borderlands 4") == ""
+        assert detect_game("3 Golden Keys") == ""
+
+    def test_allow_list(self):
+        """Test that only listed titles pass and unknown titles always pass."""
+        allow = allowed_games("bl4, Wonderlands")
+        assert allow == ["Borderlands 4", "Tiny Tina's Wonderlands"]
+        assert game_allowed("Borderlands 4", allow)
+        assert not game_allowed("BL3", allow)
+        assert game_allowed("", allow)
+        assert game_allowed("Borderlands 3", [])
+
+    def test_lookup_title_short_circuits_before_platform_post(self):
+        """Test that a lookup for an excluded title is not redeemed."""
+        server = StandinServer(
+            StandinOptions(titles={CODE_A: "Borderlands 3"})
+        ).start()
+        try:
+            with patch(
+                "code_redeemer.config", config.for_base_url(server.base_url)
+            ), patch("games.config", replace(config, GAMES="Borderlands 4")):
+                assert redeem_code(requests.Session(), CODE_A) == NOT_APPLICABLE
+                assert redeem_code(requests.Session(), CODE_B) == "redeemed"
+            assert [code for _, code in server.state.redeemed] == [CODE_B]
+        finally:
+            server.stop()
@@ -0,0 +1,52 @@
+from unittest.mock import Mock, patch
+
+import requests
+
+from deadlines import BudgetedRetry
+from http_pool import SessionPool, host_group, prewarm
+
+
+class TestHttpPool:
+    """Test cases for pooled keep-alive sessions."""
+
+    def test_host_group(self):
+        """Test that mirrors and www. prefixes share a group."""
+        assert host_group("https://www.ign.com/wikis/x") == "ign.com"
+        assert host_group("https://twitter.com/DuvalMagic") == "x.com"
+        assert host_group("https://x.com/GearboxOfficial") == "x.com"
+
+    def test_sessions_are_reused_per_group(self):
+        """Test that one session serves every URL in a host group."""
+        pool = SessionPool()
+        first = pool.session_for("https://x.com/GearboxOfficial")
+        assert pool.session_for("https://twitter.com/DuvalMagic") is first
+        assert pool.session_for("https://game8.co/games") is not first
+        pool.close()
+
+    def test_session_requests_compression_and_keep_alive(self):
+        """Test the default headers, pool size and retries of pooled sessions."""
+        pool = SessionPool(pool_size=7)
+        session = pool.session_for("https://game8.co/games")
+        assert "gzip" in session.headers["Accept-Encoding"]
+        assert session.headers["Connection"] == "keep-alive"
+        adapter = session.get_adapter("https://game8.co/")
+        assert adapter._pool_maxsize == 7
+        assert isinstance(adapter.max_retries, BudgetedRetry)
+        pool.close()
+
+    def test_get_uses_pooled_session(self):
+        """Test that get() goes through the group's session with a timeout."""
+        pool = SessionPool()
+        session = pool.session_for("https://game8.co/games")
+        with patch.object(session, "get", return_value=Mock()) as mock_get:
+            pool.get("https://game8.co/games/a")
+        assert mock_get.call_args.kwargs["timeout"] > 0
+
+    def test_prewarm_swallows_errors(self):
+        """Test that a failed pre-warm is reported but not raised."""
+        session = Mock()
+        assert prewarm(session, "https://shift.example/rewards")
+        session.head.assert_called_once()
+
+        session.head.side_effect = requests.ConnectionError("down")
+        assert not prewarm(session, "https://shift.example/rewards")
@@ -0,0 +1,121 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from clock import VirtualClock, set_clock
+from config import config
+from intake import CodeIntake, start_intake_servers
+from utils import load_json
+from watcher import Watcher
+from work_queue import WorkQueue
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+
+
+@pytest.fixture
+def intake():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = WorkQueue(os.path.join(tmp, "queue.json"), owner="host:1")
+        yield CodeIntake(queue, known=lambda code: code == CODE_B)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestCodeIntake:
+    """Test cases for the push-based code intake."""
+
+    def test_submit_validates_and_dedupes(self, intake):
+        """Test that only new, well-formed codes are queued."""
+        report = intake.submit([CODE_A.lower(), CODE_B, "not a code"])
+        assert report == {
+            "queued": [CODE_A],
+            "duplicate": [CODE_B],
+            "invalid": ["not a code"],
+        }
+        assert CODE_A in intake.work_queue
+        assert intake.wake.is_set()
+
+        intake.wake.clear()
+        assert intake.submit([CODE_A])["duplicate"] == [CODE_A]
+        assert not intake.wake.is_set()
+
+    def test_pasted_text_is_scanned(self, intake):
+        """Test that codes are found inside a pasted chat message."""
+        report = intake.submit([f"new code!! {CODE_A} for 3 keys"])
+        assert report["queued"] == [CODE_A]
+
+    def test_http_batch_submission(self, intake):
+        """Test POST /codes with a JSON batch over TCP."""
+        port = _free_port()
+        servers = start_intake_servers(intake, port=port, socket_path="", token="s3")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            body = json.dumps({"codes": [CODE_A, CODE_B]})
+            conn.request("POST", "/codes", body, {"Content-Type": "application/json"})
+            assert conn.getresponse().status == 401
+
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            headers = {"Content-Type": "application/json", "Authorization": "Bearer s3"}
+            conn.request("POST", "/codes", body, headers)
+            response = conn.getresponse()
+            assert response.status == 202
+            assert json.loads(response.read())["queued"] == [CODE_A]
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+    def test_unix_socket_submission(self, intake):
+        """Test POST /codes with plain text over a Unix socket."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "intake.sock")
+            servers = start_intake_servers(intake, port=0, socket_path=path, token="")
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(path)
+                    sock.sendall(
+                        b"POST /codes HTTP/1.0\r\nContent-Type: text/plain\r\n"
+                        + f"Content-Length: {len(CODE_A)}\r\n\r\n{CODE_A}".encode()
+                    )
+                    reply = b""
+                    while chunk := sock.recv(4096):
+                        reply += chunk
+                assert reply.startswith(b"HTTP/1.0 202")
+                assert CODE_A in intake.work_queue
+            finally:
+                for server in servers:
+                    server.shutdown()
+                    server.server_close()
+
+    @patch("watcher.redeem_for_accounts", return_value={"main": "redeemed"})
+    def test_pushed_codes_are_logged_when_redeemed(self, _redeem, intake, tmp_path):
+        """Test that intake codes are recorded as known when they are redeemed."""
+        intake.submit([CODE_A])
+        settings = replace(
+            config,
+            LOG_FILE=str(tmp_path / "log.json"),
+            USED_FILE=str(tmp_path / "used.json"),
+            APPRISE_URL="",
+        )
+        all_codes = []
+        previous = set_clock(VirtualClock())
+        try:
+            watcher = Watcher(
+                [], Mock(), intake.work_queue, Mock(), Mock(), Mock(), settings=settings
+            )
+            watcher.redeem_queued([], all_codes, [], 1)
+        finally:
+            set_clock(previous)
+        assert all_codes == [CODE_A]
+        assert load_json(settings.LOG_FILE, []) == [CODE_A]
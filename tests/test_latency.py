@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from latency import LatencyTracker, format_summary
+from metrics import CODE_LATENCY_SECONDS
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+IGN = "https://www.ign.com/wikis/borderlands-4/Borderlands_4_SHiFT_Codes"
+REDDIT = "https://www.reddit.com/r/Borderlands/new/.rss?limit=5"
+
+
+class TestLatencyTracker:
+    """Test cases for discovery-to-redemption latency tracking."""
+
+    def test_timeline_through_pipeline(self):
+        """Test first sighting, later sightings and stage timestamps."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = LatencyTracker(os.path.join(tmp, "latency.json"))
+            tracker.sighted({REDDIT: [CODE_A]}, now=1000)
+            tracker.queued(CODE_A, REDDIT, now=1000)
+            tracker.sighted({REDDIT: [CODE_A], IGN: [CODE_A]}, now=4600)
+            tracker.started(CODE_A, REDDIT, now=1060)
+            tracker.finished(CODE_A, "redeemed", now=1070)
+            tracker.finished(CODE_A, "redeemed", now=9999)
+
+            timeline = tracker.timelines[CODE_A]
+            assert timeline.source == REDDIT
+            assert timeline.sightings == {REDDIT: 1000, IGN: 4600}
+            assert timeline.stage_seconds() == {
+                "queued": 0,
+                "started": 60,
+                "finished": 70,
+            }
+            assert CODE_LATENCY_SECONDS.count(stage="finished", source=REDDIT) >= 1
+
+            tracker.save(now=2000)
+            reloaded = LatencyTracker(os.path.join(tmp, "latency.json"))
+            assert reloaded.timelines[CODE_A].finished_at == 1070
+
+    def test_known_codes_are_not_tracked(self):
+        """Test that codes seen before tracking began get no timeline."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = LatencyTracker(os.path.join(tmp, "latency.json"))
+            tracker.sighted({IGN: [CODE_A, CODE_B]}, known={CODE_A}, now=0)
+            assert set(tracker.timelines) == {CODE_B}
+
+    def test_pushed_codes_start_their_timeline_when_leased(self):
+        """Test that intake codes with no sighting are timed from the lease."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = LatencyTracker(os.path.join(tmp, "latency.json"))
+            tracker.started(CODE_B, "intake", now=50)
+            timeline = tracker.timelines[CODE_B]
+            assert (timeline.first_seen, timeline.queued_at) == (50, 50)
+
+    def test_summary_per_source_and_stage(self):
+        """Test percentiles grouped by stage and source, and old-entry pruning."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = LatencyTracker(os.path.join(tmp, "latency.json"), retention=500)
+            tracker.sighted({REDDIT: [CODE_A], IGN: [CODE_B]}, now=0)
+            tracker.sighted({IGN: [CODE_A]}, now=600)
+            for code, finish in ((CODE_A, 30), (CODE_B, 90)):
+                tracker.started(code, "", now=finish - 10)
+                tracker.finished(code, "redeemed", now=finish)
+
+            summary = tracker.summary()
+            assert summary[("sighting", IGN)]["p50"] == 600
+            assert summary[("finished", REDDIT)]["p50"] == 30
+            assert summary[("finished", IGN)]["count"] == 1
+            assert "sighting" in format_summary(summary)
+
+            tracker.save(now=700)
+            assert tracker.timelines == {}
@@ -0,0 +1,56 @@
+import logging
+import tracemalloc
+
+import pytest
+
+from memory_monitor import MemoryMonitor
+from metrics import MEMORY_BYTES
+
+
+@pytest.fixture(autouse=True)
+def _stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+class TestMemoryMonitor:
+    """Test cases for tracemalloc-based memory monitoring."""
+
+    def test_disabled_monitor_does_nothing(self):
+        """Test that a disabled monitor takes no snapshots."""
+        monitor = MemoryMonitor(enabled=False)
+        with monitor.cycle("main"):
+            pass
+        assert monitor.cycles == 0
+        assert monitor._previous is None
+
+    def test_growth_is_reported_between_cycles(self):
+        """Test that allocations kept across cycles show up as growth."""
+        monitor = MemoryMonitor(enabled=True, top_n=5)
+        retained = []
+        monitor.check("baseline")
+        retained.append([bytearray(1024) for _ in range(200)])
+        growth = monitor.check("main")
+        assert growth
+        assert any(__file__ in str(stat.traceback) for stat in growth)
+        assert MEMORY_BYTES.value(kind="traced") > 0
+        assert retained
+
+    def test_warning_above_threshold(self, caplog):
+        """Test that the traced heap above the threshold logs a warning."""
+        monitor = MemoryMonitor(enabled=True, warn_mb=0.000001)
+        with caplog.at_level(logging.WARNING):
+            with monitor.cycle("main"):
+                pass
+        assert "above SHIFT_MEMORY_WARN_MB" in caplog.text
+
+    def test_every_nth_cycle(self):
+        """Test that snapshots are only taken every ``every`` cycles."""
+        monitor = MemoryMonitor(enabled=True, every=3)
+        for _ in range(2):
+            with monitor.cycle("main"):
+                pass
+        assert monitor._previous is None
+        with monitor.cycle("main"):
+            pass
+        assert monitor._previous is not None
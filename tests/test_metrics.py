@@ -0,0 +1,61 @@
+from metrics import Counter, Gauge, Histogram, Registry, timed
+
+
+class TestMetrics:
+    """Test cases for the in-process metrics registry."""
+
+    def test_counter_labels(self):
+        """Test that counters track values per label set."""
+        counter = Counter("test_total", "Test counter", ["status"])
+        counter.inc(status="redeemed")
+        counter.inc(2, status="redeemed")
+        counter.inc(status="expired")
+
+        assert counter.value(status="redeemed") == 3
+        assert counter.value(status="expired") == 1
+        assert counter.value(status="unknown") == 0
+
+    def test_gauge_set(self):
+        """Test that gauges can be overwritten."""
+        gauge = Gauge("test_bytes", "Test gauge")
+        gauge.set(10)
+        gauge.set(4)
+        assert gauge.value() == 4
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram bucket counts in the exposition output."""
+        histogram = Histogram("test_seconds", "Test", ["stage"], buckets=(1, 5))
+        histogram.observe(0.5, stage="csrf")
+        histogram.observe(3, stage="csrf")
+        histogram.observe(10, stage="csrf")
+
+        text = histogram.render()
+        assert 'test_seconds_bucket{stage="csrf",le="1"} 1' in text
+        assert 'test_seconds_bucket{stage="csrf",le="5"} 2' in text
+        assert 'test_seconds_bucket{stage="csrf",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="csrf"} 3' in text
+        assert histogram.count(stage="csrf") == 3
+
+    def test_registry_render(self):
+        """Test that the registry renders HELP/TYPE headers for each metric."""
+        registry = Registry()
+        counter = registry.counter("a_total", "A counter")
+        counter.inc()
+
+        text = registry.render()
+        assert "# HELP a_total A counter" in text
+        assert "# TYPE a_total counter" in text
+        assert "a_total 1.0" in text
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values do not break the output."""
+        counter = Counter("esc_total", "Escaping", ["source"])
+        counter.inc(source='a"b')
+        assert 'source="a\\"b"' in counter.render()
+
+    def test_timed_observes_duration(self):
+        """Test that the timed helper records one observation."""
+        histogram = Histogram("timed_seconds", "Timed")
+        with timed(histogram):
+            pass
+        assert histogram.count() == 1
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+from profiler import CycleProfiler
+
+
+class TestCycleProfiler:
+    """Test cases for per-cycle profiling."""
+
+    def test_disabled_profiler_writes_nothing(self):
+        """Test that a disabled profiler is a no-op."""
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "profiles")
+            profiler = CycleProfiler(output_dir=out, enabled=False)
+            with profiler.cycle("main"):
+                sum(range(100))
+            assert not os.path.exists(out)
+
+    def test_cycle_writes_profile_and_summary(self):
+        """Test that each cycle produces a .prof file and a summary."""
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = CycleProfiler(output_dir=tmp, enabled=True, top_n=5)
+            with profiler.cycle("main"):
+                sorted(range(1000), reverse=True)
+
+            prof_files = [f for f in os.listdir(tmp) if f.endswith(".prof")]
+            assert len(prof_files) == 1
+            assert prof_files[0].startswith("main-")
+            with open(profiler.summary_path, encoding="utf-8") as f:
+                summary = f.read()
+            assert "cumulative time" in summary
+
+    def test_old_profiles_are_pruned(self):
+        """Test that only the newest profiles are kept on disk."""
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = CycleProfiler(output_dir=tmp, enabled=True, keep=2)
+            for index in range(4):
+                with profiler.cycle(f"cycle{index}"):
+                    pass
+            prof_files = [f for f in os.listdir(tmp) if f.endswith(".prof")]
+            assert len(prof_files) == 2
+
+    def test_exceptions_propagate(self):
+        """Test that profiling does not swallow cycle errors."""
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = CycleProfiler(output_dir=tmp, enabled=True)
+            with pytest.raises(RuntimeError):
+                with profiler.cycle("main"):
+                    raise RuntimeError("boom")
@@ -0,0 +1,117 @@
+import tempfile
+from unittest.mock import MagicMock, Mock, patch
+
+from playwright import sync_api
+
+from cassette import RECORD, REPLAY, Cassette
+from rendered_fetch import RenderedFetcher, _block_heavy
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+
+
+def _fetcher(**kwargs):
+    kwargs.setdefault("hosts", ["x.com", "facebook.com"])
+    kwargs.setdefault("selectors", {"x.com": "article"})
+    return RenderedFetcher(**kwargs)
+
+
+def _fake_playwright(heap=1000):
+    playwright = MagicMock()
+    browser = playwright.start.return_value.chromium.launch.return_value
+
+    def _new_context(**kwargs):
+        context = MagicMock()
+        page = context.new_page.return_value
+        page.content.return_value = f"<article>{CODE_A}</article>"
+        page.evaluate.return_value = heap
+        return context
+
+    browser.new_context.side_effect = _new_context
+    return playwright, browser
+
+
+class TestRenderedFetcher:
+    """Test cases for the pooled headless-browser fetcher."""
+
+    def test_handles_marked_hosts_only(self):
+        """Test that only hosts in RENDER_SOURCES (and mirrors) are rendered."""
+        fetcher = _fetcher()
+        assert fetcher.handles("https://twitter.com/DuvalMagic")
+        assert fetcher.handles("https://www.facebook.com/GearboxSoftware")
+        assert not fetcher.handles("https://www.ign.com/wikis/borderlands-4/")
+        assert fetcher.selector_for("https://x.com/GearboxOfficial") == "article"
+        assert fetcher.selector_for("https://facebook.com/x") == "body"
+
+    def test_heavy_resources_are_blocked(self):
+        """Test that images and fonts are aborted and documents continue."""
+        image, document = Mock(), Mock()
+        image.request.resource_type = "image"
+        document.request.resource_type = "document"
+        _block_heavy(image)
+        _block_heavy(document)
+        image.abort.assert_called_once()
+        document.continue_.assert_called_once()
+
+    def test_fetch_waits_for_selector_and_reuses_context(self):
+        """Test that pages wait for content and share one context per host."""
+        playwright, browser = _fake_playwright()
+        fetcher = _fetcher(memory_mb=64)
+        with patch.object(sync_api, "sync_playwright", return_value=playwright):
+            html = fetcher.fetch("https://x.com/GearboxOfficial")
+            fetcher.fetch("https://twitter.com/DuvalMagic")
+        assert CODE_A in html
+        launch_args = playwright.start.return_value.chromium.launch.call_args
+        assert "--js-flags=--max-old-space-size=64" in launch_args.kwargs["args"]
+        assert browser.new_context.call_count == 1
+        context = fetcher._contexts["x.com"].context
+        context.route.assert_called_once_with("**/*", _block_heavy)
+        page = context.new_page.return_value
+        page.wait_for_selector.assert_called_with("article", timeout=20000)
+        assert page.close.call_count == 2
+
+    def test_contexts_are_evicted_and_recycled(self):
+        """Test LRU eviction and recycling after the page or heap limit."""
+        playwright, browser = _fake_playwright(heap=300 * 1024 * 1024)
+        fetcher = _fetcher(pool_size=1, memory_mb=256)
+        with patch.object(sync_api, "sync_playwright", return_value=playwright):
+            fetcher.fetch("https://x.com/GearboxOfficial")
+            first = fetcher._contexts["x.com"]
+            assert first.retire
+            fetcher.fetch("https://x.com/GearboxOfficial")
+            first.context.close.assert_called_once()
+            fetcher.fetch("https://facebook.com/GearboxSoftware")
+        assert list(fetcher._contexts) == ["facebook.com"]
+        assert browser.new_context.call_count == 3
+
+    def test_rendered_pages_go_through_the_cassette(self):
+        """Test that rendered pages are recorded and replayed without a browser."""
+        playwright, _ = _fake_playwright()
+        url = "https://x.com/GearboxOfficial"
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = _fetcher(cassette=Cassette(tmp, RECORD))
+            with patch.object(
+                sync_api, "sync_playwright", return_value=playwright
+            ):
+                live = recorder.fetch(url)
+
+            player = _fetcher(cassette=Cassette(tmp, REPLAY))
+            with patch.object(sync_api, "sync_playwright") as mock_playwright:
+                assert player.fetch(url) == live
+                mock_playwright.assert_not_called()
+        assert player._browser is None
+
+    def test_marked_sources_bypass_plain_get(self):
+        """Test that the fetcher routes marked sources to the browser."""
+        import code_fetcher
+
+        fetcher = Mock()
+        fetcher.handles.side_effect = lambda url: "x.com" in url
+        fetcher.fetch.return_value = f"<article>{CODE_A}</article>"
+        with patch.object(code_fetcher, "rendered_fetcher", fetcher), patch.object(
+            code_fetcher.http_pool, "get"
+        ) as mock_get, patch.object(code_fetcher, "source_health", MagicMock()):
+            by_source = code_fetcher.fetch_codes_by_source(
+                ["https://x.com/GearboxOfficial"]
+            )
+        mock_get.assert_not_called()
+        assert set(by_source["https://x.com/GearboxOfficial"]) == {CODE_A}
@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+from scheduler import AdaptiveScheduler
+
+FAST = "https://fast.example.com"
+SLOW = "https://slow.example.com"
+
+
+def _scheduler(tmp, **kwargs):
+    kwargs.setdefault("base_interval", 3600)
+    kwargs.setdefault("min_interval", 600)
+    kwargs.setdefault("max_interval", 6 * 3600)
+    kwargs.setdefault("budget_per_hour", 0)
+    return AdaptiveScheduler(
+        [FAST, SLOW], path=os.path.join(tmp, "schedule.json"), **kwargs
+    )
+
+
+class TestAdaptiveScheduler:
+    """Test cases for the learned per-source polling schedule."""
+
+    def test_no_history_uses_base_interval(self):
+        """Test that every source starts due and keeps the base interval."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp)
+            assert scheduler.due_sources(now=0) == [FAST, SLOW]
+
+            scheduler.record_cycle([FAST, SLOW], {}, set(), now=0)
+            assert scheduler.interval(FAST) == 3600
+            assert scheduler.due_sources(now=10) == []
+            assert scheduler.seconds_until_next_due(now=100) == 3500
+
+    def test_first_publisher_is_polled_more_often(self):
+        """Test that the source that publishes first gets a shorter interval."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp)
+            now = 0.0
+            for index in range(6):
+                code = f"CODE{index}"
+                scheduler.record_cycle([FAST], {FAST: {code}}, set(), now=now)
+                now += 600
+                scheduler.record_cycle([SLOW], {SLOW: {code}}, set(), now=now)
+                now += 600
+
+            assert scheduler.sources[FAST].first_reports == 6
+            assert scheduler.sources[SLOW].late_reports == 6
+            assert scheduler.interval(FAST) < 3600 < scheduler.interval(SLOW)
+
+    def test_repeated_sightings_count_once(self):
+        """Test that a source listing the same code every poll is not penalised."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp)
+            for now in (0, 3600, 7200):
+                scheduler.record_cycle([FAST], {FAST: {"CODE"}}, set(), now=now)
+            assert scheduler.sources[FAST].first_reports == 1
+            assert scheduler.sources[FAST].late_reports == 0
+
+    def test_known_codes_are_not_first_reports(self):
+        """Test that codes known before history began are late reports."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp)
+            scheduler.record_cycle([FAST], {FAST: {"OLD"}}, {"OLD"}, now=0)
+            assert scheduler.sources[FAST].first_reports == 0
+            assert scheduler.sources[FAST].late_reports == 1
+
+    def test_budget_stretches_intervals(self):
+        """Test that intervals grow to keep polls under the hourly budget."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp, base_interval=600, budget_per_hour=3)
+            scheduler.record_cycle([FAST, SLOW], {}, set(), now=0)
+            polls_per_hour = sum(3600 / s.interval for s in scheduler.sources.values())
+            assert polls_per_hour <= 3 + 1e-9
+
+    def test_state_persists(self):
+        """Test that learned history survives a restart."""
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = _scheduler(tmp)
+            scheduler.record_cycle([FAST], {FAST: {"CODE"}}, set(), now=0)
+            scheduler.save()
+
+            reloaded = _scheduler(tmp)
+            assert reloaded.sources[FAST].first_reports == 1
+            assert reloaded.due_sources(now=1) == [SLOW]
@@ -1,9 +1,11 @@
 import pytest
 from unittest.mock import Mock, patch
 from session_manager import (
+    cookie_expiry,
     get_session_with_retry,
     refresh_cookies,
     get_session,
+    save_session_cookies,
     verify_login,
 )
 
@@ -22,7 +24,7 @@ class TestSessionManager:
         # Check headers are set
         assert "User-Agent" in session.headers
 
-    @patch("session_manager.sync_playwright")
+    @patch("playwright.sync_api.sync_playwright")
     @patch("session_manager.config")
     def test_refresh_cookies_basic(self, mock_config, mock_playwright):
         """Test basic cookie refresh functionality."""
@@ -32,6 +34,7 @@ class TestSessionManager:
         mock_config.LOGIN_URL = "https://example.com/login"
         mock_config.PLAYWRIGHT_TIMEOUT = 5000
         mock_config.COOKIES_FILE = "cookies.json"
+        mock_config.BASE_URL = "https://example.com"
 
         # Mock playwright components
         mock_browser = Mock()
@@ -48,8 +51,11 @@ class TestSessionManager:
         mock_p.chromium.launch.return_value = mock_browser
         mock_playwright.return_value.__enter__.return_value = mock_p
 
-        with patch("session_manager.save_json") as mock_save:
-            refresh_cookies()
+        with (
+            patch("session_manager.save_json") as mock_save,
+            patch("session_manager.verify_login", return_value=True),
+        ):
+            assert refresh_cookies()
 
             # Verify playwright interactions
             mock_p.chromium.launch.assert_called_once_with(headless=False)
@@ -60,6 +66,22 @@ class TestSessionManager:
             # Verify cookies were saved
             mock_save.assert_called_once_with("cookies.json", mock_cookies)
 
+    @patch("session_manager.verify_login", return_value=False)
+    @patch("playwright.sync_api.sync_playwright")
+    @patch("session_manager.save_json")
+    def test_refresh_cookies_keeps_file_without_login(
+        self, mock_save, mock_playwright, mock_verify
+    ):
+        """Test that cookies from an unfinished login are not saved."""
+        mock_context = Mock()
+        mock_context.cookies.return_value = [{"name": "__cf_bm", "value": "x"}]
+        mock_p = Mock()
+        mock_p.chromium.launch.return_value.new_context.return_value = mock_context
+        mock_playwright.return_value.__enter__.return_value = mock_p
+
+        assert not refresh_cookies(cookies_file="cookies.json")
+        mock_save.assert_not_called()
+
     @patch("session_manager.os.path.exists")
     @patch("session_manager.load_json")
     def test_get_session_existing_cookies(self, mock_load, mock_exists):
@@ -140,3 +162,31 @@ class TestSessionManager:
 
         with pytest.raises(ValueError, match="SHIFT_SECRET_KEY"):
             refresh_cookies()
+
+    def test_cookie_write_back_round_trip(self, tmp_path):
+        """Test that rotated cookies are saved with their expiry."""
+        path = str(tmp_path / "cookies.json")
+        session = get_session_with_retry()
+        session.cookies.set(
+            "_session_id", "rotated", domain="shift.gearboxsoftware.com", expires=2e9
+        )
+        save_session_cookies(session, path)
+        reloaded = get_session(path)
+
+        assert reloaded.cookies.get("_session_id") == "rotated"
+        assert cookie_expiry(reloaded) == 2e9
+
+    def test_cookie_expiry_uses_the_login_cookie(self):
+        """Test that only the SHiFT login cookie's expiry counts."""
+        session = get_session_with_retry()
+        session.cookies.set("_session_id", "1", domain="shift.gearboxsoftware.com")
+        assert cookie_expiry(session) is None
+        session.cookies.set(
+            "__cf_bm", "2", domain=".gearboxsoftware.com", expires=1000
+        )
+        session.cookies.set("_session_id", "3", domain="example.com", expires=10)
+        assert cookie_expiry(session) is None
+        session.cookies.set(
+            "_session_id", "4", domain=".gearboxsoftware.com", expires=5000
+        )
+        assert cookie_expiry(session) == 5000
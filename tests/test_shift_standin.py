@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+import code_redeemer
+from code_redeemer import redeem_code
+from config import config
+from load_test import percentile, run_load_test
+from shift_standin import (
+    EXPIRED,
+    INVALID,
+    USED,
+    StandinOptions,
+    StandinServer,
+)
+from simulate import make_codes
+
+CODE = "ABCDE-12345-FGHIJ-67890-KLMNO"
+
+
+@pytest.fixture
+def standin():
+    servers = []
+
+    def _start(**kwargs):
+        server = StandinServer(StandinOptions(**kwargs)).start()
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.stop()
+
+
+def _redeem(server, code=CODE, session=None):
+    settings = config.for_base_url(server.base_url)
+    return redeem_code(session or requests.Session(), code, settings)
+
+
+class TestShiftStandin:
+    """Test cases for the local SHiFT stand-in and load-test driver."""
+
+    def test_multi_platform_redemption(self, standin):
+        """Test the CSRF, lookup and platform form round trip."""
+        server = standin()
+        session = requests.Session()
+        assert _redeem(server, session=session) == "redeemed"
+        assert _redeem(server, session=session) == "used"
+
+    @pytest.mark.parametrize("outcome", [EXPIRED, USED, INVALID])
+    def test_terminal_pages(self, standin, outcome):
+        """Test that expired, used and invalid pages are classified."""
+        server = standin(codes={CODE: outcome})
+        assert _redeem(server) == outcome
+
+    def test_json_lookup_fallback(self, standin):
+        """Test that a 404 lookup falls back to the .json endpoint."""
+        server = standin(json_lookup_only=True)
+        assert _redeem(server) == "redeemed"
+
+    def test_throttling_returns_429(self, standin):
+        """Test that requests over max_rps are rejected."""
+        server = standin(max_rps=1)
+        assert _redeem(server) == "failed"
+        assert server.state.throttled >= 1
+
+    def test_load_test_report(self, standin):
+        """Test that the driver reports throughput and percentiles."""
+        server = standin()
+        report = run_load_test(server.base_url, make_codes(8), concurrency=2)
+        assert report["codes"] == 8
+        assert report["results"] == {"redeemed": 8}
+        assert 0 < report["p50"] <= report["p95"] <= report["p99"]
+        assert report["codes_per_minute"] > 0
+        assert code_redeemer.config is config
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0.0
@@ -0,0 +1,97 @@
+import threading
+
+import clock
+from clock import VirtualClock, get_clock
+from rate_limiter import RateLimiter
+from scheduler import AdaptiveScheduler
+from simulate import Appearance, run_simulation, sample_timeline
+
+SOURCES = ["https://fast.example/codes", "https://slow.example/codes"]
+
+
+class TestSimulation:
+    """Test cases for the virtual clock and the schedule simulation."""
+
+    def test_virtual_clock_advances_only_when_sleeping(self):
+        """Test that sleeping and waiting move virtual time without blocking."""
+        vclock = VirtualClock(start=1000.0, seed=1)
+        vclock.sleep(3600)
+        assert vclock.time() == vclock.monotonic() == 4600.0
+        event = threading.Event()
+        assert not vclock.wait(event, 60)
+        assert vclock.time() == 4660.0
+        event.set()
+        assert vclock.wait(event, 60)
+        assert vclock.time() == 4660.0
+
+    def test_seeded_clocks_repeat(self):
+        """Test that two clocks with the same seed draw the same jitter."""
+        first, second = VirtualClock(seed=7), VirtualClock(seed=7)
+        assert [first.uniform(3, 7) for _ in range(5)] == [
+            second.uniform(3, 7) for _ in range(5)
+        ]
+
+    def test_components_follow_injected_clock(self, tmp_path):
+        """Test that the scheduler and rate limiter use the clock they are given."""
+        vclock = VirtualClock(start=50000.0)
+        scheduler = AdaptiveScheduler(
+            SOURCES, path=str(tmp_path / "s.json"), base_interval=600, clock=vclock
+        )
+        scheduler.record_cycle(SOURCES, {}, set())
+        assert scheduler.seconds_until_next_due() == 600
+        RateLimiter(min_delay=10.0, clock=vclock).wait()
+        assert 50010.0 <= vclock.time() <= 50013.0
+        assert scheduler.seconds_until_next_due() < 600
+
+    def test_day_of_polling_replays_quickly(self):
+        """Test that a simulated day reports cycles, requests and latency."""
+        timeline = [
+            Appearance("AAAAA-11111-BBBBB-22222-CCCCC", SOURCES[0], 3600),
+            Appearance("AAAAA-11111-BBBBB-22222-CCCCC", SOURCES[1], 7200),
+            Appearance("DDDDD-33333-EEEEE-44444-FFFFF", SOURCES[1], 40000),
+        ]
+        report = run_simulation(
+            timeline,
+            duration=86400,
+            base_interval=600,
+            min_interval=300,
+            max_interval=3600,
+            budget_per_hour=0,
+        )
+        assert report["codes"] == 2
+        assert not report["missed"]
+        assert report["redeem_requests"] == 4
+        assert report["cycles"] >= 24
+        assert report["source_requests"] == sum(report["polls"].values())
+        assert 0 <= report["discovery_p50"] <= report["discovery_max"] <= 3600
+        assert report["redemption_p50"] >= report["discovery_p50"]
+        assert isinstance(get_clock(), clock.Clock)
+        assert not isinstance(get_clock(), VirtualClock)
+
+    def test_failed_redemptions_are_retried(self):
+        """Test that transient failures go through the real retry path."""
+        timeline = [
+            Appearance("AAAAA-11111-BBBBB-22222-CCCCC", SOURCES[0], 3600),
+            Appearance("DDDDD-33333-EEEEE-44444-FFFFF", SOURCES[0], 3600),
+        ]
+        report = run_simulation(
+            timeline,
+            duration=86400,
+            requests_per_code=1,
+            failure_rate=0.5,
+            seed=4,
+            base_interval=600,
+            min_interval=300,
+            max_interval=3600,
+            budget_per_hour=0,
+        )
+        # Every failed attempt is redeemed again after its retry delay.
+        assert report["redeem_requests"] > 2
+        assert report["redemption_p50"] > report["discovery_p50"] + 600
+
+    def test_simulation_is_deterministic(self):
+        """Test that the same timeline and seed give the same report."""
+        timeline = sample_timeline(SOURCES, codes=10, duration=43200, seed=3)
+        first = run_simulation(timeline, duration=43200, seed=3)
+        second = run_simulation(timeline, duration=43200, seed=3)
+        assert first == second
@@ -0,0 +1,114 @@
+import os
+import tempfile
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import code_fetcher
+from clock import VirtualClock, set_clock
+from config import config
+from source_health import SourceHealthTracker, looks_like_login_wall
+
+URL = "https://example.com/codes"
+
+
+class TestSourceHealth:
+    """Test cases for per-source health tracking and the circuit breaker."""
+
+    def _tracker(self, tmp, **kwargs):
+        kwargs.setdefault("failure_threshold", 2)
+        kwargs.setdefault("base_backoff", 100)
+        kwargs.setdefault("max_backoff", 350)
+        return SourceHealthTracker(os.path.join(tmp, "health.json"), **kwargs)
+
+    def test_breaker_opens_after_threshold(self):
+        """Test that repeated failures open the breaker."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            tracker.record_failure(URL, 1.0, "timeout", now=1000)
+            assert tracker.allow(URL, now=1001)
+
+            tracker.record_failure(URL, 1.0, "timeout", now=1000)
+            assert not tracker.allow(URL, now=1050)
+            assert tracker.allow(URL, now=1100)
+
+    def test_backoff_doubles_and_caps(self):
+        """Test that failed probes back off exponentially up to the cap."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            waits = []
+            for _ in range(5):
+                tracker.record_failure(URL, 1.0, "timeout", now=0)
+                state = tracker.get(URL)
+                waits.append(state.open_until if state.is_open else 0)
+            assert waits == [0, 100, 200, 350, 350]
+
+    def test_success_closes_breaker(self):
+        """Test that a successful probe resets the failure streak."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            for _ in range(3):
+                tracker.record_failure(URL, 1.0, "timeout", now=0)
+            tracker.record_success(URL, 0.5, codes=2, now=500)
+
+            state = tracker.get(URL)
+            assert not state.is_open
+            assert state.consecutive_failures == 0
+            assert state.last_yield == 500
+            assert state.codes_yielded == 2
+            assert state.error_rate == 0.75
+
+    def test_state_persists(self):
+        """Test that breaker state survives a reload."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            tracker.record_failure(URL, 2.0, "timeout", now=0)
+            tracker.record_failure(URL, 2.0, "timeout", now=0)
+            tracker.save()
+
+            reloaded = self._tracker(tmp)
+            assert reloaded.get(URL).failures == 2
+            assert not reloaded.allow(URL, now=10)
+
+    def test_login_wall_detection(self):
+        """Test detection of login walls served instead of content."""
+        assert looks_like_login_wall("<title>Log in to Facebook</title>")
+        assert not looks_like_login_wall("<table><tr><td>Codes</td></tr></table>")
+
+    def test_fetch_skips_open_sources(self):
+        """Test that fetch_new_codes does not request sources with open breakers."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp, failure_threshold=1)
+            tracker.record_failure(URL, 1.0, "timeout")
+            with patch.object(code_fetcher, "source_health", tracker), patch(
+                "code_fetcher.config", replace(config, SOURCES=[URL])
+            ), patch.object(code_fetcher.http_pool, "get") as mock_get:
+                assert code_fetcher.fetch_new_codes() == []
+                mock_get.assert_not_called()
+
+    def test_fetch_records_login_wall_as_failure(self):
+        """Test that a login wall counts against the source."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            response = Mock(status_code=200, text="Log in to Facebook", content=b"x")
+            with patch.object(code_fetcher, "source_health", tracker), patch(
+                "code_fetcher.config", replace(config, SOURCES=[URL])
+            ), patch.object(code_fetcher.http_pool, "get", return_value=response):
+                code_fetcher.fetch_new_codes()
+            assert tracker.get(URL).failures == 1
+            assert "login wall" in tracker.get(URL).last_error
+
+    def test_breaker_follows_the_active_clock(self):
+        """Test that a simulated clock drives the breaker's backoff."""
+        with tempfile.TemporaryDirectory() as tmp:
+            tracker = self._tracker(tmp)
+            clock = VirtualClock(start=1000)
+            previous = set_clock(clock)
+            try:
+                tracker.record_failure(URL, 1.0, "timeout")
+                tracker.record_failure(URL, 1.0, "timeout")
+                assert not tracker.allow(URL)
+                clock.advance(100)
+                assert tracker.allow(URL)
+            finally:
+                set_clock(previous)
+            assert tracker.get(URL).last_failure == 1000
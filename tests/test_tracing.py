@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from tracing import Tracer, current_span
+
+
+def _read_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestTracer:
+    """Test cases for JSONL span tracing."""
+
+    def test_disabled_tracer_yields_span_without_writing(self):
+        """Test that a tracer without a path records nothing."""
+        tracer = Tracer("")
+        assert not tracer.enabled
+        with tracer.span("cycle") as span:
+            span.set(codes=1)
+            assert current_span() is None
+
+    def test_nested_spans_are_linked(self):
+        """Test that child spans carry the parent's trace and span ids."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            tracer = Tracer(path)
+            with tracer.span("cycle"):
+                with tracer.span("fetch", source="https://example.com") as child:
+                    child.set(bytes=10)
+
+            spans = _read_spans(path)
+            by_name = {span["name"]: span for span in spans}
+            assert [span["name"] for span in spans] == ["fetch", "cycle"]
+            assert by_name["fetch"]["parent_id"] == by_name["cycle"]["span_id"]
+            assert by_name["fetch"]["trace_id"] == by_name["cycle"]["trace_id"]
+            assert by_name["cycle"]["parent_id"] is None
+            assert by_name["fetch"]["attributes"] == {
+                "source": "https://example.com",
+                "bytes": 10,
+            }
+            assert by_name["cycle"]["duration"] >= 0
+
+    def test_errors_are_recorded(self):
+        """Test that exceptions mark the span as failed and propagate."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            tracer = Tracer(path)
+            with pytest.raises(ValueError):
+                with tracer.span("lookup"):
+                    raise ValueError("bad token")
+
+            (span,) = _read_spans(path)
+            assert span["status"] == "error"
+            assert "bad token" in span["attributes"]["error"]
+
+    def test_file_rotates(self):
+        """Test that the span file rotates once it exceeds its size limit."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            tracer = Tracer(path, max_bytes=200, backups=2)
+            for _ in range(10):
+                with tracer.span("fetch"):
+                    pass
+            assert os.path.exists(path + ".1")
+            assert not os.path.exists(path + ".3")
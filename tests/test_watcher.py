@@ -0,0 +1,182 @@
+from dataclasses import replace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from accounts import Account, AccountResults
+from clock import VirtualClock, set_clock
+from config import config
+from entitlements import EntitlementCache
+from extractors import ExtractedCode
+from latency import LatencyTracker
+from rate_limiter import RateLimiter
+from reddit_parser import monitor_reddit_for_codes
+from scheduler import AdaptiveScheduler
+from utils import load_json
+from watcher import Watcher
+from work_queue import DONE, RETRY, WorkQueue
+
+CODE_A = "ABCDE-12345-FGHIJ-67890-KLMNO"
+CODE_B = "ZYXWV-54321-UTSRQ-09876-PONML"
+FAST = "https://fast.example/codes"
+SLOW = "https://slow.example/codes"
+
+
+@pytest.fixture
+def vclock():
+    clock = VirtualClock(start=100000.0)
+    previous = set_clock(clock)
+    yield clock
+    set_clock(previous)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    settings = replace(
+        config,
+        LOG_FILE=str(tmp_path / "codes.json"),
+        USED_FILE=str(tmp_path / "used.json"),
+        REDDIT_SCHEDULE_FILE=str(tmp_path / "reddit.json"),
+        APPRISE_URL="",
+    )
+    with patch("watcher.config", settings), patch(
+        "reddit_parser.config", settings
+    ), patch("watcher.persist_cookies"), patch("accounts.keep_alive"):
+        yield settings
+
+
+def _watcher(tmp_path, vclock, fetch=None, redeem_code=None):
+    account = Account(
+        name="main",
+        cookies_file="cookies.json",
+        session=Mock(),
+        rate_limiter=RateLimiter(clock=vclock),
+    )
+    return Watcher(
+        accounts=[account],
+        scheduler=AdaptiveScheduler(
+            [FAST, SLOW],
+            path=str(tmp_path / "schedule.json"),
+            base_interval=600,
+            budget_per_hour=0,
+            clock=vclock,
+        ),
+        work_queue=WorkQueue(path=str(tmp_path / "queue.json")),
+        entitlement_cache=EntitlementCache(path=str(tmp_path / "entitlements.json")),
+        latency=LatencyTracker(path=str(tmp_path / "latency.json")),
+        account_results=AccountResults(path=str(tmp_path / "accounts.json")),
+        fetch=fetch or Mock(return_value={}),
+        redeem_code=redeem_code or Mock(return_value="redeemed"),
+    )
+
+
+class TestWatcher:
+    """Test cases for the watcher's polling and redemption steps."""
+
+    def test_poll_and_queue_fresh_codes(self, tmp_path, vclock, settings):
+        """Test that due sources are fetched and only unseen codes are queued."""
+        fetch = Mock(
+            return_value={
+                FAST: {CODE_A: ExtractedCode(CODE_A, expires="")},
+                SLOW: {
+                    CODE_A: ExtractedCode(CODE_A),
+                    CODE_B: ExtractedCode(CODE_B),
+                },
+            }
+        )
+        watcher = _watcher(tmp_path, vclock, fetch=fetch)
+
+        codes_by_source = watcher.poll_sources(set())
+        fresh = watcher.queue_fresh_codes(codes_by_source, [], [CODE_B])
+
+        assert sorted(fetch.call_args.args[0]) == [FAST, SLOW]
+        assert fresh == [CODE_A]
+        assert CODE_A in watcher.work_queue and CODE_B not in watcher.work_queue
+        assert watcher.work_queue.lease().source == FAST
+        # Nothing is due again until the learned interval has passed.
+        watcher.poll_sources({CODE_A})
+        assert fetch.call_args.args[0] == []
+
+    def test_redeem_queued_counts_and_logs_results(self, tmp_path, vclock, settings):
+        """Test redeeming queued codes through the real loop with a stub redeemer."""
+        redeem = Mock(
+            side_effect=lambda session, code: (
+                "redeemed" if code == CODE_A else "expired"
+            )
+        )
+        watcher = _watcher(tmp_path, vclock, redeem_code=redeem)
+        for code in (CODE_A, CODE_B):
+            watcher.work_queue.enqueue(code, source=FAST)
+        all_codes, used_codes = [CODE_A], []
+
+        start = vclock.time()
+        assert watcher.redeem_queued(watcher.accounts, all_codes, used_codes, 2) == (
+            1,
+            1,
+        )
+
+        assert redeem.call_count == 2
+        assert used_codes == [CODE_B]
+        assert all_codes == [CODE_A, CODE_B]
+        assert load_json(settings.USED_FILE, []) == [CODE_B]
+        assert [i.code for i in watcher.work_queue.by_state(DONE)] == [CODE_A, CODE_B]
+        # Two pauses between codes, and the limiter's spacing, on the virtual clock.
+        assert vclock.time() - start >= 6
+
+    def test_transient_result_is_retried(self, tmp_path, vclock, settings):
+        """Test that a failed redemption goes back on the queue as a retry."""
+        watcher = _watcher(tmp_path, vclock, redeem_code=Mock(return_value="failed"))
+        watcher.work_queue.enqueue(CODE_A, source=FAST)
+        item = watcher.work_queue.lease()
+
+        result = watcher.redeem_item(item, watcher.accounts, [CODE_A], [])
+
+        assert result == "failed"
+        assert [i.code for i in watcher.work_queue.by_state(RETRY)] == [CODE_A]
+        assert watcher.account_results.status("main", CODE_A) == "failed"
+
+    def test_retry_after_partial_success_is_not_counted_again(
+        self, tmp_path, vclock, settings
+    ):
+        """Test that a code redeemed on one account is reported only once."""
+        alt_results = ["failed", "redeemed"]
+        watcher = _watcher(tmp_path, vclock)
+        alt = Account(
+            name="alt",
+            cookies_file="alt.json",
+            session=Mock(),
+            rate_limiter=RateLimiter(clock=vclock),
+        )
+        watcher.redeem_code = lambda session, code: (
+            alt_results.pop(0) if session is alt.session else "redeemed"
+        )
+        active = watcher.accounts + [alt]
+        watcher.work_queue.enqueue(CODE_A, source=FAST)
+
+        with patch("watcher.notify") as mock_notify:
+            first = watcher.redeem_queued(active, [CODE_A], [], 1)
+            vclock.advance(watcher.work_queue.retry_delay(1) + 1)
+            watcher.work_queue.begin_cycle()
+            second = watcher.redeem_queued(active, [CODE_A], [], 1)
+
+        assert first == (1, 0)
+        assert second == (0, 0)
+        assert mock_notify.call_count == 1
+        assert not alt_results
+        assert watcher.account_results.status("alt", CODE_A) == "redeemed"
+
+    def test_reddit_mode_shares_the_redeem_loop(self, tmp_path, vclock, settings):
+        """Test that Reddit mode queues feed codes and redeems them on the watcher."""
+        redeem = Mock(return_value="redeemed")
+        watcher = _watcher(tmp_path, vclock, redeem_code=redeem)
+        watcher.work_queue.enqueue(CODE_B, source="intake")
+        feed = {CODE_A: ExtractedCode(CODE_A)}
+
+        with patch("reddit_parser.parse_reddit_rss_details", return_value=feed):
+            monitor_reddit_for_codes(watcher, watcher.accounts, checks=2)
+
+        assert sorted(c.args[1] for c in redeem.call_args_list) == [CODE_A, CODE_B]
+        assert sorted(load_json(settings.LOG_FILE, [])) == [CODE_A, CODE_B]
+        assert watcher.work_queue.lease() is None
+        # Each check waits the learned interval (at least 120s) less 25% jitter.
+        assert vclock.time() - 100000.0 >= 2 * 90
@@ -0,0 +1,203 @@
+import json
+import multiprocessing
+import os
+import tempfile
+
+from work_queue import DONE, IN_FLIGHT, PENDING, RETRY, WorkQueue
+
+
+def _queue(tmp, owner="host:1", **kwargs):
+    return WorkQueue(os.path.join(tmp, "queue.json"), owner=owner, **kwargs)
+
+
+def _drain(tmp, owner, leased):
+    """Lease everything available from another process."""
+    queue = _queue(tmp, owner=owner)
+    while (item := queue.lease(now=10)) is not None:
+        leased.put(item.code)
+
+
+class TestWorkQueue:
+    """Test cases for the durable redemption queue."""
+
+    def test_enqueue_dedupes(self):
+        """Test that a code is only queued once."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            assert queue.enqueue("CODE1", source="ign", now=1)
+            assert not queue.enqueue("CODE1", source="reddit", now=2)
+            assert queue.items["CODE1"].source == "ign"
+            assert "CODE1" in queue
+
+    def test_lease_and_complete(self):
+        """Test the pending -> in_flight -> done lifecycle."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            queue.enqueue("CODE1", now=1)
+            queue.enqueue("CODE2", now=2)
+
+            item = queue.lease(now=10)
+            assert item.code == "CODE1"
+            assert item.state == IN_FLIGHT
+            assert item.attempts == 1
+
+            queue.complete("CODE1", "redeemed", now=11)
+            assert queue.items["CODE1"].state == DONE
+            assert queue.items["CODE1"].result == "redeemed"
+            assert queue.lease(now=12).code == "CODE2"
+            assert queue.lease(now=13) is None
+
+    def test_restart_resumes_pending_items(self):
+        """Test that a new process picks up codes that were never tried."""
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _queue(tmp, owner="host:1")
+            first.enqueue("CODE1", now=1)
+            first.enqueue("CODE2", now=2)
+            first.lease(now=5)  # process dies while redeeming CODE1
+
+            second = _queue(tmp, owner="host:2", lease_seconds=300)
+            assert second.available_count(now=10) == 1
+            assert second.lease(now=10).code == "CODE2"
+            assert second.lease(now=11) is None
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test that an abandoned in-flight item becomes available again."""
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _queue(tmp, owner="host:1", lease_seconds=60)
+            first.enqueue("CODE1", now=0)
+            first.lease(now=0)
+
+            second = _queue(tmp, owner="host:2", lease_seconds=60)
+            assert second.lease(now=30) is None
+            item = second.lease(now=61)
+            assert item.code == "CODE1"
+            assert item.lease_owner == "host:2"
+            assert item.attempts == 2
+
+    def test_release_returns_item_to_pending(self):
+        """Test that a released lease can be taken again immediately."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            queue.enqueue("CODE1", now=0)
+            queue.lease(now=1)
+            queue.release("CODE1", now=2)
+            assert queue.items["CODE1"].state == PENDING
+            assert queue.lease(now=3).code == "CODE1"
+
+    def test_done_items_are_pruned(self):
+        """Test that finished items are dropped after the retention period."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp, retention=100)
+            queue.enqueue("OLD", now=0)
+            queue.lease(now=0)
+            queue.complete("OLD", "expired", now=0)
+            queue.enqueue("NEW", now=500)
+
+            with open(queue.path, encoding="utf-8") as f:
+                assert set(json.load(f)) == {"NEW"}
+
+    def test_soonest_expiry_is_leased_first(self):
+        """Test that known expiries come first, then unknown, then past hints."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            queue.enqueue("UNKNOWN", now=1)
+            queue.enqueue("PAST", expires_at=50, now=2)
+            queue.enqueue("LATER", expires_at=5000, now=3)
+            queue.enqueue("SOON", expires_at=500, now=4)
+
+            order = [queue.lease(now=100).code for _ in range(4)]
+            assert order == ["SOON", "LATER", "UNKNOWN", "PAST"]
+
+    def test_reliable_source_breaks_ties(self):
+        """Test that codes from sources that usually redeem go first."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            for i in range(3):
+                queue.enqueue(f"OLD-GOOD-{i}", source="good", now=0)
+                queue.enqueue(f"OLD-BAD-{i}", source="bad", now=0)
+            for _ in range(6):
+                queue.lease(now=1)
+            for code in list(queue.items):
+                queue.complete(code, "redeemed" if "GOOD" in code else "invalid", 2)
+
+            queue.enqueue("NEW-BAD", source="bad", now=3)
+            queue.enqueue("NEW-GOOD", source="good", now=4)
+            assert queue.lease(now=5).code == "NEW-GOOD"
+
+    def test_enqueue_fills_missing_expiry(self):
+        """Test that a later source can supply the expiry hint."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            queue.enqueue("CODE1", now=1)
+            assert not queue.enqueue("CODE1", expires_at=900, now=2)
+            assert queue.items["CODE1"].expires_at == 900
+
+    def test_transient_result_is_retried_with_backoff(self):
+        """Test that failed codes come back after an exponential delay."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp, retry_base=100, retry_max=250, max_attempts=4)
+            queue.enqueue("CODE1", now=0)
+
+            queue.lease(now=0)
+            assert queue.complete("CODE1", "failed", now=0, retry=True) == RETRY
+            assert queue.items["CODE1"].retry_at == 100
+            assert queue.lease(now=50) is None
+
+            queue.lease(now=100)
+            queue.complete("CODE1", "unknown", now=100, retry=True)
+            assert queue.items["CODE1"].retry_at == 300
+
+            queue.begin_cycle()
+            queue.lease(now=300)
+            queue.complete("CODE1", "failed", now=300, retry=True)
+            assert queue.items["CODE1"].retry_at == 550
+
+    def test_attempt_cap(self):
+        """Test that a code is given up after max_attempts tries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp, retry_base=0, max_attempts=2)
+            queue.enqueue("CODE1", now=0)
+            queue.lease(now=0)
+            assert queue.complete("CODE1", "failed", now=0, retry=True) == RETRY
+            queue.lease(now=1)
+            assert queue.complete("CODE1", "failed", now=1, retry=True) == DONE
+            assert queue.items["CODE1"].result == "failed"
+            assert queue.lease(now=2) is None
+
+    def test_retries_wait_for_fresh_work_and_budget(self):
+        """Test that fresh codes go first and retries are capped per cycle."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp, retry_base=0, retry_budget=1)
+            for code in ("OLD1", "OLD2"):
+                queue.enqueue(code, now=0)
+                queue.lease(now=0)
+                queue.complete(code, "failed", now=0, retry=True)
+            queue.enqueue("NEW", now=1)
+
+            queue.begin_cycle()
+            assert queue.available_count(now=2) == 2
+            assert queue.lease(now=2).code == "NEW"
+            assert queue.lease(now=2).code == "OLD1"
+            assert queue.lease(now=2) is None
+
+            queue.begin_cycle()
+            assert queue.lease(now=3).code == "OLD2"
+
+    def test_processes_never_lease_the_same_item(self):
+        """Test that concurrent processes split the queue under the file lock."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = _queue(tmp)
+            for i in range(40):
+                queue.enqueue(f"CODE{i}", now=1)
+            ctx = multiprocessing.get_context("spawn")
+            leased = ctx.Queue()
+            workers = [
+                ctx.Process(target=_drain, args=(tmp, f"host:{n}", leased))
+                for n in range(3)
+            ]
+            for worker in workers:
+                worker.start()
+            codes = [leased.get(timeout=30) for _ in range(40)]
+            for worker in workers:
+                worker.join(timeout=30)
+            assert sorted(codes) == sorted(f"CODE{i}" for i in range(40))
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, Optional
+
+from config import config
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0
+    duration: float = 0.0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        """Attach extra attributes to the span before it is written."""
+        self.attributes.update(attributes)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Tracer:
+    """Write lightweight timing spans to a size-rotated JSONL file.
+
+    Spans nest through a context variable, so a ``fetch`` span opened inside a
+    ``cycle`` span is linked to it automatically. With no path configured the
+    tracer is disabled and ``span()`` only yields a throwaway object.
+    """
+
+    def __init__(self, path: str = "", max_bytes: int = 5_000_000, backups: int = 5):
+        self.path = path
+        self._logger: Optional[logging.Logger] = None
+        if path:
+            self._logger = self._build_logger(path, max_bytes, backups)
+
+    @property
+    def enabled(self) -> bool:
+        return self._logger is not None
+
+    @staticmethod
+    def _build_logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        span_logger = logging.getLogger(f"shiftwatcher.trace.{path}")
+        span_logger.setLevel(logging.INFO)
+        span_logger.propagate = False
+        span_logger.handlers.clear()
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        span_logger.addHandler(handler)
+        return span_logger
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the wrapped block as a child of the current span."""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(),
+            span_id=_new_id(),
+            parent_id=parent.span_id if parent else None,
+            attributes=dict(attributes),
+        )
+        if not self.enabled:
+            yield span
+            return
+
+        token = _current_span.set(span)
+        span.start = time.time()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self._write(span)
+
+    def _write(self, span: Span) -> None:
+        if self._logger is None:
+            return
+        try:
+            self._logger.info(json.dumps(asdict(span), default=str))
+        except Exception:
+            logging.getLogger("shiftwatcher").debug(
+                "Failed to write trace span", exc_info=True
+            )
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost active span, if any."""
+    return _current_span.get()
+
+
+tracer = Tracer(config.TRACE_FILE, config.TRACE_MAX_BYTES, config.TRACE_BACKUPS)
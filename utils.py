@@ -9,6 +9,8 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from apprise import Apprise
 from colorama import init
 
+from tracing import tracer
+
 init(autoreset=True)
 
 
@@ -64,6 +66,24 @@ def save_json(path: str, data: Any) -> None:
         logger.error(f"Failed to save {path}: {e}")
 
 
+def save_json_atomic(path: str, data: Any) -> None:
+    """Save JSON via a temporary file and rename so readers never see a torn file."""
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Failed to save {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def notify(apprise_url: str, title: str, body: str) -> bool:
     """Send notification via Apprise with error handling."""
     if not apprise_url:
@@ -74,7 +94,8 @@ def notify(apprise_url: str, title: str, body: str) -> bool:
         ap = Apprise()
         result = ap.add(apprise_url)
         if result:
-            notify_result = ap.notify(title=title, body=body)
+            with tracer.span("notify", title=title):
+                notify_result = ap.notify(title=title, body=body)
             return notify_result if notify_result is not None else False
         else:
             logger.error("Failed to add Apprise URL")
@@ -0,0 +1,381 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from colorama import Fore, Style
+from tqdm import tqdm
+
+from accounts import (
+    TRANSIENT_OUTCOMES,
+    Account,
+    AccountResults,
+    combine_outcomes,
+    ensure_logged_in,
+    load_accounts,
+    persist_cookies,
+    redeem_for_accounts,
+    wait_idle,
+)
+from clock import get_clock, strftime
+from code_fetcher import fetch_codes_by_source
+from config import Config, config
+from coordination import make_coordinator
+from deadlines import remaining, time_left_for
+from entitlements import EntitlementCache
+from extractors import ExtractedCode, parse_expiry_hint
+from games import NOT_APPLICABLE
+from http_pool import prewarm
+from latency import LatencyTracker
+from metrics import FRESH_CODES, REDEMPTIONS
+from rate_limiter import code_delay
+from scheduler import AdaptiveScheduler
+from utils import load_json, logger, notify, save_json
+from work_queue import RETRY, QueueItem, WorkQueue
+
+# Codes found per source URL, as returned by fetch_codes_by_source.
+CodesBySource = Dict[str, Dict[str, ExtractedCode]]
+
+# Console label, colour and verbose message for each combined result.
+_RESULT_DISPLAY = {
+    "redeemed": ("GOOD", Fore.GREEN, "Code redeemed successfully"),
+    "used": ("ALREADY REDEEMED", Fore.RED, "Code already redeemed"),
+    "expired": ("EXPIRED", Fore.YELLOW, "Code expired"),
+    "invalid": ("INVALID", Fore.RED, "Invalid code"),
+    NOT_APPLICABLE: (
+        "NOT APPLICABLE",
+        Fore.YELLOW,
+        "Code is for a game outside SHIFT_GAMES",
+    ),
+}
+_FAILED_DISPLAY = ("FAILED", Fore.YELLOW, "Failed to redeem code")
+# Results that make a code dead for good; they go to codes_used.json.
+_DEAD_RESULTS = ("used", "expired", "invalid")
+
+
+class Watcher:
+    """The watcher's accounts, schedule, queue and trackers, and one cycle's steps.
+
+    Built by ``make_watcher`` when the watcher starts rather than when its
+    modules are imported, so the parse workers (which re-import the entry
+    script) open no state files or coordination database. ``fetch`` and
+    ``redeem_code`` default to the real source fetch and SHiFT redemption,
+    and ``settings`` to the global config; the simulator and tests pass
+    stand-ins.
+    """
+
+    def __init__(
+        self,
+        accounts: List[Account],
+        scheduler: AdaptiveScheduler,
+        work_queue: WorkQueue,
+        entitlement_cache: EntitlementCache,
+        latency: LatencyTracker,
+        account_results: AccountResults,
+        fetch: Callable[[Iterable[str]], CodesBySource] = fetch_codes_by_source,
+        redeem_code: Optional[Callable[..., str]] = None,
+        verbose: bool = False,
+        settings: Optional[Config] = None,
+    ):
+        self.accounts = accounts
+        self.scheduler = scheduler
+        self.work_queue = work_queue
+        self.coordinator = work_queue.coordinator
+        self.entitlement_cache = entitlement_cache
+        self.latency = latency
+        self.account_results = account_results
+        self.fetch = fetch
+        self.redeem_code = redeem_code
+        self.verbose = verbose
+        self.settings = settings or config
+        # Set by the code intake so the main loop redeems pushed codes immediately.
+        self.wake = threading.Event()
+
+    def say(self, color: str, message: str) -> None:
+        """Print a timestamped console line in verbose mode."""
+        if self.verbose:
+            print(f"{color}[{strftime('%H:%M:%S')}] {message}{Style.RESET_ALL}")
+
+    def log_in(self) -> List[Account]:
+        """Accounts whose login could be verified or refreshed."""
+        self.say(Fore.BLUE, f"Verifying login for {len(self.accounts)} account(s)...")
+        return [a for a in self.accounts if ensure_logged_in(a, verbose=self.verbose)]
+
+    def run_cycle(self) -> None:
+        """Log in, poll the due sources and redeem what is queued."""
+        active = self.log_in()
+        if not active:
+            self.say(Fore.RED, "Login failed after refresh")
+            return
+
+        all_codes = load_json(self.settings.LOG_FILE, [])
+        used_codes = load_json(self.settings.USED_FILE, [])
+        self.say(
+            Fore.BLUE,
+            f"Loaded {len(all_codes)} known codes, {len(used_codes)} used",
+        )
+
+        codes_by_source = self.poll_sources(set(all_codes) | set(used_codes))
+        fresh = self.queue_fresh_codes(codes_by_source, all_codes, used_codes)
+
+        self.work_queue.begin_cycle()
+        total = self.work_queue.available_count()
+        if not total:
+            print(
+                f"{Fore.GREEN}[{strftime('%H:%M:%S')}] All current codes "
+                f"checked. 🎉{Style.RESET_ALL}"
+            )
+            return
+
+        # Open the SHiFT connections now so the first redemption skips the handshake.
+        for account in active:
+            prewarm(account.session, self.settings.REDEEM_URL)
+
+        self.say(
+            Fore.BLUE, f"Found {len(fresh)} new codes to check ({total} queued)"
+        )
+        if fresh:
+            FRESH_CODES.inc(len(fresh))
+            all_codes.extend(fresh)
+            save_json(self.settings.LOG_FILE, all_codes)
+            notify(
+                self.settings.APPRISE_URL,
+                "New SHiFT Codes Found",
+                "New Code or Codes Found",
+            )
+        print(f"{Fore.CYAN}=== Checking {total} new codes ==={Style.RESET_ALL}")
+
+        success_count, fail_count = self.redeem_queued(
+            active, all_codes, used_codes, total
+        )
+
+        if not time_left_for(self.settings.CODE_DEADLINE):
+            left = self.work_queue.available_count()
+            logger.warning(f"Cycle deadline reached; {left} code(s) left queued")
+        if self.verbose:
+            self.say(
+                Fore.CYAN,
+                f"All codes processed — {success_count} redeemed, "
+                f"{fail_count} not available.",
+            )
+        else:
+            print(
+                f"\n{Fore.CYAN}All codes processed — {success_count} redeemed, "
+                f"{fail_count} not available.{Style.RESET_ALL}"
+            )
+
+        self.finish_redeeming(active)
+
+        # Status message: waiting for next check
+        wait = int(self.scheduler.seconds_until_next_due())
+        hours = wait // 3600
+        minutes = (wait % 3600) // 60
+        time_str = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+        print(
+            f"{Fore.YELLOW}[{strftime('%H:%M:%S')}] Waiting for new codes... "
+            f"Next check in {time_str}{Style.RESET_ALL}"
+        )
+
+    def poll_sources(self, known: Set[str]) -> CodesBySource:
+        """Fetch the due sources and return codes per source.
+
+        Updates the polling schedule and latency sightings. With a coordinator
+        the result also holds codes other instances found, and with leader
+        election only the leader polls at all.
+        """
+        polling = self.coordinator is None or self.coordinator.polls()
+        due = self.scheduler.due_sources() if polling else []
+        codes_by_source = self.fetch(due)
+        self.scheduler.record_cycle(due, codes_by_source, known)
+        self.scheduler.save()
+        self.latency.sighted(codes_by_source, known)
+        if self.coordinator is not None:
+            codes_by_source = self.coordinator.share_codes(codes_by_source)
+        found = set().union(*codes_by_source.values())
+        self.say(
+            Fore.BLUE, f"Fetched {len(found)} codes from {len(due)} due source(s)"
+        )
+        return codes_by_source
+
+    def queue_fresh_codes(
+        self,
+        codes_by_source: CodesBySource,
+        all_codes: List[str],
+        used_codes: List[str],
+    ) -> List[str]:
+        """Queue codes not seen before, crediting the first source listing them.
+
+        Codes are queued before they are logged as known, so a crash mid-batch
+        leaves them pending for the next run instead of silently dropping them.
+        """
+        fresh = [
+            c
+            for c in sorted(set().union(*codes_by_source.values()))
+            if c not in all_codes and c not in used_codes and c not in self.work_queue
+        ]
+        for code in fresh:
+            source = next(
+                url for url, found in codes_by_source.items() if code in found
+            )
+            found = [f[code] for f in codes_by_source.values() if code in f]
+            expiries = [e for e in (parse_expiry_hint(f.expires) for f in found) if e]
+            self.work_queue.enqueue(
+                code,
+                source=source,
+                expires_at=min(expiries) if expiries else None,
+            )
+            self.latency.queued(code, source)
+        self.latency.save()
+        return fresh
+
+    def redeem_queued(
+        self,
+        active: List[Account],
+        all_codes: List[str],
+        used_codes: List[str],
+        total: int,
+    ) -> Tuple[int, int]:
+        """Redeem queued codes while the cycle deadline allows one more.
+
+        Returns the number of codes redeemed and not redeemed.
+        """
+        success_count = 0
+        fail_count = 0
+        check_counter = 0
+
+        with tqdm(
+            total=total, desc="Redeeming Codes", ncols=100, disable=self.verbose
+        ) as pbar:
+            # Only start a code while its whole time box still fits in the
+            # cycle's; the rest stays queued for the next cycle.
+            while time_left_for(self.settings.CODE_DEADLINE) and (
+                item := self.work_queue.lease()
+            ) is not None:
+                # A retry of a code another account already redeemed is not
+                # counted as a second success.
+                redeemed_before = self.account_results.redeemed(item.code)
+                result = self.redeem_item(item, active, all_codes, used_codes)
+                check_counter += 1
+                if result != "redeemed":
+                    fail_count += 1
+                elif not redeemed_before:
+                    success_count += 1
+
+                # Human like random delay 3-7 seconds
+                delay = code_delay()
+                self.say(Fore.BLUE, f"Waiting {delay:.1f}s before next code...")
+                get_clock().sleep(min(delay, remaining()))
+                if not self.verbose:
+                    pbar.update(1)
+
+                # Periodic update every 5 codes
+                if check_counter % 5 == 0 or check_counter == total:
+                    if self.verbose:
+                        self.say(
+                            Fore.BLUE,
+                            f"Progress: {check_counter}/{total} codes processed "
+                            f"({success_count} good, {fail_count} failed)",
+                        )
+                    else:
+                        pbar.set_description_str(
+                            f"Processed {check_counter}/{total} | "
+                            f"Success: {Fore.GREEN}{success_count}{Style.RESET_ALL} | "
+                            f"Failed: {Fore.RED}{fail_count}{Style.RESET_ALL}"
+                        )
+        return success_count, fail_count
+
+    def redeem_item(
+        self,
+        item: QueueItem,
+        active: List[Account],
+        all_codes: List[str],
+        used_codes: List[str],
+    ) -> str:
+        """Redeem a leased code on the accounts still missing it; returns the result."""
+        code = item.code
+        if code not in all_codes:
+            # Pushed through the intake rather than found by a source.
+            all_codes.append(code)
+            save_json(self.settings.LOG_FILE, all_codes)
+        self.latency.started(code, item.source)
+        redeemed_before = self.account_results.redeemed(code)
+        # Retries only go to accounts whose last attempt was transient.
+        targets = self.account_results.pending_accounts(active, code) or active
+        outcomes = redeem_for_accounts(
+            targets,
+            code,
+            self.entitlement_cache,
+            redeem=self.redeem_code,
+        )
+        self.account_results.record(code, outcomes)
+        # Once one account has redeemed the code, that is its result.
+        result = "redeemed" if redeemed_before else combine_outcomes(outcomes)
+        transient = any(o in TRANSIENT_OUTCOMES for o in outcomes.values())
+        for outcome in outcomes.values():
+            REDEMPTIONS.inc(status=outcome)
+
+        label, color, message = _RESULT_DISPLAY.get(result, _FAILED_DISPLAY)
+        status = f"{color}{label}{Style.RESET_ALL}"
+        if result == "redeemed":
+            if not redeemed_before:
+                notify(self.settings.APPRISE_URL, "Code Redeemed", f"✅ {code}")
+        elif result in _DEAD_RESULTS and code not in used_codes:
+            used_codes.append(code)
+            save_json(self.settings.USED_FILE, used_codes)
+        self.say(color, f"{message}: {code}")
+
+        state = self.work_queue.complete(code, result, retry=transient)
+        if state == RETRY:
+            delay = self.work_queue.retry_delay(item.attempts)
+            status += f" (retry in {delay / 60:.0f}m)"
+        else:
+            self.latency.finished(code, result)
+
+        if not self.verbose:
+            tqdm.write(f"{Fore.WHITE}{code} → Status: {status}")
+            if len(active) > 1:
+                tqdm.write(
+                    "    " + ", ".join(f"{name}: {o}" for name, o in outcomes.items())
+                )
+        return result
+
+    def finish_redeeming(self, active: List[Account]) -> None:
+        """Save the caches and any cookies the server rotated while redeeming."""
+        self.entitlement_cache.save()
+        self.latency.save()
+        for account in active:
+            persist_cookies(account)
+
+    def next_wait(self) -> float:
+        """Seconds until the next cycle should start.
+
+        Falls back to the shortest interval if the cycle ended before any
+        source was rescheduled (e.g. login failed) or its deadline left codes
+        queued.
+        """
+        wait = self.scheduler.seconds_until_next_due()
+        if wait <= 0:
+            wait = self.scheduler.min_interval
+        if self.work_queue.available_count():
+            wait = min(wait, self.scheduler.min_interval)
+        return wait
+
+    def idle(self, seconds: float, role: str = "sources") -> None:
+        """Wait for the next cycle, keeping sessions alive in the meantime.
+
+        Returns early when the code intake sets ``wake``.
+        """
+        wait_idle(
+            self.accounts, seconds, self.wake, self.coordinator, role, self.verbose
+        )
+
+
+def make_watcher(verbose: bool = False) -> Watcher:
+    """Watcher for the configured accounts, sources and state files."""
+    return Watcher(
+        accounts=load_accounts(),
+        scheduler=AdaptiveScheduler(config.SOURCES),
+        work_queue=WorkQueue(coordinator=make_coordinator()),
+        entitlement_cache=EntitlementCache(),
+        latency=LatencyTracker(),
+        account_results=AccountResults(),
+        verbose=verbose,
+    )
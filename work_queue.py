@@ -0,0 +1,326 @@
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+
+from clock import get_clock
+from config import config
+from metrics import REDEMPTION_RETRIES
+from utils import load_json, logger, save_json_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: only this process's threads are serialised
+    fcntl = None
+
+if TYPE_CHECKING:
+    from coordination import Coordinator
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+RETRY = "retry"
+DONE = "done"
+
+
+@dataclass
+class QueueItem:
+    """One code waiting for (or finished with) redemption."""
+
+    code: str
+    state: str = PENDING
+    source: str = ""
+    enqueued_at: float = 0.0
+    expires_at: float = 0.0
+    lease_owner: str = ""
+    lease_expires: float = 0.0
+    attempts: int = 0
+    result: str = ""
+    finished_at: float = 0.0
+    retry_at: float = 0.0
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Durable redemption queue stored as JSON and rewritten atomically.
+
+    Codes are enqueued before they are added to ``codes_log.json``, so a crash
+    mid-batch leaves them ``pending`` for the next process. ``lease()`` marks
+    an item ``in_flight`` for ``lease_seconds`` under this process's owner id
+    and persists that before redemption starts; another process (for example
+    a restart that overlaps the old one) skips it until the lease expires.
+    Every read-modify-save holds an exclusive ``flock`` on ``<file>.lock``
+    and re-reads the file first, so separate processes see each other's
+    leases and enqueues (on platforms without ``fcntl`` only threads are
+    serialised).
+
+    Items completed with ``retry=True`` wait in ``retry`` state with
+    exponential backoff until ``max_attempts`` is reached. Retries are only
+    leased once no new work is available, and at most ``retry_budget`` of them
+    per cycle (see ``begin_cycle()``), so they never delay fresh codes.
+
+    With a ``coordinator`` the lease is also taken in the store shared with
+    other watcher instances: items another instance is redeeming are
+    skipped (and left pending here), items it already finished are marked
+    done with its result, and retries keep the shared lease until they are
+    due so no other instance jumps the backoff.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        lease_seconds: float = config.QUEUE_LEASE_SECONDS,
+        retention: float = config.QUEUE_RETENTION,
+        owner: str = "",
+        max_attempts: int = config.RETRY_MAX_ATTEMPTS,
+        retry_base: float = config.RETRY_BASE_DELAY,
+        retry_max: float = config.RETRY_MAX_DELAY,
+        retry_budget: int = config.RETRY_BUDGET,
+        coordinator: Optional["Coordinator"] = None,
+    ):
+        self.path = path or config.QUEUE_FILE
+        self.lease_seconds = lease_seconds
+        self.retention = retention
+        self.owner = owner or default_owner()
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retry_budget = retry_budget
+        self._retries_left = retry_budget
+        self.coordinator = coordinator
+        self.items: Dict[str, QueueItem] = {}
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._load()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the queue across threads and processes, with fresh items.
+
+        The lock lives on a sidecar file because the queue file itself is
+        replaced on every save.
+        """
+        with self._lock:
+            self._lock_depth += 1
+            try:
+                if self._lock_depth > 1 or fcntl is None:
+                    self._load()
+                    yield
+                    return
+                with open(f"{self.path}.lock", "a") as handle:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                    self._load()
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    def _load(self) -> None:
+        known = {f.name for f in fields(QueueItem)}
+        raw = load_json(self.path, {})
+        items: Dict[str, QueueItem] = {}
+        if isinstance(raw, dict):
+            for code, data in raw.items():
+                values = {k: v for k, v in data.items() if k in known}
+                values["code"] = code
+                items[code] = QueueItem(**values)
+        self.items = items
+
+    def _save(self, now: float) -> None:
+        cutoff = now - self.retention
+        self.items = {
+            code: item
+            for code, item in self.items.items()
+            if item.state != DONE or item.finished_at >= cutoff
+        }
+        save_json_atomic(
+            self.path, {code: asdict(item) for code, item in self.items.items()}
+        )
+
+    def enqueue(
+        self,
+        code: str,
+        source: str = "",
+        expires_at: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> bool:
+        """Add ``code`` as pending; returns False if it is already queued.
+
+        ``expires_at`` is the expiry hint scraped from the source, if any; a
+        later source may fill in a missing one.
+        """
+        now = get_clock().time() if now is None else now
+        with self._locked():
+            if code in self.items:
+                item = self.items[code]
+                if expires_at and not item.expires_at and item.state != DONE:
+                    item.expires_at = expires_at
+                    self._save(now)
+                return False
+            self.items[code] = QueueItem(
+                code=code, source=source, enqueued_at=now, expires_at=expires_at or 0.0
+            )
+            self._save(now)
+            return True
+
+    def _is_available(self, item: QueueItem, now: float) -> bool:
+        if item.state == PENDING:
+            return True
+        return item.state == IN_FLIGHT and item.lease_expires <= now
+
+    @staticmethod
+    def _is_retry_due(item: QueueItem, now: float) -> bool:
+        return item.state == RETRY and item.retry_at <= now
+
+    def begin_cycle(self) -> None:
+        """Reset the per-cycle retry budget."""
+        with self._lock:
+            self._retries_left = self.retry_budget
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next try after ``attempts`` failed tries."""
+        return min(self.retry_max, self.retry_base * 2 ** max(0, attempts - 1))
+
+    def source_reliability(self, source: str) -> float:
+        """Smoothed share of finished codes from ``source`` that redeemed."""
+        finished = [
+            item
+            for item in self.items.values()
+            if item.state == DONE and item.source == source
+        ]
+        redeemed = sum(1 for item in finished if item.result == "redeemed")
+        return (redeemed + 1) / (len(finished) + 2)
+
+    @staticmethod
+    def _priority(
+        item: QueueItem, reliability: float, now: float
+    ) -> Tuple[int, float, float, float]:
+        """Soonest known expiry first, then unknown, then hints already past."""
+        if item.expires_at > now:
+            bucket, expiry = 0, item.expires_at
+        elif not item.expires_at:
+            bucket, expiry = 1, 0.0
+        else:
+            bucket, expiry = 2, 0.0
+        return (bucket, expiry, -reliability, item.enqueued_at)
+
+    def _next_candidate(
+        self, now: float, skip: Set[str] = frozenset()
+    ) -> Optional[QueueItem]:
+        candidates = [i for i in self.items.values() if i.code not in skip]
+        available = [i for i in candidates if self._is_available(i, now)]
+        if not available and self._retries_left > 0:
+            available = [i for i in candidates if self._is_retry_due(i, now)]
+        if not available:
+            return None
+        reliability = {
+            source: self.source_reliability(source)
+            for source in {item.source for item in available}
+        }
+        return min(
+            available,
+            key=lambda item: self._priority(item, reliability[item.source], now),
+        )
+
+    def lease(self, now: Optional[float] = None) -> Optional[QueueItem]:
+        """Claim the next available item for this process, or None."""
+        now = get_clock().time() if now is None else now
+        with self._locked():
+            skip: Set[str] = set()
+            while (item := self._next_candidate(now, skip)) is not None:
+                if self.coordinator is None:
+                    break
+                claim = self.coordinator.claim(item.code, self.lease_seconds, now)
+                if claim.granted:
+                    break
+                skip.add(item.code)
+                if claim.result:
+                    # Another instance finished it; adopt its result.
+                    item.state = DONE
+                    item.result = claim.result
+                    item.finished_at = now
+                    item.retry_at = 0.0
+                    self._save(now)
+            if item is None:
+                return None
+            if item.state == IN_FLIGHT:
+                logger.warning(
+                    f"Reclaiming expired lease on {item.code} from {item.lease_owner}"
+                )
+            elif item.state == RETRY:
+                self._retries_left -= 1
+                REDEMPTION_RETRIES.inc()
+                logger.info(f"Retrying {item.code} (attempt {item.attempts + 1})")
+            item.state = IN_FLIGHT
+            item.lease_owner = self.owner
+            item.lease_expires = now + self.lease_seconds
+            item.attempts += 1
+            self._save(now)
+            return item
+
+    def complete(
+        self, code: str, result: str, now: Optional[float] = None, retry: bool = False
+    ) -> str:
+        """Record the result of a leased item and return its new state.
+
+        With ``retry=True`` (a transient outcome) the item is scheduled for
+        another attempt unless it has used up ``max_attempts``.
+        """
+        now = get_clock().time() if now is None else now
+        with self._locked():
+            item = self.items.get(code)
+            if item is None:
+                return DONE
+            item.result = result
+            item.lease_owner = ""
+            item.lease_expires = 0.0
+            if retry and item.attempts < self.max_attempts:
+                item.state = RETRY
+                item.retry_at = now + self.retry_delay(item.attempts)
+            else:
+                if retry:
+                    logger.warning(
+                        f"Giving up on {code} after {item.attempts} attempts ({result})"
+                    )
+                item.state = DONE
+                item.finished_at = now
+                item.retry_at = 0.0
+            self._save(now)
+            if self.coordinator is not None:
+                if item.state == DONE:
+                    self.coordinator.finish(code, result, now)
+                else:
+                    self.coordinator.hold(code, item.retry_at)
+            return item.state
+
+    def release(self, code: str, now: Optional[float] = None) -> None:
+        """Return a leased item to pending without counting it as finished."""
+        now = get_clock().time() if now is None else now
+        with self._locked():
+            item = self.items.get(code)
+            if item is None or item.state != IN_FLIGHT:
+                return
+            item.state = PENDING
+            item.lease_owner = ""
+            item.lease_expires = 0.0
+            self._save(now)
+            if self.coordinator is not None:
+                self.coordinator.release(code)
+
+    def __contains__(self, code: str) -> bool:
+        with self._locked():
+            return code in self.items
+
+    def available_count(self, now: Optional[float] = None) -> int:
+        now = get_clock().time() if now is None else now
+        with self._locked():
+            fresh = sum(1 for i in self.items.values() if self._is_available(i, now))
+            due = sum(1 for i in self.items.values() if self._is_retry_due(i, now))
+            return fresh + min(due, self._retries_left)
+
+    def by_state(self, state: str) -> List[QueueItem]:
+        with self._locked():
+            return [item for item in self.items.values() if item.state == state]